@@ -1,5 +1,8 @@
+import asyncio
 import anthropic
-from typing import List, Optional, Dict, Any
+from concurrent.futures import Executor
+from functools import partial
+from typing import List, Optional, Dict, Any, AsyncIterator
 
 class AIGenerator:
     """Handles interactions with Anthropic's Claude API for generating responses"""
@@ -31,10 +34,25 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
     
-    def __init__(self, api_key: str, model: str):
+    # Marks the end of a prompt prefix that Anthropic may cache between requests
+    CACHE_BREAKPOINT = {"type": "ephemeral"}
+    
+    def __init__(self, api_key: str, model: str, prompt_caching: bool = False):
         self.client = anthropic.Anthropic(api_key=api_key)
+        # Async client for the non-blocking query path
+        self.async_client = anthropic.AsyncAnthropic(api_key=api_key)
         self.model = model
         
+        # With prompt caching the system prompt is sent as content blocks with
+        # cache breakpoints after the tool definitions and the static prompt, so
+        # only the conversation history and messages are processed uncached
+        self.prompt_caching = prompt_caching
+        self.system_block = {
+            "type": "text",
+            "text": self.SYSTEM_PROMPT,
+            "cache_control": self.CACHE_BREAKPOINT
+        }
+        
         # Pre-build base API parameters
         self.base_params = {
             "model": self.model,
@@ -59,24 +77,7 @@ Provide only the direct answer to what was asked.
             Generated response as string
         """
         
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history 
-            else self.SYSTEM_PROMPT
-        )
-        
-        # Prepare API call parameters efficiently
-        api_params = {
-            **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content
-        }
-        
-        # Add tools if available
-        if tools:
-            api_params["tools"] = tools
-            api_params["tool_choice"] = {"type": "auto"}
+        api_params = self._build_params(query, conversation_history, tools)
         
         # Get response from Claude
         response = self.client.messages.create(**api_params)
@@ -121,17 +122,144 @@ Provide only the direct answer to what was asked.
                     "content": tool_result
                 })
         
+        final_params = self._build_final_params(base_params, messages, tool_results)
+        
+        # Get final response
+        final_response = self.client.messages.create(**final_params)
+        return final_response.content[0].text
+    
+    async def agenerate_response(self, query: str,
+                                 conversation_history: Optional[str] = None,
+                                 tools: Optional[List] = None,
+                                 tool_manager=None,
+                                 executor: Optional[Executor] = None) -> str:
+        """
+        Async version of generate_response that never blocks the event loop.
+        
+        Claude is called through AsyncAnthropic and tools (vector search and
+        embedding) run in the given executor.
+        
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            executor: Executor for blocking tool calls (default executor if None)
+            
+        Returns:
+            Generated response as string
+        """
+        api_params = self._build_params(query, conversation_history, tools)
+        response = await self.async_client.messages.create(**api_params)
+        
+        if response.stop_reason == "tool_use" and tool_manager:
+            messages = api_params["messages"].copy()
+            messages.append({"role": "assistant", "content": response.content})
+            tool_results = await self._aexecute_tools(response.content, tool_manager, executor)
+            final_params = self._build_final_params(api_params, messages, tool_results)
+            final_response = await self.async_client.messages.create(**final_params)
+            return final_response.content[0].text
+        
+        return response.content[0].text
+    
+    async def astream_response(self, query: str,
+                               conversation_history: Optional[str] = None,
+                               tools: Optional[List] = None,
+                               tool_manager=None,
+                               executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Stream the response text as it is generated.
+        
+        Text deltas are yielded as soon as Claude produces them. If Claude asks
+        for a tool, the tools run in the executor and the follow-up answer is
+        streamed the same way.
+        
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            executor: Executor for blocking tool calls (default executor if None)
+            
+        Yields:
+            Chunks of response text
+        """
+        api_params = self._build_params(query, conversation_history, tools)
+        async with self.async_client.messages.stream(**api_params) as stream:
+            async for text in stream.text_stream:
+                yield text
+            response = await stream.get_final_message()
+        
+        if response.stop_reason != "tool_use" or not tool_manager:
+            return
+        
+        messages = api_params["messages"].copy()
+        messages.append({"role": "assistant", "content": response.content})
+        tool_results = await self._aexecute_tools(response.content, tool_manager, executor)
+        final_params = self._build_final_params(api_params, messages, tool_results)
+        async with self.async_client.messages.stream(**final_params) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
+    def _build_params(self, query: str, conversation_history: Optional[str],
+                      tools: Optional[List]) -> Dict[str, Any]:
+        """Build the initial API parameters for a query"""
+        # Build system content efficiently - avoid string ops when possible
+        if self.prompt_caching:
+            system_content = [self.system_block]
+            if conversation_history:
+                system_content.append({
+                    "type": "text",
+                    "text": f"Previous conversation:\n{conversation_history}"
+                })
+        else:
+            system_content = (
+                f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
+                if conversation_history 
+                else self.SYSTEM_PROMPT
+            )
+        
+        # Prepare API call parameters efficiently
+        api_params = {
+            **self.base_params,
+            "messages": [{"role": "user", "content": query}],
+            "system": system_content
+        }
+        
+        # Add tools if available
+        if tools:
+            if self.prompt_caching:
+                tools = tools[:-1] + [{**tools[-1], "cache_control": self.CACHE_BREAKPOINT}]
+            api_params["tools"] = tools
+            api_params["tool_choice"] = {"type": "auto"}
+        
+        return api_params
+    
+    def _build_final_params(self, base_params: Dict[str, Any], messages: List,
+                            tool_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the follow-up API parameters after tool execution"""
         # Add tool results as single message
         if tool_results:
             messages.append({"role": "user", "content": tool_results})
         
         # Prepare final API call without tools
-        final_params = {
+        return {
             **self.base_params,
             "messages": messages,
             "system": base_params["system"]
         }
-        
-        # Get final response
-        final_response = self.client.messages.create(**final_params)
-        return final_response.content[0].text
\ No newline at end of file
+    
+    async def _aexecute_tools(self, content_blocks, tool_manager,
+                              executor: Optional[Executor]) -> List[Dict[str, Any]]:
+        """Run all requested tools concurrently in the executor"""
+        loop = asyncio.get_running_loop()
+        tool_blocks = [block for block in content_blocks if block.type == "tool_use"]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, partial(tool_manager.execute_tool, block.name, **block.input))
+            for block in tool_blocks
+        ))
+        return [{
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": result
+        } for block, result in zip(tool_blocks, results)]
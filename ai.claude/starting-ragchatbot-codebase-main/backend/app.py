@@ -5,8 +5,11 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Union, Dict, Any
+import asyncio
+import json
 import os
 
 from config import config
@@ -34,6 +37,10 @@ app.add_middleware(
 # Initialize RAG system
 rag_system = RAGSystem(config)
 
+# Startup ingestion state: "ready", "ingesting" or "failed"
+ingestion_state = {"status": "ready", "error": None}
+initial_load_future: Optional[asyncio.Future] = None
+
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     """Request model for course queries"""
@@ -50,6 +57,8 @@ class CourseStats(BaseModel):
     """Response model for course statistics"""
     total_courses: int
     course_titles: List[str]
+    ingestion_status: str
+    ingestion_error: Optional[str] = None
 
 # API Endpoints
 
@@ -60,10 +69,10 @@ async def query_documents(request: QueryRequest):
         # Create session if not provided
         session_id = request.session_id
         if not session_id:
-            session_id = rag_system.session_manager.create_session()
+            session_id = await rag_system.acreate_session()
         
-        # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        # Process query using the non-blocking RAG path
+        answer, sources = await rag_system.aquery(request.query, session_id)
         
         return QueryResponse(
             answer=answer,
@@ -76,6 +85,42 @@ async def query_documents(request: QueryRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """
+    Process a query and stream the response as server-sent events.
+    
+    Events: "session" (session_id), "delta" (text chunk), "sources" (final
+    sources), "done", or "error" if processing fails mid-stream.
+    """
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = await rag_system.acreate_session()
+    
+    async def event_stream():
+        yield format_sse("session", {"session_id": session_id})
+        try:
+            async for event in rag_system.aquery_stream(request.query, session_id):
+                if event["type"] == "delta":
+                    yield format_sse("delta", {"text": event["text"]})
+                else:
+                    yield format_sse("sources", {"sources": event["sources"]})
+            yield format_sse("done", {})
+        except Exception as e:
+            print(f"Error in query_documents_stream: {e}")
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
@@ -83,7 +128,9 @@ async def get_course_stats():
         analytics = rag_system.get_course_analytics()
         return CourseStats(
             total_courses=analytics["total_courses"],
-            course_titles=analytics["course_titles"]
+            course_titles=analytics["course_titles"],
+            ingestion_status=ingestion_state["status"],
+            ingestion_error=ingestion_state["error"]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -92,22 +139,42 @@ async def get_course_stats():
 async def clear_session(session_id: str):
     """Clear all messages from a session"""
     try:
-        rag_system.session_manager.clear_session(session_id)
+        await rag_system.aclear_session(session_id)
         return {"message": "Session cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def load_initial_documents(docs_path: str):
+    """Index course documents, skipping files that are unchanged since the last run"""
+    print("Loading initial documents...")
+    courses, chunks = rag_system.add_course_folder(docs_path, clear_existing=False)
+    print(f"Loaded {courses} courses with {chunks} chunks")
+
+def on_initial_load_done(future: asyncio.Future):
+    """Record the outcome of the background ingestion and log any failure"""
+    error = future.exception() if not future.cancelled() else asyncio.CancelledError()
+    if error is None:
+        ingestion_state.update(status="ready", error=None)
+    else:
+        print(f"Error loading documents: {error!r}")
+        ingestion_state.update(status="failed", error=str(error))
+
 @app.on_event("startup")
 async def startup_event():
-    """Load initial documents on startup"""
+    """
+    Load initial documents in the background so the server starts serving immediately.
+    
+    Until ingestion finishes, /api/courses reports ingestion_status "ingesting"
+    and queries run against the partly built index.
+    """
+    global initial_load_future
     docs_path = "../docs"
     if os.path.exists(docs_path):
-        print("Loading initial documents...")
-        try:
-            courses, chunks = rag_system.add_course_folder(docs_path, clear_existing=False)
-            print(f"Loaded {courses} courses with {chunks} chunks")
-        except Exception as e:
-            print(f"Error loading documents: {e}")
+        ingestion_state.update(status="ingesting", error=None)
+        initial_load_future = asyncio.get_running_loop().run_in_executor(
+            None, load_initial_documents, docs_path
+        )
+        initial_load_future.add_done_callback(on_initial_load_done)
 
 # Custom static file handler with no-cache headers for development
 from fastapi.staticfiles import StaticFiles
@@ -13,6 +13,8 @@ class Config:
     # ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
     ANTHROPIC_MODEL: str = "claude-3-haiku-20240307"
     
+    PROMPT_CACHING: bool = True  # Cache breakpoints on the system prompt and tool definitions
+    
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     
@@ -20,10 +22,25 @@ class Config:
     CHUNK_SIZE: int = 800       # Size of text chunks for vector storage
     CHUNK_OVERLAP: int = 100     # Characters to overlap between chunks
     MAX_RESULTS: int = 5         # Maximum search results to return
-    MAX_HISTORY: int = 2         # Number of conversation messages to remember
+    TOOL_CACHE_SIZE: int = 256   # Tool results cached per process (0 = no caching)
+    MAX_HISTORY: int = 2         # Exchanges to remember when HISTORY_TOKEN_BUDGET is 0
+    HISTORY_TOKEN_BUDGET: int = 1200  # Approximate tokens of conversation history sent per query
+    
+    # Session settings
+    MAX_SESSIONS: int = 1000           # Least recently used sessions beyond this are evicted
+    SESSION_TTL_SECONDS: int = 3600    # Sessions unused for this long are evicted
+    SESSION_DB_PATH: str = ""          # SQLite file to share sessions between workers ("" = in-memory)
+    
+    # Async query settings
+    MAX_CONCURRENT_QUERIES: int = 16  # Queries processed at the same time, the rest wait
+    QUERY_WORKERS: int = 4            # Threads for tool execution (embedding + vector search)
     
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
+    
+    # Ingestion settings
+    INGEST_WORKERS: int = 4      # Processes for parsing + embedding course files (1 = in-process)
+    INGEST_BATCH_SIZE: int = 64  # Chunks per vector store write while ingesting
 
 config = Config()
 
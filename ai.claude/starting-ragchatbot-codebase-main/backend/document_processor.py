@@ -1,6 +1,8 @@
 import os
 import re
-from typing import List, Tuple
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Tuple
 from models import Course, Lesson, CourseChunk
 
 class DocumentProcessor:
@@ -22,81 +24,93 @@ class DocumentProcessor:
     
 
 
-    def chunk_text(self, text: str) -> List[str]:
-        """Split text into sentence-based chunks with overlap using config settings"""
-        
+    # Sentence boundaries: whitespace after ., ! or ? followed by a capital letter,
+    # ignoring common abbreviations
+    SENTENCE_ENDINGS = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])')
+
+    def iter_sentences(self, text: str) -> Iterator[str]:
+        """Lazily split normalized text into non-empty sentences"""
         # Clean up the text
         text = re.sub(r'\s+', ' ', text.strip())  # Normalize whitespace
         
-        # Better sentence splitting that handles abbreviations
-        # This regex looks for periods followed by whitespace and capital letters
-        # but ignores common abbreviations
-        sentence_endings = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])')
-        sentences = sentence_endings.split(text)
+        position = 0
+        for match in self.SENTENCE_ENDINGS.finditer(text):
+            sentence = text[position:match.start()].strip()
+            if sentence:
+                yield sentence
+            position = match.end()
+        sentence = text[position:].strip()
+        if sentence:
+            yield sentence
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """
+        Split text into sentence-based chunks with overlap, in a single pass.
         
-        # Clean sentences
-        sentences = [s.strip() for s in sentences if s.strip()]
+        A chunk takes sentences while their length joined by spaces stays within
+        chunk_size (the first sentence is always taken). The next chunk starts
+        at the trailing sentences of the previous one that fit in chunk_overlap,
+        but always at least one sentence further.
         
-        chunks = []
-        i = 0
+        Sentences are kept in a window with running prefix sums of their
+        lengths (plus one separating space each), so both the chunk end and the
+        overlap start only ever move forward: O(n) in the number of sentences.
+        """
+        sentences = self.iter_sentences(text)
+        window = deque()  # Sentences from the current chunk start onwards
+        ends = deque()    # ends[k]: running length through window[k], one space per sentence
+        start = 0         # Running length before window[0]
+        size = 0          # Sentences of the window in the current chunk
+        exhausted = False
         
-        while i < len(sentences):
-            current_chunk = []
-            current_size = 0
-            
-            # Build chunk starting from sentence i
-            for j in range(i, len(sentences)):
-                sentence = sentences[j]
-                
-                # Calculate size with space
-                space_size = 1 if current_chunk else 0
-                total_addition = len(sentence) + space_size
-                
-                # Check if adding this sentence would exceed chunk size
-                if current_size + total_addition > self.chunk_size and current_chunk:
+        while True:
+            # Extend the chunk while the next sentence fits
+            while True:
+                if size == len(window):
+                    sentence = None if exhausted else next(sentences, None)
+                    if sentence is None:
+                        exhausted = True
+                        break
+                    window.append(sentence)
+                    ends.append((ends[-1] if ends else start) + len(sentence) + 1)
+                if size and ends[size] - start - 1 > self.chunk_size:
                     break
-                
-                current_chunk.append(sentence)
-                current_size += total_addition
+                size += 1
             
-            # Add chunk if we have content
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                
-                # Calculate overlap for next chunk
-                if hasattr(self, 'chunk_overlap') and self.chunk_overlap > 0:
-                    # Find how many sentences to overlap
-                    overlap_size = 0
-                    overlap_sentences = 0
-                    
-                    # Count backwards from end of current chunk
-                    for k in range(len(current_chunk) - 1, -1, -1):
-                        sentence_len = len(current_chunk[k]) + (1 if k < len(current_chunk) - 1 else 0)
-                        if overlap_size + sentence_len <= self.chunk_overlap:
-                            overlap_size += sentence_len
-                            overlap_sentences += 1
-                        else:
-                            break
-                    
-                    # Move start position considering overlap
-                    next_start = i + len(current_chunk) - overlap_sentences
-                    i = max(next_start, i + 1)  # Ensure we make progress
-                else:
-                    # No overlap - move to next sentence after current chunk
-                    i += len(current_chunk)
-            else:
-                # No sentences fit, move to next
-                i += 1
-        
-        return chunks
-
-
-
+            if not size:
+                return
+            yield ' '.join(islice(window, size))
+            
+            # Overlap: first sentence from which the chunk's tail fits in chunk_overlap
+            overlap_start = size
+            if self.chunk_overlap > 0:
+                chunk_end = ends[size - 1]
+                overlap_start = 0
+                while chunk_end - (ends[overlap_start - 1] if overlap_start else start) - 1 > self.chunk_overlap:
+                    overlap_start += 1
+            
+            # Move start position considering overlap, ensuring progress
+            for _ in range(max(overlap_start, 1)):
+                window.popleft()
+                start = ends.popleft()
+            size -= max(overlap_start, 1)
 
+    def chunk_text(self, text: str) -> List[str]:
+        """Split text into sentence-based chunks with overlap using config settings"""
+        return list(self.iter_chunks(text))
     
     def process_course_document(self, file_path: str) -> Tuple[Course, List[CourseChunk]]:
+        """Process a course document into its course and the list of its chunks"""
+        course, course_chunks = self.iter_course_document(file_path)
+        course_chunks = list(course_chunks)
+        return course, course_chunks
+    
+    def iter_course_document(self, file_path: str) -> Tuple[Course, Iterator[CourseChunk]]:
         """
-        Process a course document with expected format:
+        Process a course document lazily. The course's lessons are filled in
+        while the returned chunk iterator is consumed.
+        
+        Expected format:
         Line 1: Course Title: [title]
         Line 2: Course Link: [url]
         Line 3: Course Instructor: [instructor]
@@ -145,115 +159,115 @@ class DocumentProcessor:
             instructor=instructor_name if instructor_name != "Unknown" else None
         )
         
-        # Process lessons and create chunks
-        course_chunks = []
-        current_lesson = None
-        lesson_title = None
-        lesson_link = None
-        lesson_content = []
-        chunk_counter = 0
-        
-        # Start processing from line 4 (after metadata)
-        start_index = 3
-        if len(lines) > 3 and not lines[3].strip():
-            start_index = 4  # Skip empty line after instructor
-        
-        i = start_index
-        while i < len(lines):
-            line = lines[i]
+        def iter_course_chunks() -> Iterator[CourseChunk]:
+            """Yield the course chunks, adding each lesson to the course as it is reached"""
+            current_lesson = None
+            lesson_title = None
+            lesson_link = None
+            lesson_content = []
+            chunk_counter = 0
             
-            # Check for lesson markers (e.g., "Lesson 0: Introduction")
-            lesson_match = re.match(r'^Lesson\s+(\d+):\s*(.+)$', line.strip(), re.IGNORECASE)
+            # Start processing from line 4 (after metadata)
+            start_index = 3
+            if len(lines) > 3 and not lines[3].strip():
+                start_index = 4  # Skip empty line after instructor
             
-            if lesson_match:
-                # Process previous lesson if it exists
-                if current_lesson is not None and lesson_content:
-                    lesson_text = '\n'.join(lesson_content).strip()
-                    if lesson_text:
-                        # Add lesson to course
-                        lesson = Lesson(
-                            lesson_number=current_lesson,
-                            title=lesson_title,
-                            lesson_link=lesson_link
-                        )
-                        course.lessons.append(lesson)
-                        
-                        # Create chunks for this lesson
-                        chunks = self.chunk_text(lesson_text)
-                        for idx, chunk in enumerate(chunks):
-                            # For the first chunk of each lesson, add lesson context
-                            if idx == 0:
-                                chunk_with_context = f"Lesson {current_lesson} content: {chunk}"
-                            else:
-                                chunk_with_context = chunk
-                            
-                            course_chunk = CourseChunk(
-                                content=chunk_with_context,
-                                course_title=course.title,
-                                lesson_number=current_lesson,
-                                chunk_index=chunk_counter
-                            )
-                            course_chunks.append(course_chunk)
-                            chunk_counter += 1
+            i = start_index
+            while i < len(lines):
+                line = lines[i]
                 
-                # Start new lesson
-                current_lesson = int(lesson_match.group(1))
-                lesson_title = lesson_match.group(2).strip()
-                lesson_link = None
+                # Check for lesson markers (e.g., "Lesson 0: Introduction")
+                lesson_match = re.match(r'^Lesson\s+(\d+):\s*(.+)$', line.strip(), re.IGNORECASE)
                 
-                # Check if next line is a lesson link
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    link_match = re.match(r'^Lesson Link:\s*(.+)$', next_line, re.IGNORECASE)
-                    if link_match:
-                        lesson_link = link_match.group(1).strip()
-                        i += 1  # Skip the link line so it's not added to content
-                
-                lesson_content = []
-            else:
-                # Add line to current lesson content
-                lesson_content.append(line)
-                
-            i += 1
-        
-        # Process the last lesson
-        if current_lesson is not None and lesson_content:
-            lesson_text = '\n'.join(lesson_content).strip()
-            if lesson_text:
-                lesson = Lesson(
-                    lesson_number=current_lesson,
-                    title=lesson_title,
-                    lesson_link=lesson_link
-                )
-                course.lessons.append(lesson)
-                
-                chunks = self.chunk_text(lesson_text)
-                for idx, chunk in enumerate(chunks):
-                    # For any chunk of each lesson, add lesson context & course title
-                  
-                    chunk_with_context = f"Course {course_title} Lesson {current_lesson} content: {chunk}"
+                if lesson_match:
+                    # Process previous lesson if it exists
+                    if current_lesson is not None and lesson_content:
+                        lesson_text = '\n'.join(lesson_content).strip()
+                        if lesson_text:
+                            # Add lesson to course
+                            lesson = Lesson(
+                                lesson_number=current_lesson,
+                                title=lesson_title,
+                                lesson_link=lesson_link
+                            )
+                            course.lessons.append(lesson)
+                            
+                            # Create chunks for this lesson
+                            chunks = self.iter_chunks(lesson_text)
+                            for idx, chunk in enumerate(chunks):
+                                # For the first chunk of each lesson, add lesson context
+                                if idx == 0:
+                                    chunk_with_context = f"Lesson {current_lesson} content: {chunk}"
+                                else:
+                                    chunk_with_context = chunk
+                                
+                                course_chunk = CourseChunk(
+                                    content=chunk_with_context,
+                                    course_title=course.title,
+                                    lesson_number=current_lesson,
+                                    chunk_index=chunk_counter
+                                )
+                                yield course_chunk
+                                chunk_counter += 1
+                    
+                    # Start new lesson
+                    current_lesson = int(lesson_match.group(1))
+                    lesson_title = lesson_match.group(2).strip()
+                    lesson_link = None
                     
-                    course_chunk = CourseChunk(
-                        content=chunk_with_context,
-                        course_title=course.title,
+                    # Check if next line is a lesson link
+                    if i + 1 < len(lines):
+                        next_line = lines[i + 1].strip()
+                        link_match = re.match(r'^Lesson Link:\s*(.+)$', next_line, re.IGNORECASE)
+                        if link_match:
+                            lesson_link = link_match.group(1).strip()
+                            i += 1  # Skip the link line so it's not added to content
+                    
+                    lesson_content = []
+                else:
+                    # Add line to current lesson content
+                    lesson_content.append(line)
+                    
+                i += 1
+            
+            # Process the last lesson
+            if current_lesson is not None and lesson_content:
+                lesson_text = '\n'.join(lesson_content).strip()
+                if lesson_text:
+                    lesson = Lesson(
                         lesson_number=current_lesson,
-                        chunk_index=chunk_counter
-                    )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
-        
-        # If no lessons found, treat entire content as one document
-        if not course_chunks and len(lines) > 2:
-            remaining_content = '\n'.join(lines[start_index:]).strip()
-            if remaining_content:
-                chunks = self.chunk_text(remaining_content)
-                for chunk in chunks:
-                    course_chunk = CourseChunk(
-                        content=chunk,
-                        course_title=course.title,
-                        chunk_index=chunk_counter
+                        title=lesson_title,
+                        lesson_link=lesson_link
                     )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
+                    course.lessons.append(lesson)
+                    
+                    chunks = self.iter_chunks(lesson_text)
+                    for idx, chunk in enumerate(chunks):
+                        # For any chunk of each lesson, add lesson context & course title
+                      
+                        chunk_with_context = f"Course {course_title} Lesson {current_lesson} content: {chunk}"
+                        
+                        course_chunk = CourseChunk(
+                            content=chunk_with_context,
+                            course_title=course.title,
+                            lesson_number=current_lesson,
+                            chunk_index=chunk_counter
+                        )
+                        yield course_chunk
+                        chunk_counter += 1
+            
+            # If no lessons found, treat entire content as one document
+            if not chunk_counter and len(lines) > 2:
+                remaining_content = '\n'.join(lines[start_index:]).strip()
+                if remaining_content:
+                    chunks = self.iter_chunks(remaining_content)
+                    for chunk in chunks:
+                        course_chunk = CourseChunk(
+                            content=chunk,
+                            course_title=course.title,
+                            chunk_index=chunk_counter
+                        )
+                        yield course_chunk
+                        chunk_counter += 1
         
-        return course, course_chunks
+        return course, iter_course_chunks()
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from document_processor import DocumentProcessor
+from models import Course, CourseChunk
+
+
+def file_content_hash(file_path: str) -> str:
+    """SHA-256 of the raw file bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """What was indexed from one course file"""
+    mtime: float
+    size: int
+    content_hash: str
+    course_title: str
+    chunk_ids: List[str]
+
+
+class IngestionManifest:
+    """
+    Tracks which course files have been indexed so unchanged files are skipped
+    without parsing them.
+
+    A file is unchanged if its mtime and size match the manifest. If only the
+    mtime changed (e.g. the file was touched or copied) the content hash decides.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        self.load()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def load(self):
+        """Load the manifest from disk, starting empty if missing or unreadable"""
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.entries = {path: ManifestEntry(**entry) for path, entry in data.get("files", {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Ignoring unreadable ingestion manifest {self.path}: {e}")
+
+    def save(self):
+        """Atomically write the manifest to disk"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"files": {path: asdict(entry) for path, entry in self.entries.items()}}, file, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.entries = {}
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        return self.entries.get(self._key(file_path))
+
+    def remove(self, file_path: str):
+        self.entries.pop(self._key(file_path), None)
+
+    def record(self, file_path: str, course_title: str, chunk_ids: List[str]):
+        """Record that file_path has been indexed as course_title with chunk_ids"""
+        stat = os.stat(file_path)
+        self.entries[self._key(file_path)] = ManifestEntry(
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            content_hash=file_content_hash(file_path),
+            course_title=course_title,
+            chunk_ids=chunk_ids
+        )
+
+    def is_unchanged(self, file_path: str) -> bool:
+        """Check whether file_path is indexed and unchanged since"""
+        entry = self.get(file_path)
+        if entry is None:
+            return False
+        stat = os.stat(file_path)
+        if stat.st_size != entry.size:
+            return False
+        if stat.st_mtime == entry.mtime:
+            return True
+        if file_content_hash(file_path) != entry.content_hash:
+            return False
+        # Same content with a new mtime: remember the mtime to skip hashing next time
+        entry.mtime = stat.st_mtime
+        return True
+
+    def paths_under(self, folder_path: str) -> List[str]:
+        """Indexed file paths located directly in folder_path"""
+        folder = os.path.abspath(folder_path)
+        return [path for path in self.entries if os.path.dirname(path) == folder]
+
+    def course_titles(self) -> Set[str]:
+        return {entry.course_title for entry in self.entries.values()}
+
+    def title_owner(self, course_title: str) -> Optional[str]:
+        """Path of the indexed file that provides course_title, if any"""
+        for path, entry in self.entries.items():
+            if entry.course_title == course_title:
+                return path
+        return None
+
+
+# Per-process state of the ingestion workers
+_worker_processor: Optional[DocumentProcessor] = None
+_worker_embedding_function = None
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int, embedding_model: str, threads: int):
+    """Create the document processor and load the embedding model once per worker"""
+    global _worker_processor, _worker_embedding_function
+    _worker_processor = DocumentProcessor(chunk_size, chunk_overlap)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+    _worker_embedding_function = SentenceTransformerEmbeddingFunction(model_name=embedding_model)
+
+
+def _process_in_worker(file_path: str, skip_titles: Set[str]) -> Tuple[Course, List[CourseChunk], Optional[list]]:
+    """Parse, chunk and embed one course file inside a worker process"""
+    course, chunks = _worker_processor.process_course_document(file_path)
+    embeddings = None
+    if chunks and course.title not in skip_titles:
+        embeddings = _worker_embedding_function([chunk.content for chunk in chunks])
+    return course, chunks, embeddings
+
+
+def process_course_files(file_paths: List[str],
+                         document_processor: DocumentProcessor,
+                         embedding_model: str,
+                         workers: int,
+                         skip_titles: Optional[Set[str]] = None
+                         ) -> Iterator[Tuple[str, Optional[tuple], Optional[Exception]]]:
+    """
+    Parse (and embed) course files, in a process pool when there is more than one.
+
+    Args:
+        file_paths: Course files to process
+        document_processor: Processor used when running in-process
+        embedding_model: Sentence transformer model name for worker processes
+        workers: Number of worker processes (<= 1 processes in-process)
+        skip_titles: Courses whose chunks do not need embeddings
+
+    Yields:
+        (file_path, (course, chunks, embeddings or None), error) in input order.
+        When processed in-process, chunks is a lazy iterator (the course's
+        lessons are complete once it is consumed) and embeddings are None so
+        the vector store embeds them itself
+    """
+    skip_titles = skip_titles or set()
+    workers = min(workers, len(file_paths))
+
+    if workers <= 1:
+        for file_path in file_paths:
+            try:
+                course, chunks = document_processor.iter_course_document(file_path)
+                yield file_path, (course, chunks, None), None
+            except Exception as e:
+                yield file_path, None, e
+        return
+
+    # spawn: forking a process that already loaded torch/chromadb is not safe
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(document_processor.chunk_size, document_processor.chunk_overlap, embedding_model, threads)
+    ) as executor:
+        futures = [executor.submit(_process_in_worker, file_path, skip_titles) for file_path in file_paths]
+        for file_path, future in zip(file_paths, futures):
+            try:
+                yield file_path, future.result(), None
+            except Exception as e:
+                yield file_path, None, e
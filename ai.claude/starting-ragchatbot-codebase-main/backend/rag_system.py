@@ -1,12 +1,29 @@
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Any, AsyncIterator, Iterable
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from document_processor import DocumentProcessor
 from vector_store import VectorStore
 from ai_generator import AIGenerator
 from session_manager import SessionManager
+from ingestion import IngestionManifest, process_course_files
 from search_tools import ToolManager, CourseSearchTool, CourseOutlineTool
 from models import Course, Lesson, CourseChunk
 
+class _RequestToolManager:
+    """Per-request view of the ToolManager that collects sources from executor threads"""
+    
+    def __init__(self, tool_manager: ToolManager):
+        self.tool_manager = tool_manager
+        self.sources = []
+    
+    def execute_tool(self, tool_name: str, **kwargs) -> str:
+        result, sources = self.tool_manager.execute_tool_with_sources(tool_name, **kwargs)
+        if sources:
+            self.sources = sources
+        return result
+
+
 class RAGSystem:
     """Main orchestrator for the Retrieval-Augmented Generation system"""
     
@@ -16,15 +33,34 @@ class RAGSystem:
         # Initialize core components
         self.document_processor = DocumentProcessor(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
         self.vector_store = VectorStore(config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS)
-        self.ai_generator = AIGenerator(config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL)
-        self.session_manager = SessionManager(config.MAX_HISTORY)
+        self.ai_generator = AIGenerator(config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL,
+                                        prompt_caching=config.PROMPT_CACHING)
+        self.session_manager = SessionManager(
+            config.MAX_HISTORY,
+            max_sessions=config.MAX_SESSIONS,
+            ttl_seconds=config.SESSION_TTL_SECONDS,
+            history_token_budget=config.HISTORY_TOKEN_BUDGET,
+            db_path=config.SESSION_DB_PATH or None
+        )
         
         # Initialize search tools
-        self.tool_manager = ToolManager()
+        self.tool_manager = ToolManager(
+            cache_size=config.TOOL_CACHE_SIZE,
+            index_version=lambda: self.vector_store.index_version
+        )
         self.search_tool = CourseSearchTool(self.vector_store)
         self.outline_tool = CourseOutlineTool(self.vector_store)
         self.tool_manager.register_tool(self.search_tool)
         self.tool_manager.register_tool(self.outline_tool)
+        
+        # Async query path: blocking tool calls (embedding + vector search) run in
+        # this executor, and at most MAX_CONCURRENT_QUERIES queries are in flight
+        self.executor = ThreadPoolExecutor(max_workers=config.QUERY_WORKERS,
+                                           thread_name_prefix="rag-query")
+        self.query_limiter = asyncio.Semaphore(config.MAX_CONCURRENT_QUERIES)
+        
+        # Loaded on first ingestion
+        self.ingestion_manifest = None
     
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
@@ -37,70 +73,166 @@ class RAGSystem:
             Tuple of (Course object, number of chunks created)
         """
         try:
-            # Process the document
-            course, course_chunks = self.document_processor.process_course_document(file_path)
+            # Process the document, streaming chunks into the vector store in batches
+            course, course_chunks = self.document_processor.iter_course_document(file_path)
+            chunk_ids = self._add_course_chunks(course_chunks)
             
             # Add course metadata to vector store for semantic search
+            # (lessons are complete once all chunks have been read)
             self.vector_store.add_course_metadata(course)
+            self.tool_manager.invalidate_cache()
             
-            # Add course content chunks to vector store
-            self.vector_store.add_course_content(course_chunks)
-            
-            return course, len(course_chunks)
+            return course, len(chunk_ids)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
             return None, 0
     
     def add_course_folder(self, folder_path: str, clear_existing: bool = False) -> Tuple[int, int]:
         """
-        Add all course documents from a folder.
+        Add all course documents from a folder, incrementally.
+        
+        Files recorded in the ingestion manifest and unchanged since are skipped
+        without parsing. New and modified files are parsed and embedded in a
+        process pool and upserted; chunks and courses that no longer exist in a
+        modified or deleted file are removed.
         
         Args:
             folder_path: Path to folder containing course documents
             clear_existing: Whether to clear existing data first
             
         Returns:
-            Tuple of (total courses added, total chunks created)
+            Tuple of (total courses added or updated, total chunks created)
         """
         total_courses = 0
         total_chunks = 0
+        manifest = self.get_ingestion_manifest()
         
         # Clear existing data if requested
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            manifest.clear()
         
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
             return 0, 0
         
-        # Get existing course titles to avoid re-processing
-        existing_course_titles = set(self.vector_store.get_existing_course_titles())
-        
-        # Process each file in the folder
-        for file_name in os.listdir(folder_path):
+        file_paths = []
+        for file_name in sorted(os.listdir(folder_path)):
             file_path = os.path.join(folder_path, file_name)
             if os.path.isfile(file_path) and file_name.lower().endswith(('.pdf', '.docx', '.txt')):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = self.document_processor.process_course_document(file_path)
-                    
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
+                file_paths.append(file_path)
+        
+        # Remove courses whose file was deleted
+        current_paths = {os.path.abspath(file_path) for file_path in file_paths}
+        for indexed_path in manifest.paths_under(folder_path):
+            if indexed_path not in current_paths:
+                entry = manifest.get(indexed_path)
+                self.vector_store.delete_course(entry.course_title, entry.chunk_ids)
+                manifest.remove(indexed_path)
+                print(f"Removed course: {entry.course_title} (file deleted)")
         
+        # Skip unchanged files without parsing them
+        pending_paths = [file_path for file_path in file_paths if not manifest.is_unchanged(file_path)]
+        
+        # Courses indexed before the manifest existed are adopted, not re-embedded
+        untracked_titles = set(self.vector_store.get_existing_course_titles()) - manifest.course_titles()
+        
+        results = process_course_files(
+            pending_paths,
+            self.document_processor,
+            self.config.EMBEDDING_MODEL,
+            self.config.INGEST_WORKERS,
+            skip_titles=untracked_titles
+        )
+        for file_path, result, error in results:
+            file_name = os.path.basename(file_path)
+            if error is not None:
+                print(f"Error processing {file_name}: {error}")
+                continue
+            
+            try:
+                # Chunks are a lazy iterator when processed in-process
+                course, course_chunks, embeddings = result
+                if not course:
+                    continue
+                
+                # Another file already provides this course
+                owner = manifest.title_owner(course.title)
+                if owner is not None and owner != os.path.abspath(file_path):
+                    print(f"Course already exists: {course.title} - skipping")
+                    continue
+                
+                previous = manifest.get(file_path)
+                if previous is None and course.title in untracked_titles:
+                    chunk_ids = [self.vector_store.get_chunk_id(chunk) for chunk in course_chunks]
+                    manifest.record(file_path, course.title, chunk_ids)
+                    print(f"Course already exists: {course.title} - skipping")
+                    continue
+                
+                # A renamed course replaces the previous one entirely
+                if previous is not None and previous.course_title != course.title:
+                    self.vector_store.delete_course(previous.course_title, previous.chunk_ids)
+                
+                chunk_ids = self._add_course_chunks(course_chunks, embeddings)
+                self.vector_store.add_course_metadata(course)
+                
+                # Drop chunks the previous version of the file had but this one does not
+                if previous is not None and previous.course_title == course.title:
+                    self.vector_store.delete_chunks(sorted(set(previous.chunk_ids) - set(chunk_ids)))
+                
+                manifest.record(file_path, course.title, chunk_ids)
+                total_courses += 1
+                total_chunks += len(chunk_ids)
+                action = "Updated course" if previous is not None else "Added new course"
+                print(f"{action}: {course.title} ({len(chunk_ids)} chunks)")
+            except Exception as e:
+                print(f"Error processing {file_name}: {e}")
+        
+        manifest.save()
+        if total_courses or clear_existing:
+            self.tool_manager.invalidate_cache()
         return total_courses, total_chunks
     
+    def _add_course_chunks(self, course_chunks: Iterable[CourseChunk],
+                           embeddings: Optional[List] = None) -> List[str]:
+        """
+        Stream course chunks into the vector store in batches of INGEST_BATCH_SIZE.
+        
+        Args:
+            course_chunks: Chunks to store (a list or a lazy iterator)
+            embeddings: Precomputed embeddings aligned with the chunks, if any
+            
+        Returns:
+            IDs of the stored chunks
+        """
+        batch_size = max(self.config.INGEST_BATCH_SIZE, 1)
+        chunk_ids = []
+        batch = []
+        
+        def flush():
+            offset = len(chunk_ids)
+            batch_embeddings = embeddings[offset:offset + len(batch)] if embeddings is not None else None
+            self.vector_store.add_course_content(batch, batch_embeddings)
+            chunk_ids.extend(self.vector_store.get_chunk_id(chunk) for chunk in batch)
+            batch.clear()
+        
+        for chunk in course_chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return chunk_ids
+    
+    def get_ingestion_manifest(self) -> IngestionManifest:
+        """Load the ingestion manifest stored next to the vector database"""
+        if self.ingestion_manifest is None:
+            self.ingestion_manifest = IngestionManifest(
+                os.path.join(self.config.CHROMA_PATH, "ingestion_manifest.json")
+            )
+        return self.ingestion_manifest
+    
     def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
         """
         Process a user query using the RAG system with tool-based search.
@@ -141,6 +273,86 @@ class RAGSystem:
         # Return response with sources from tool searches
         return response, sources
     
+    async def _run_session_call(self, func, *args):
+        """Run a session manager call in the executor (it may hit SQLite)"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def acreate_session(self) -> str:
+        """Async version of session_manager.create_session that does not block the event loop"""
+        return await self._run_session_call(self.session_manager.create_session)
+    
+    async def aclear_session(self, session_id: str):
+        """Async version of session_manager.clear_session that does not block the event loop"""
+        await self._run_session_call(self.session_manager.clear_session, session_id)
+    
+    async def aquery(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
+        """
+        Async version of query that does not block the event loop.
+        
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            
+        Returns:
+            Tuple of (response, sources list)
+        """
+        prompt = f"""Answer this question about course materials: {query}"""
+        
+        async with self.query_limiter:
+            history = None
+            if session_id:
+                history = await self._run_session_call(self.session_manager.get_conversation_history, session_id)
+            
+            request_tools = _RequestToolManager(self.tool_manager)
+            response = await self.ai_generator.agenerate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=request_tools,
+                executor=self.executor
+            )
+            
+            if session_id:
+                await self._run_session_call(self.session_manager.add_exchange, session_id, query, response)
+            
+            return response, request_tools.sources
+    
+    async def aquery_stream(self, query: str, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a query response as events.
+        
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            
+        Yields:
+            {"type": "delta", "text": ...} for each chunk of the answer, then
+            {"type": "sources", "sources": [...]} once the answer is complete
+        """
+        prompt = f"""Answer this question about course materials: {query}"""
+        
+        async with self.query_limiter:
+            history = None
+            if session_id:
+                history = await self._run_session_call(self.session_manager.get_conversation_history, session_id)
+            
+            request_tools = _RequestToolManager(self.tool_manager)
+            chunks = []
+            async for text in self.ai_generator.astream_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=request_tools,
+                executor=self.executor
+            ):
+                chunks.append(text)
+                yield {"type": "delta", "text": text}
+            
+            if session_id:
+                await self._run_session_call(self.session_manager.add_exchange, session_id, query, "".join(chunks))
+            
+            yield {"type": "sources", "sources": request_tools.sources}
+    
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
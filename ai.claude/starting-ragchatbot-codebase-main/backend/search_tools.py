@@ -1,8 +1,36 @@
-from typing import Dict, Any, Optional, Protocol
+from typing import Dict, Any, Optional, Protocol, Tuple, Callable
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import threading
 from vector_store import VectorStore, SearchResults
 
 
+class ThreadLocalSources:
+    """
+    Descriptor that keeps a tool's last_sources per thread.
+    
+    Concurrent queries run tools in executor threads; keeping the sources
+    thread-local stops one request from reporting another request's sources.
+    """
+    
+    def __set_name__(self, owner, name):
+        self.name = f"_{name}_local"
+    
+    def _local(self, instance) -> threading.local:
+        local = instance.__dict__.get(self.name)
+        if local is None:
+            local = instance.__dict__.setdefault(self.name, threading.local())
+        return local
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return getattr(self._local(instance), "value", [])
+    
+    def __set__(self, instance, value):
+        self._local(instance).value = value
+
+
 class Tool(ABC):
     """Abstract base class for all tools"""
     
@@ -20,6 +48,8 @@ class Tool(ABC):
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
     
+    last_sources = ThreadLocalSources()
+    
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
         self.last_sources = []  # Track sources from last search
@@ -126,6 +156,8 @@ class CourseSearchTool(Tool):
 class CourseOutlineTool(Tool):
     """Tool for getting course outlines with complete lesson lists"""
     
+    last_sources = ThreadLocalSources()
+    
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
         self.last_sources = []  # Track sources for UI
@@ -158,18 +190,13 @@ class CourseOutlineTool(Tool):
             Formatted course outline or error message
         """
         
-        # Use semantic search to find best matching course
+        # Match the title directly, falling back to semantic search
         resolved_title = self.store._resolve_course_name(course_title)
         if not resolved_title:
             return f"No course found matching '{course_title}'"
         
-        # Get all course metadata and find the matching course
-        all_courses = self.store.get_all_courses_metadata()
-        target_course = None
-        for course in all_courses:
-            if course.get('title') == resolved_title:
-                target_course = course
-                break
+        # Look up the matching course in the catalog index
+        target_course = self.store.get_course_metadata(resolved_title)
         
         if not target_course:
             return f"Course '{resolved_title}' metadata not found"
@@ -207,10 +234,22 @@ class CourseOutlineTool(Tool):
 
 
 class ToolManager:
-    """Manages available tools for the AI"""
+    """
+    Manages available tools for the AI.
+    
+    With cache_size > 0, tool results (and the sources they tracked) are kept in
+    an LRU cache keyed by (tool, normalized arguments, index version), so
+    repeated identical searches skip the embedding and vector queries. The
+    index_version callable changes whenever the indexed content changes.
+    """
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 0, index_version: Optional[Callable[[], Any]] = None):
         self.tools = {}
+        self.cache_size = cache_size
+        self.index_version = index_version or (lambda: None)
+        self.result_cache: "OrderedDict[tuple, Tuple[str, list]]" = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.cache_stats = {"hits": 0, "misses": 0}
     
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -230,7 +269,53 @@ class ToolManager:
         if tool_name not in self.tools:
             return f"Tool '{tool_name}' not found"
         
-        return self.tools[tool_name].execute(**kwargs)
+        tool = self.tools[tool_name]
+        if self.cache_size <= 0:
+            return tool.execute(**kwargs)
+        
+        key = (tool_name, self._normalize_args(kwargs), self.index_version())
+        with self.cache_lock:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self.result_cache.move_to_end(key)
+                self.cache_stats["hits"] += 1
+        if cached is not None:
+            result, sources = cached
+            if hasattr(tool, 'last_sources'):
+                tool.last_sources = list(sources)
+            return result
+        
+        # Only sources tracked by this execution belong in the cache entry
+        if hasattr(tool, 'last_sources'):
+            tool.last_sources = []
+        result = tool.execute(**kwargs)
+        sources = list(getattr(tool, 'last_sources', None) or [])
+        with self.cache_lock:
+            self.cache_stats["misses"] += 1
+            self.result_cache[key] = (result, sources)
+            self.result_cache.move_to_end(key)
+            while len(self.result_cache) > self.cache_size:
+                self.result_cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _normalize_args(kwargs: Dict[str, Any]) -> tuple:
+        """Hashable form of tool arguments: sorted, None dropped, whitespace collapsed"""
+        normalized = []
+        for name, value in sorted(kwargs.items()):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = ' '.join(value.split())
+            elif isinstance(value, (list, dict)):
+                value = repr(value)
+            normalized.append((name, value))
+        return tuple(normalized)
+    
+    def invalidate_cache(self):
+        """Drop all cached tool results (e.g. after ingesting new content)"""
+        with self.cache_lock:
+            self.result_cache.clear()
     
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
@@ -244,4 +329,17 @@ class ToolManager:
         """Reset sources from all tools that track sources"""
         for tool in self.tools.values():
             if hasattr(tool, 'last_sources'):
-                tool.last_sources = []
\ No newline at end of file
+                tool.last_sources = []
+
+    def execute_tool_with_sources(self, tool_name: str, **kwargs) -> Tuple[str, list]:
+        """
+        Execute a tool and return its result together with the sources it tracked.
+        
+        Sources are thread-local, so this must run on the same thread as the
+        tool itself (e.g. inside an executor job).
+        """
+        self.reset_sources()
+        result = self.execute_tool(tool_name, **kwargs)
+        sources = self.get_last_sources()
+        self.reset_sources()
+        return result, sources
\ No newline at end of file
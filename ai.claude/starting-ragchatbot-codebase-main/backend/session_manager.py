@@ -1,5 +1,10 @@
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import List, Optional
+from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+import sqlite3
+import threading
+import time
+import uuid
 
 @dataclass
 class Message:
@@ -7,55 +12,253 @@ class Message:
     role: str     # "user" or "assistant"
     content: str  # The message content
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) without loading a tokenizer"""
+    return max(1, (len(text) + 3) // 4)
+
+@dataclass
+class Session:
+    """Conversation history of one session with cached formatting"""
+    messages: deque = field(default_factory=deque)  # (seq, Message, formatted line, tokens)
+    tokens: int = 0                                  # Estimated tokens of the kept messages
+    last_access: float = field(default_factory=time.time)
+    version: int = 0                                 # Persisted version the messages reflect
+    next_seq: int = 0
+    formatted: Optional[str] = None                  # Cached history string, None if stale
+
 class SessionManager:
-    """Manages conversation sessions and message history"""
-    
-    def __init__(self, max_history: int = 5):
+    """
+    Manages conversation sessions and message history.
+
+    Sessions are kept in an LRU order and evicted after ttl_seconds without
+    use or when more than max_sessions exist. History is trimmed to the most
+    recent messages that fit in history_token_budget (or max_history exchanges
+    if no budget is set) and the formatted history is cached between queries.
+
+    With db_path, sessions are also stored in SQLite so several server workers
+    share them; the in-memory sessions then act as a cache validated against
+    each session's version in the database.
+    """
+
+    def __init__(self, max_history: int = 5, max_sessions: int = 1000,
+                 ttl_seconds: Optional[float] = 3600, history_token_budget: Optional[int] = None,
+                 db_path: Optional[str] = None):
         self.max_history = max_history
-        self.sessions: Dict[str, List[Message]] = {}
-        self.session_counter = 0
-    
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_token_budget = history_token_budget
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.lock = threading.RLock()
+        self.db = self._open_db(db_path) if db_path else None
+
     def create_session(self) -> str:
         """Create a new conversation session"""
-        self.session_counter += 1
-        session_id = f"session_{self.session_counter}"
-        self.sessions[session_id] = []
+        session_id = f"session_{uuid.uuid4().hex}"
+        with self.lock:
+            self._evict()
+            self.sessions[session_id] = Session()
+            if self.db:
+                with self.db:
+                    self.db.execute("INSERT INTO sessions (id, last_access, version) VALUES (?, ?, 0)",
+                                    (session_id, time.time()))
         return session_id
-    
+
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to the conversation history"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        
-        message = Message(role=role, content=content)
-        self.sessions[session_id].append(message)
-        
-        # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_history * 2:]
-    
+        with self.lock:
+            session = self._get_session(session_id, create=True)
+            message = Message(role=role, content=content)
+            line = f"{role.title()}: {content}"
+            tokens = estimate_tokens(line)
+            seq = session.next_seq
+            session.messages.append((seq, message, line, tokens))
+            session.next_seq += 1
+            session.tokens += tokens
+            session.formatted = None
+
+            # Keep conversation history within limits
+            self._trim(session)
+
+            if self.db:
+                self._db_append(session_id, session, seq, role, content)
+
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
         self.add_message(session_id, "user", user_message)
         self.add_message(session_id, "assistant", assistant_message)
-    
+
     def get_conversation_history(self, session_id: Optional[str]) -> Optional[str]:
         """Get formatted conversation history for a session"""
-        if not session_id or session_id not in self.sessions:
-            return None
-        
-        messages = self.sessions[session_id]
-        if not messages:
+        if not session_id:
             return None
-        
-        # Format messages for context
-        formatted_messages = []
-        for msg in messages:
-            formatted_messages.append(f"{msg.role.title()}: {msg.content}")
-        
-        return "\n".join(formatted_messages)
-    
+
+        with self.lock:
+            session = self._get_session(session_id)
+            if session is None or not session.messages:
+                return None
+
+            # Format messages for context only when they changed
+            if session.formatted is None:
+                session.formatted = "\n".join(line for _, _, line, _ in session.messages)
+            return session.formatted
+
+    def get_messages(self, session_id: str) -> List[Message]:
+        """Get the messages kept for a session"""
+        with self.lock:
+            session = self._get_session(session_id)
+            return [message for _, message, _, _ in session.messages] if session else []
+
     def clear_session(self, session_id: str):
         """Clear all messages from a session"""
-        if session_id in self.sessions:
-            self.sessions[session_id] = []
\ No newline at end of file
+        with self.lock:
+            session = self._get_session(session_id)
+            if session is None:
+                return
+            session.messages.clear()
+            session.tokens = 0
+            session.formatted = None
+            if self.db:
+                with self.db:
+                    self.db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                    session.version = self._db_bump_version(session_id)
+
+    def _trim(self, session: Session):
+        """Drop the oldest exchanges beyond the token budget (or message count)"""
+        if self.history_token_budget:
+            # Always keep the newest exchange even if it alone exceeds the budget
+            while len(session.messages) > 2 and session.tokens > self.history_token_budget:
+                self._pop_exchange(session)
+        else:
+            while len(session.messages) > self.max_history * 2:
+                self._pop_exchange(session)
+    
+    @staticmethod
+    def _pop_exchange(session: Session):
+        """Drop the oldest message and the assistant reply that answers it"""
+        session.tokens -= session.messages.popleft()[3]
+        while session.messages and session.messages[0][1].role == "assistant":
+            session.tokens -= session.messages.popleft()[3]
+
+    def _get_session(self, session_id: str, create: bool = False) -> Optional[Session]:
+        """Look up a session, refreshing it from the database and marking it used"""
+        now = time.time()
+        session = self.sessions.get(session_id)
+        # With a database its last_access (shared by all workers) decides expiry
+        if session is not None and not self.db and self._expired(session, now):
+            self._drop(session_id)
+            session = None
+
+        if self.db:
+            session = self._db_sync(session_id, session, now)
+
+        if session is None:
+            if not create:
+                return None
+            self._evict()
+            session = Session()
+            if self.db:
+                with self.db:
+                    self.db.execute("INSERT OR IGNORE INTO sessions (id, last_access, version) VALUES (?, ?, 0)",
+                                    (session_id, now))
+
+        session.last_access = now
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - session.last_access > self.ttl_seconds
+
+    def _drop(self, session_id: str):
+        self.sessions.pop(session_id, None)
+        if self.db:
+            with self.db:
+                self.db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _evict(self):
+        """Evict expired sessions and the least recently used ones beyond max_sessions"""
+        now = time.time()
+        # Sessions are in access order, so expired ones are at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if not self._expired(session, now) and len(self.sessions) < self.max_sessions:
+                break
+            # Only uncache here; persisted sessions are evicted by the queries below
+            self.sessions.pop(session_id)
+
+        if self.db:
+            with self.db:
+                if self.ttl_seconds:
+                    self.db.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+                self.db.execute(
+                    "DELETE FROM sessions WHERE id NOT IN "
+                    "(SELECT id FROM sessions ORDER BY last_access DESC LIMIT ?)",
+                    (max(self.max_sessions - 1, 0),)
+                )
+                self.db.execute("DELETE FROM messages WHERE session_id NOT IN (SELECT id FROM sessions)")
+
+    # SQLite persistence
+
+    @staticmethod
+    def _open_db(db_path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                       "(id TEXT PRIMARY KEY, last_access REAL NOT NULL, version INTEGER NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS messages "
+                       "(session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+                       "content TEXT NOT NULL, PRIMARY KEY (session_id, seq))")
+        return db
+
+    def _db_bump_version(self, session_id: str) -> int:
+        self.db.execute("UPDATE sessions SET version = version + 1, last_access = ? WHERE id = ?",
+                        (time.time(), session_id))
+        return self.db.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+
+    def _db_sync(self, session_id: str, session: Optional[Session], now: float) -> Optional[Session]:
+        """Reload a session whose persisted version differs from the cached one"""
+        row = self.db.execute("SELECT last_access, version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            # Evicted by another worker
+            self.sessions.pop(session_id, None)
+            return None
+        last_access, version = row
+        if self.ttl_seconds and now - last_access > self.ttl_seconds:
+            self._drop(session_id)
+            return None
+
+        with self.db:
+            self.db.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id))
+        if session is not None and session.version == version:
+            return session
+
+        session = Session(version=version)
+        rows = self.db.execute("SELECT seq, role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                               (session_id,)).fetchall()
+        for seq, role, content in rows:
+            line = f"{role.title()}: {content}"
+            tokens = estimate_tokens(line)
+            session.messages.append((seq, Message(role=role, content=content), line, tokens))
+            session.tokens += tokens
+            session.next_seq = seq + 1
+        self._trim(session)
+        return session
+
+    def _db_append(self, session_id: str, session: Session, seq: int, role: str, content: str):
+        """Persist a message and drop the ones trimmed from the history"""
+        with self.db:
+            next_seq = self.db.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?",
+                                       (session_id,)).fetchone()[0]
+            self.db.execute("INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                            (session_id, max(seq, next_seq), role, content))
+            first_kept = session.messages[0][0] if session.messages else seq
+            self.db.execute("DELETE FROM messages WHERE session_id = ? AND seq < ?", (session_id, first_kept))
+            version = self._db_bump_version(session_id)
+        if next_seq > seq:
+            # Another worker appended in the meantime: reload the session on next access
+            session.version = -1
+        else:
+            session.version = version
+        session.next_seq = max(seq, next_seq) + 1
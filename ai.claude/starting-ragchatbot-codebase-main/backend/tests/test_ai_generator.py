@@ -19,9 +19,10 @@ Test coverage:
 """
 
 import pytest
+import asyncio
 import sys
 import os
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, AsyncMock, patch, MagicMock
 import anthropic
 
 # Add parent directory to path to import backend modules
@@ -352,4 +353,129 @@ class TestAIGeneratorToolCalling:
             tool_result = tool_result_msg['content'][0]
             assert tool_result['type'] == 'tool_result'
             assert tool_result['tool_use_id'] == 'tool_123'
-            assert tool_result['content'] == 'Course content result'
\ No newline at end of file
+            assert tool_result['content'] == 'Course content result'
+
+
+class TestAIGeneratorPromptCaching:
+    """Test suite for Anthropic prompt-cache breakpoints"""
+    
+    def test_cache_breakpoints_on_system_prompt_and_tools(self, mock_anthropic_client, mock_tool_manager):
+        """Test that the static prompt and last tool carry cache_control and history stays uncached"""
+        with patch('anthropic.Anthropic', return_value=mock_anthropic_client):
+            generator = AIGenerator(api_key="test_key", model="claude-3-haiku-20240307", prompt_caching=True)
+            
+            tools = mock_tool_manager.get_tool_definitions()
+            generator.generate_response(
+                query="What are functions?",
+                conversation_history="User: What are variables?\nAssistant: Named values.",
+                tools=tools
+            )
+            
+            call_args = mock_anthropic_client.calls[0]
+            system_blocks = call_args['system']
+            assert system_blocks[0]['text'] == AIGenerator.SYSTEM_PROMPT
+            assert system_blocks[0]['cache_control'] == {"type": "ephemeral"}
+            assert "What are variables?" in system_blocks[1]['text']
+            assert 'cache_control' not in system_blocks[1]
+            
+            assert call_args['tools'][-1]['cache_control'] == {"type": "ephemeral"}
+            # Caller's tool definitions are not modified
+            assert 'cache_control' not in tools[-1]
+
+
+class MockMessageStream:
+    """Mock for the async context manager returned by AsyncAnthropic.messages.stream"""
+    
+    def __init__(self, texts, final_message):
+        self.texts = texts
+        self.final_message = final_message
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    @property
+    async def text_stream(self):
+        for text in self.texts:
+            yield text
+    
+    async def get_final_message(self):
+        return self.final_message
+
+
+class TestAIGeneratorAsync:
+    """Test suite for the async (non-blocking) generation path"""
+    
+    def _tool_use_response(self):
+        tool_response = Mock()
+        tool_response.stop_reason = "tool_use"
+        tool_content = Mock()
+        tool_content.type = "tool_use"
+        tool_content.name = "search_course_content"
+        tool_content.id = "tool_1"
+        tool_content.input = {"query": "What is Python?", "lesson_number": 1}
+        tool_response.content = [tool_content]
+        return tool_response
+    
+    def test_agenerate_response_with_tool_use(self, mock_tool_manager):
+        """Test that the async path executes tools and makes the follow-up call"""
+        mock_tool_manager.set_tool_result("search_course_content", "Python course content")
+        
+        final_response = Mock()
+        final_response.content = [Mock()]
+        final_response.content[0].text = "Python is a programming language."
+        
+        with patch('anthropic.AsyncAnthropic') as mock_async_anthropic:
+            mock_client = Mock()
+            mock_client.messages.create = AsyncMock(side_effect=[self._tool_use_response(), final_response])
+            mock_async_anthropic.return_value = mock_client
+            
+            generator = AIGenerator(api_key="test_key", model="claude-3-haiku-20240307")
+            
+            result = asyncio.run(generator.agenerate_response(
+                query="What is Python?",
+                tools=mock_tool_manager.get_tool_definitions(),
+                tool_manager=mock_tool_manager
+            ))
+            
+            assert result == "Python is a programming language."
+            assert mock_client.messages.create.await_count == 2
+            assert_tool_called_with(mock_tool_manager, "search_course_content",
+                                    query="What is Python?", lesson_number=1)
+            
+            # Follow-up call carries the tool result and no tools
+            second_call_args = mock_client.messages.create.call_args_list[1][1]
+            assert 'tools' not in second_call_args
+            tool_result = second_call_args['messages'][2]['content'][0]
+            assert tool_result['tool_use_id'] == 'tool_1'
+            assert tool_result['content'] == "Python course content"
+    
+    def test_astream_response_streams_follow_up(self, mock_tool_manager):
+        """Test that streaming yields the text of the answer after tool execution"""
+        final_message = Mock()
+        final_message.stop_reason = "end_turn"
+        
+        with patch('anthropic.AsyncAnthropic') as mock_async_anthropic:
+            mock_client = Mock()
+            mock_client.messages.stream = Mock(side_effect=[
+                MockMessageStream([], self._tool_use_response()),
+                MockMessageStream(["Python ", "is ", "great."], final_message)
+            ])
+            mock_async_anthropic.return_value = mock_client
+            
+            generator = AIGenerator(api_key="test_key", model="claude-3-haiku-20240307")
+            
+            async def collect():
+                return [text async for text in generator.astream_response(
+                    query="What is Python?",
+                    tools=mock_tool_manager.get_tool_definitions(),
+                    tool_manager=mock_tool_manager
+                )]
+            
+            chunks = asyncio.run(collect())
+            
+            assert chunks == ["Python ", "is ", "great."]
+            assert mock_client.messages.stream.call_count == 2
+            assert len(mock_tool_manager.execute_calls) == 1
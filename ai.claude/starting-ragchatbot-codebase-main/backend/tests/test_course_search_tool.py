@@ -24,8 +24,8 @@ from unittest.mock import patch, Mock
 # Add parent directory to path to import backend modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from search_tools import CourseSearchTool
-from vector_store import SearchResults
+from search_tools import CourseSearchTool, CourseOutlineTool, ToolManager
+from vector_store import SearchResults, VectorStore
 from test_helpers import (
     MockVectorStore, 
     sample_course, 
@@ -326,4 +326,112 @@ class TestCourseSearchToolExecute:
         # Verify parameter types
         assert properties['query']['type'] == 'string'
         assert properties['course_name']['type'] == 'string'
-        assert properties['lesson_number']['type'] == 'integer'
\ No newline at end of file
+        assert properties['lesson_number']['type'] == 'integer'
+
+
+class TestCourseCatalogIndex:
+    """Test suite for the in-memory course catalog index used by outline and link lookups"""
+    
+    def _make_store(self):
+        """VectorStore backed by a mocked ChromaDB client with two catalog entries"""
+        with patch('vector_store.chromadb') as mock_chromadb:
+            mock_catalog = Mock()
+            mock_catalog.get.return_value = {
+                'ids': ["Introduction to Python", "Advanced Python"],
+                'metadatas': [
+                    {
+                        'title': "Introduction to Python",
+                        'course_link': "https://example.com/python-course",
+                        'lessons_json': '[{"lesson_number": 1, "lesson_title": "Getting Started", '
+                                        '"lesson_link": "https://example.com/python/lesson1"}]',
+                        'lesson_count': 1
+                    },
+                    {
+                        'title': "Advanced Python",
+                        'course_link': "https://example.com/advanced",
+                        'lessons_json': '[]',
+                        'lesson_count': 0
+                    }
+                ]
+            }
+            mock_chromadb.PersistentClient.return_value.get_or_create_collection.return_value = mock_catalog
+            store = VectorStore("./unused", "all-MiniLM-L6-v2", 5)
+        return store, mock_catalog
+    
+    def test_links_served_from_index(self):
+        """Test that the catalog is fetched once and lookups use the parsed index"""
+        store, mock_catalog = self._make_store()
+        
+        assert store.get_lesson_link("Introduction to Python", 1) == "https://example.com/python/lesson1"
+        assert store.get_lesson_link("Introduction to Python", 2) is None
+        assert store.get_course_link("Advanced Python") == "https://example.com/advanced"
+        assert mock_catalog.get.call_count == 1
+    
+    def test_direct_title_match_skips_embedding_query(self):
+        """Test exact, partial and misspelled titles resolve without a semantic query"""
+        store, mock_catalog = self._make_store()
+        
+        assert store._resolve_course_name("introduction to python") == "Introduction to Python"
+        assert store._resolve_course_name("Advanced") == "Advanced Python"
+        assert store._resolve_course_name("Introducton to Python") == "Introduction to Python"
+        mock_catalog.query.assert_not_called()
+        
+        # Ambiguous names fall back to semantic search
+        mock_catalog.query.return_value = {
+            'documents': [["Advanced Python"]],
+            'metadatas': [[{'title': "Advanced Python"}]]
+        }
+        assert store._resolve_course_name("Python") == "Advanced Python"
+        mock_catalog.query.assert_called_once()
+    
+    def test_outline_tool_uses_course_lookup(self):
+        """Test that the outline tool looks up one course instead of scanning all metadata"""
+        store, mock_catalog = self._make_store()
+        store.get_all_courses_metadata = Mock()
+        tool = CourseOutlineTool(store)
+        
+        result = tool.execute(course_title="Introduction")
+        
+        assert "Course: Introduction to Python" in result
+        assert "1. Getting Started" in result
+        store.get_all_courses_metadata.assert_not_called()
+
+
+class TestToolResultCache:
+    """Test suite for the ToolManager tool-result cache"""
+    
+    def _make_manager(self, mock_vector_store, sample_search_results):
+        mock_vector_store.set_search_results(sample_search_results)
+        mock_vector_store.index_version = 0
+        tool = CourseSearchTool(mock_vector_store)
+        manager = ToolManager(cache_size=8, index_version=lambda: mock_vector_store.index_version)
+        manager.register_tool(tool)
+        return manager, tool
+    
+    def test_identical_calls_hit_cache(self, mock_vector_store, sample_search_results):
+        """Test that normalized identical arguments reuse the result and its sources"""
+        manager, tool = self._make_manager(mock_vector_store, sample_search_results)
+        
+        first = manager.execute_tool("search_course_content", query="What is  Python?")
+        manager.reset_sources()
+        second = manager.execute_tool("search_course_content", query=" What is Python? ", course_name=None)
+        
+        assert first == second
+        assert mock_vector_store.search_call_count == 1
+        assert_sources_tracked(manager.get_last_sources(), 3)
+        
+        manager.execute_tool("search_course_content", query="What is Python?", lesson_number=2)
+        assert mock_vector_store.search_call_count == 2
+    
+    def test_index_change_invalidates_cache(self, mock_vector_store, sample_search_results):
+        """Test that a new index version or explicit invalidation recomputes results"""
+        manager, tool = self._make_manager(mock_vector_store, sample_search_results)
+        
+        manager.execute_tool("search_course_content", query="What is Python?")
+        mock_vector_store.index_version += 1
+        manager.execute_tool("search_course_content", query="What is Python?")
+        assert mock_vector_store.search_call_count == 2
+        
+        manager.invalidate_cache()
+        manager.execute_tool("search_course_content", query="What is Python?")
+        assert mock_vector_store.search_call_count == 3
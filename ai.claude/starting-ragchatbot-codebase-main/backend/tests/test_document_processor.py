@@ -0,0 +1,80 @@
+"""
+Tests for DocumentProcessor chunking
+
+This test suite validates the single-pass sentence chunker and the lazy course
+document parser used to stream chunks into the vector store.
+
+Test coverage:
+- Chunk and overlap boundaries
+- Oversized sentences and disabled overlap
+- Lessons filled in while streaming course chunks
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from document_processor import DocumentProcessor
+
+
+class TestChunkText:
+    """Test suite for DocumentProcessor.chunk_text"""
+
+    def test_chunks_with_sentence_overlap(self):
+        """Test that chunks respect chunk_size and repeat trailing sentences within chunk_overlap"""
+        processor = DocumentProcessor(chunk_size=30, chunk_overlap=12)
+        text = "First one here. Second one. Third one. Fourth sentence is long."
+
+        chunks = processor.chunk_text(text)
+
+        assert chunks == [
+            "First one here. Second one.",
+            "Second one. Third one.",
+            "Third one.",
+            "Fourth sentence is long."
+        ]
+
+    def test_oversized_sentence_and_no_overlap(self):
+        """Test that a sentence longer than chunk_size is its own chunk and no overlap advances fully"""
+        processor = DocumentProcessor(chunk_size=10, chunk_overlap=0)
+        text = "Short one. This sentence is far too long. End."
+
+        assert processor.chunk_text(text) == ["Short one.", "This sentence is far too long.", "End."]
+
+    def test_empty_text(self):
+        """Test that whitespace-only text produces no chunks"""
+        processor = DocumentProcessor(chunk_size=800, chunk_overlap=100)
+
+        assert processor.chunk_text("   \n  ") == []
+
+
+class TestIterCourseDocument:
+    """Test suite for streaming course document parsing"""
+
+    def test_lessons_filled_while_streaming(self, tmp_path):
+        """Test that the lazy parser yields the same chunks as process_course_document"""
+        path = tmp_path / "course.txt"
+        path.write_text(
+            "Course Title: Introduction to Python\n"
+            "Course Link: https://example.com/python\n"
+            "Course Instructor: Dr. Smith\n"
+            "\n"
+            "Lesson 1: Getting Started\n"
+            "Lesson Link: https://example.com/python/lesson1\n"
+            "Python is a programming language. It is easy to read.\n"
+            "Lesson 2: Variables\n"
+            "Variables store values. They have names.\n"
+        )
+        processor = DocumentProcessor(chunk_size=40, chunk_overlap=0)
+
+        course, chunk_iterator = processor.iter_course_document(str(path))
+        assert course.title == "Introduction to Python"
+        assert course.lessons == []
+
+        chunks = list(chunk_iterator)
+        assert [lesson.lesson_number for lesson in course.lessons] == [1, 2]
+        assert course.lessons[0].lesson_link == "https://example.com/python/lesson1"
+        assert (course, chunks) == processor.process_course_document(str(path))
+        assert [chunk.chunk_index for chunk in chunks] == list(range(len(chunks)))
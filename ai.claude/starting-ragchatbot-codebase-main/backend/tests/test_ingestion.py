@@ -0,0 +1,209 @@
+"""
+Tests for incremental course ingestion
+
+This test suite validates the IngestionManifest change detection used by
+RAGSystem.add_course_folder to skip unchanged course files without parsing them,
+and the incremental add_course_folder path itself.
+
+Test coverage:
+- New files are reported as changed
+- Unchanged files are skipped, including when only the mtime changed
+- Content changes are detected
+- The manifest round-trips through disk
+- Modified files are re-chunked and their stale chunks deleted
+- Deleted files remove their course
+- Courses indexed before the manifest existed are adopted
+"""
+
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ingestion import IngestionManifest
+from rag_system import RAGSystem
+from vector_store import VectorStore
+from test_rag_system import MockConfig
+
+
+@pytest.fixture
+def course_file(tmp_path):
+    """A course file on disk"""
+    path = tmp_path / "course.txt"
+    path.write_text("Course Title: Introduction to Python\nLesson 1: Basics\nPython is great.\n")
+    return str(path)
+
+
+class TestIngestionManifest:
+    """Test suite for ingestion change detection"""
+
+    def test_new_file_is_not_unchanged(self, tmp_path, course_file):
+        """Test that a file missing from the manifest must be processed"""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+
+        assert not manifest.is_unchanged(course_file)
+
+    def test_touched_file_is_unchanged(self, tmp_path, course_file):
+        """Test that a new mtime with identical content does not trigger re-indexing"""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        manifest.record(course_file, "Introduction to Python", ["Introduction_to_Python_0"])
+
+        stat = os.stat(course_file)
+        os.utime(course_file, (stat.st_atime, stat.st_mtime + 10))
+
+        assert manifest.is_unchanged(course_file)
+        assert manifest.get(course_file).mtime == stat.st_mtime + 10
+
+    def test_modified_file_is_detected(self, tmp_path, course_file):
+        """Test that changed content with the same size is detected by hash"""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        manifest.record(course_file, "Introduction to Python", ["Introduction_to_Python_0"])
+
+        stat = os.stat(course_file)
+        with open(course_file, 'r+') as file:
+            content = file.read()
+            file.seek(0)
+            file.write(content.replace("great", "GREAT"))
+        os.utime(course_file, (stat.st_atime, stat.st_mtime + 10))
+
+        assert not manifest.is_unchanged(course_file)
+
+    def test_manifest_persists(self, tmp_path, course_file):
+        """Test that a saved manifest is loaded by a new instance"""
+        manifest_path = str(tmp_path / "manifest.json")
+        manifest = IngestionManifest(manifest_path)
+        manifest.record(course_file, "Introduction to Python", ["Introduction_to_Python_0"])
+        manifest.save()
+
+        reloaded = IngestionManifest(manifest_path)
+
+        assert reloaded.is_unchanged(course_file)
+        assert reloaded.title_owner("Introduction to Python") == os.path.abspath(course_file)
+        assert reloaded.get(course_file).chunk_ids == ["Introduction_to_Python_0"]
+
+
+class FakeVectorStore:
+    """In-memory stand-in for the VectorStore methods used during ingestion"""
+    
+    get_chunk_id = staticmethod(VectorStore.get_chunk_id)
+    
+    def __init__(self):
+        self.courses = {}
+        self.chunks = {}
+        self.index_version = 0
+    
+    def clear_all_data(self):
+        self.courses.clear()
+        self.chunks.clear()
+    
+    def get_existing_course_titles(self):
+        return list(self.courses)
+    
+    def add_course_metadata(self, course):
+        self.courses[course.title] = course
+    
+    def add_course_content(self, chunks, embeddings=None):
+        for chunk in chunks:
+            self.chunks[self.get_chunk_id(chunk)] = chunk
+    
+    def delete_chunks(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+    
+    def delete_course(self, course_title, chunk_ids=None):
+        self.courses.pop(course_title, None)
+        if chunk_ids is None:
+            chunk_ids = [chunk_id for chunk_id, chunk in self.chunks.items() if chunk.course_title == course_title]
+        self.delete_chunks(chunk_ids)
+
+
+def write_course(path, title, lessons):
+    """Write a course document with one short paragraph per lesson"""
+    lines = [f"Course Title: {title}", "Course Instructor: Dr. Smith", ""]
+    for number, content in enumerate(lessons, start=1):
+        lines += [f"Lesson {number}: Topic {number}", content]
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def rag_system(tmp_path):
+    """RAGSystem with a fake vector store and the manifest under tmp_path"""
+    config = MockConfig()
+    config.CHROMA_PATH = str(tmp_path / "chroma_db")
+    config.CHUNK_SIZE = 60
+    config.CHUNK_OVERLAP = 0
+    store = FakeVectorStore()
+    with patch('rag_system.VectorStore', return_value=store), \
+         patch('rag_system.AIGenerator'):
+        yield RAGSystem(config)
+
+
+class TestIncrementalCourseFolder:
+    """Test suite for RAGSystem.add_course_folder incremental ingestion"""
+    
+    def test_unchanged_file_is_skipped(self, tmp_path, rag_system):
+        """Test that a second run does not parse unchanged files"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        write_course(docs / "python.txt", "Python Basics", ["Python is a language."])
+        
+        assert rag_system.add_course_folder(str(docs)) == (1, 1)
+        
+        with patch.object(rag_system.document_processor, 'iter_course_document') as parse:
+            assert rag_system.add_course_folder(str(docs)) == (0, 0)
+        parse.assert_not_called()
+        assert list(rag_system.vector_store.courses) == ["Python Basics"]
+    
+    def test_modified_file_drops_stale_chunks(self, tmp_path, rag_system):
+        """Test that a modified file is re-chunked and chunks it no longer has are deleted"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        path = docs / "python.txt"
+        write_course(path, "Python Basics", ["Python is a language.", "Variables hold values.", "Loops repeat code."])
+        rag_system.add_course_folder(str(docs))
+        assert sorted(rag_system.vector_store.chunks) == \
+            ["Python_Basics_0", "Python_Basics_1", "Python_Basics_2"]
+        
+        write_course(path, "Python Basics", ["Python is a great language."])
+        assert rag_system.add_course_folder(str(docs)) == (1, 1)
+        
+        store = rag_system.vector_store
+        assert list(store.chunks) == ["Python_Basics_0"]
+        assert "great language" in store.chunks["Python_Basics_0"].content
+        assert rag_system.get_ingestion_manifest().get(str(path)).chunk_ids == ["Python_Basics_0"]
+    
+    def test_deleted_file_removes_course(self, tmp_path, rag_system):
+        """Test that removing a file removes its course and chunks"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        write_course(docs / "python.txt", "Python Basics", ["Python is a language."])
+        write_course(docs / "rust.txt", "Rust Basics", ["Rust is a language."])
+        rag_system.add_course_folder(str(docs))
+        
+        os.remove(docs / "rust.txt")
+        rag_system.add_course_folder(str(docs))
+        
+        store = rag_system.vector_store
+        assert list(store.courses) == ["Python Basics"]
+        assert list(store.chunks) == ["Python_Basics_0"]
+        assert rag_system.get_ingestion_manifest().title_owner("Rust Basics") is None
+    
+    def test_untracked_course_is_adopted(self, tmp_path, rag_system):
+        """Test that a course already in the store but not in the manifest is recorded, not re-added"""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        path = docs / "python.txt"
+        write_course(path, "Python Basics", ["Python is a language."])
+        store = rag_system.vector_store
+        store.courses["Python Basics"] = None
+        
+        with patch.object(store, 'add_course_content') as add_content:
+            assert rag_system.add_course_folder(str(docs)) == (0, 0)
+        add_content.assert_not_called()
+        
+        entry = rag_system.get_ingestion_manifest().get(str(path))
+        assert entry.course_title == "Python Basics"
+        assert entry.chunk_ids == ["Python_Basics_0"]
@@ -18,9 +18,10 @@ Test coverage:
 """
 
 import pytest
+import asyncio
 import sys
 import os
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from dataclasses import dataclass
 
 # Add parent directory to path to import backend modules  
@@ -51,6 +52,16 @@ class MockConfig:
     ANTHROPIC_API_KEY: str = "test_api_key"
     ANTHROPIC_MODEL: str = "claude-3-haiku-20240307"
     MAX_HISTORY: int = 2
+    MAX_CONCURRENT_QUERIES: int = 4
+    PROMPT_CACHING: bool = True
+    TOOL_CACHE_SIZE: int = 0
+    HISTORY_TOKEN_BUDGET: int = 1200
+    MAX_SESSIONS: int = 100
+    SESSION_TTL_SECONDS: int = 3600
+    SESSION_DB_PATH: str = ""
+    QUERY_WORKERS: int = 2
+    INGEST_WORKERS: int = 1
+    INGEST_BATCH_SIZE: int = 64
 
 
 class TestRAGSystemIntegration:
@@ -439,4 +450,82 @@ class TestRAGSystemIntegration:
             assert 'course_titles' in analytics
             assert analytics['total_courses'] == 3
             assert len(analytics['course_titles']) == 3
-            assert "Python Basics" in analytics['course_titles']
\ No newline at end of file
+            assert "Python Basics" in analytics['course_titles']
+
+    def test_aquery_runs_search_in_executor_and_returns_sources(self, sample_search_results):
+        """Test the async query path: tools run off the event loop and sources are per request"""
+        mock_vector_store = MockVectorStore()
+        mock_vector_store.set_search_results(sample_search_results)
+        
+        config = MockConfig()
+        
+        with patch('rag_system.DocumentProcessor'), \
+             patch('rag_system.VectorStore', return_value=mock_vector_store), \
+             patch('rag_system.SessionManager') as MockSessionManager, \
+             patch('anthropic.AsyncAnthropic') as mock_async_anthropic:
+            
+            mock_session_instance = Mock()
+            MockSessionManager.return_value = mock_session_instance
+            mock_session_instance.get_conversation_history.return_value = None
+            
+            tool_response = Mock()
+            tool_response.stop_reason = "tool_use"
+            tool_content = Mock()
+            tool_content.type = "tool_use"
+            tool_content.name = "search_course_content"
+            tool_content.id = "tool_1"
+            tool_content.input = {"query": "Python basics"}
+            tool_response.content = [tool_content]
+            
+            final_response = Mock()
+            final_response.content = [Mock()]
+            final_response.content[0].text = "Python is a high-level programming language."
+            
+            mock_client = Mock()
+            mock_client.messages.create = AsyncMock(side_effect=[tool_response, final_response])
+            mock_async_anthropic.return_value = mock_client
+            
+            rag_system = RAGSystem(config)
+            
+            # Record which thread executes the search
+            search_threads = []
+            original_search = mock_vector_store.search
+            def recording_search(*args, **kwargs):
+                import threading
+                search_threads.append(threading.current_thread().name)
+                return original_search(*args, **kwargs)
+            mock_vector_store.search = recording_search
+            
+            response, sources = asyncio.run(rag_system.aquery("What is Python?", session_id="test_session"))
+            
+            assert response == "Python is a high-level programming language."
+            assert len(sources) == 3
+            assert search_threads and search_threads[0].startswith("rag-query")
+            
+            # Shared tool state is not left behind for other requests
+            assert rag_system.tool_manager.get_last_sources() == []
+            
+            mock_session_instance.add_exchange.assert_called_once_with(
+                "test_session", "What is Python?", "Python is a high-level programming language."
+            )
+    
+    def test_acreate_session_runs_in_executor(self):
+        """Test that session creation (SQLite I/O) runs off the event loop"""
+        config = MockConfig()
+        
+        with patch('rag_system.DocumentProcessor'), \
+             patch('rag_system.VectorStore'), \
+             patch('rag_system.SessionManager') as MockSessionManager, \
+             patch('anthropic.Anthropic'):
+            
+            import threading
+            session_threads = []
+            def create_session():
+                session_threads.append(threading.current_thread().name)
+                return "session_1"
+            MockSessionManager.return_value.create_session.side_effect = create_session
+            
+            rag_system = RAGSystem(config)
+            
+            assert asyncio.run(rag_system.acreate_session()) == "session_1"
+            assert session_threads[0].startswith("rag-query")
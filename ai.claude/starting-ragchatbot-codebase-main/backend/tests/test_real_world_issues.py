@@ -13,7 +13,6 @@ CRITICAL BUG DISCOVERED: ChromaDB None Values Error
 These tests serve as regression tests to ensure the identified bugs are properly fixed.
 """
 
-import pytest
 import sys
 import os
 from unittest.mock import patch
@@ -31,8 +30,9 @@ class TestRealWorldBugs:
     
     def test_course_metadata_with_none_values_bug(self):
         """
-        Test that demonstrates the critical ChromaDB None values bug.
-        This test should FAIL with the current implementation.
+        Regression test for the ChromaDB None values bug.
+        Metadata is written with upsert, which accepts None values, so courses
+        with missing instructor/course_link data are stored instead of crashing.
         """
         test_path = './test_bug_chroma_db'
         
@@ -56,10 +56,15 @@ class TestRealWorldBugs:
                 ]
             )
             
-            # This should fail with current implementation
-            with pytest.raises(TypeError, match="'NoneType' object cannot be converted"):
-                vs.add_course_metadata(course)
-                
+            vs.add_course_metadata(course)
+            
+            assert vs.get_existing_course_titles() == ['Test Course']
+            [metadata] = vs.get_all_courses_metadata()
+            assert metadata['title'] == 'Test Course'
+            assert metadata.get('instructor') is None
+            assert vs.get_course_link('Test Course') is None
+            assert vs.get_lesson_link('Test Course', 1) is None
+            
         finally:
             # Clean up
             if os.path.exists(test_path):
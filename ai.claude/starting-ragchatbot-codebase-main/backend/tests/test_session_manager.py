@@ -0,0 +1,96 @@
+"""
+Tests for SessionManager
+
+This test suite validates session lifecycle and conversation history handling:
+bounded session storage, token-budgeted history and SQLite persistence shared
+between server workers.
+
+Test coverage:
+- History trimmed by token budget and cached between queries
+- LRU eviction beyond max_sessions and TTL expiry
+- Sessions shared between managers through SQLite
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from session_manager import SessionManager, estimate_tokens
+
+
+class TestSessionManager:
+    """Test suite for SessionManager"""
+
+    def test_history_trimmed_by_token_budget(self):
+        """Test that only the newest messages within the token budget are kept"""
+        manager = SessionManager(max_history=10, history_token_budget=30)
+        session_id = manager.create_session()
+
+        for i in range(5):
+            manager.add_exchange(session_id, f"Question {i} about Python variables", f"Answer {i}")
+
+        history = manager.get_conversation_history(session_id)
+        assert history.startswith("User: Question 3")
+        assert history.endswith("Assistant: Answer 4")
+        assert sum(estimate_tokens(line) for line in history.split("\n")) <= 30
+
+        # Unchanged history is served from the cache
+        assert manager.get_conversation_history(session_id) is history
+
+    def test_history_trimmed_in_exchanges(self):
+        """Test that trimming never leaves an assistant reply without its question"""
+        manager = SessionManager(history_token_budget=20)
+        session_id = manager.create_session()
+
+        # Each exchange is 12 + 4 tokens: dropping only the oldest question would fit the budget
+        manager.add_exchange(session_id, "q" * 40, "ok")
+        manager.add_exchange(session_id, "r" * 40, "ok")
+
+        assert manager.get_conversation_history(session_id) == f"User: {'r' * 40}\nAssistant: ok"
+
+    def test_history_trimmed_by_message_count_without_budget(self):
+        """Test the max_history fallback when no token budget is set"""
+        manager = SessionManager(max_history=2)
+        session_id = manager.create_session()
+
+        for i in range(5):
+            manager.add_exchange(session_id, f"q{i}", f"a{i}")
+
+        assert manager.get_conversation_history(session_id) == "User: q3\nAssistant: a3\nUser: q4\nAssistant: a4"
+
+    def test_sessions_evicted_by_count_and_ttl(self):
+        """Test LRU eviction beyond max_sessions and expiry after the TTL"""
+        manager = SessionManager(max_sessions=2, ttl_seconds=0.2)
+        first = manager.create_session()
+        manager.add_message(first, "user", "hello")
+        second = manager.create_session()
+
+        # Using the first session makes the second the least recently used
+        assert manager.get_conversation_history(first) == "User: hello"
+        third = manager.create_session()
+
+        assert second not in manager.sessions
+        assert first in manager.sessions and third in manager.sessions
+
+        time.sleep(0.3)
+        assert manager.get_conversation_history(first) is None
+
+    def test_sqlite_sessions_shared_between_workers(self, tmp_path):
+        """Test that managers using the same database see each other's messages"""
+        db_path = str(tmp_path / "sessions.db")
+        worker_a = SessionManager(max_history=2, db_path=db_path)
+        worker_b = SessionManager(max_history=2, db_path=db_path)
+
+        session_id = worker_a.create_session()
+        worker_a.add_exchange(session_id, "What is Python?", "A programming language.")
+        assert worker_b.get_conversation_history(session_id) == \
+            "User: What is Python?\nAssistant: A programming language."
+
+        worker_b.add_exchange(session_id, "And variables?", "Named values.")
+        assert worker_a.get_conversation_history(session_id).endswith("Assistant: Named values.")
+
+        worker_a.clear_session(session_id)
+        assert worker_b.get_conversation_history(session_id) is None
@@ -1,4 +1,8 @@
 import chromadb
+import difflib
+import json
+import re
+import threading
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
@@ -50,6 +54,15 @@ class VectorStore:
         # Create collections for different types of data
         self.course_catalog = self._create_collection("course_catalog")  # Course titles/instructors
         self.course_content = self._create_collection("course_content")  # Actual course material
+        
+        # Incremented on every write so cached search results can be invalidated
+        self.index_version = 0
+        
+        # In-memory catalog index, loaded on first use and kept in sync on writes
+        self._catalog_lock = threading.Lock()
+        self._catalog: Optional[Dict[str, Dict[str, Any]]] = None      # title -> parsed course metadata
+        self._lesson_links: Dict[str, Dict[int, Optional[str]]] = {}     # title -> lesson number -> link
+        self._normalized_titles: Dict[str, str] = {}                     # normalized title -> title
     
     def _create_collection(self, name: str):
         """Create or get a ChromaDB collection"""
@@ -100,7 +113,11 @@ class VectorStore:
             return SearchResults.empty(f"Search error: {str(e)}")
     
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
-        """Use vector search to find best matching course by name"""
+        """Find best matching course by name, using vector search only if no title matches directly"""
+        title = self._match_course_title(course_name)
+        if title:
+            return title
+        
         try:
             results = self.course_catalog.query(
                 query_texts=[course_name],
@@ -134,8 +151,6 @@ class VectorStore:
     
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
-
         course_text = course.title
         
         # Build lessons metadata and serialize as JSON string
@@ -147,20 +162,38 @@ class VectorStore:
                 "lesson_link": lesson.lesson_link
             })
         
-        self.course_catalog.add(
+        metadata = {
+            "title": course.title,
+            "instructor": course.instructor,
+            "course_link": course.course_link,
+            "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
+            "lesson_count": len(course.lessons)
+        }
+        self.course_catalog.upsert(
             documents=[course_text],
-            metadatas=[{
-                "title": course.title,
-                "instructor": course.instructor,
-                "course_link": course.course_link,
-                "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
-                "lesson_count": len(course.lessons)
-            }],
+            metadatas=[metadata],
             ids=[course.title]
         )
+        
+        self.index_version += 1
+        with self._catalog_lock:
+            if self._catalog is not None:
+                self._index_course(metadata)
+    
+    @staticmethod
+    def get_chunk_id(chunk: CourseChunk) -> str:
+        """Use title with chunk index for unique IDs"""
+        return f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}"
     
-    def add_course_content(self, chunks: List[CourseChunk]):
-        """Add course content chunks to the vector store"""
+    def add_course_content(self, chunks: List[CourseChunk], embeddings: Optional[List] = None):
+        """
+        Add or update course content chunks in the vector store.
+        
+        Args:
+            chunks: Chunks to store
+            embeddings: Precomputed embeddings for the chunks (computed by the
+                collection's embedding function if None)
+        """
         if not chunks:
             return
         
@@ -170,23 +203,56 @@ class VectorStore:
             "lesson_number": chunk.lesson_number,
             "chunk_index": chunk.chunk_index
         } for chunk in chunks]
-        # Use title with chunk index for unique IDs
-        ids = [f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}" for chunk in chunks]
+        ids = [self.get_chunk_id(chunk) for chunk in chunks]
         
-        self.course_content.add(
+        self.course_content.upsert(
             documents=documents,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            embeddings=embeddings
         )
+        self.index_version += 1
+    
+    def delete_course(self, course_title: str, chunk_ids: Optional[List[str]] = None):
+        """
+        Delete a course from the catalog together with its content chunks.
+        
+        Args:
+            course_title: Title (ID) of the course
+            chunk_ids: IDs of the chunks to delete (all chunks of the course if None)
+        """
+        self.index_version += 1
+        try:
+            self.course_catalog.delete(ids=[course_title])
+            with self._catalog_lock:
+                if self._catalog is not None:
+                    self._unindex_course(course_title)
+            if chunk_ids is not None:
+                self.delete_chunks(chunk_ids)
+            else:
+                self.course_content.delete(where={"course_title": course_title})
+        except Exception as e:
+            print(f"Error deleting course {course_title}: {e}")
+    
+    def delete_chunks(self, chunk_ids: List[str]):
+        """Delete content chunks by ID"""
+        if chunk_ids:
+            self.course_content.delete(ids=chunk_ids)
+            self.index_version += 1
     
     def clear_all_data(self):
         """Clear all data from both collections"""
+        self.index_version += 1
         try:
             self.client.delete_collection("course_catalog")
             self.client.delete_collection("course_content")
             # Recreate collections
             self.course_catalog = self._create_collection("course_catalog")
             self.course_content = self._create_collection("course_content")
+            with self._catalog_lock:
+                self._catalog = {}
+                self._lesson_links = {}
+                self._normalized_titles = {}
         except Exception as e:
             print(f"Error clearing data: {e}")
     
@@ -215,53 +281,110 @@ class VectorStore:
     
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
         try:
-            results = self.course_catalog.get()
-            if results and 'metadatas' in results:
-                # Parse lessons JSON for each course
-                parsed_metadata = []
-                for metadata in results['metadatas']:
-                    course_meta = metadata.copy()
-                    if 'lessons_json' in course_meta:
-                        course_meta['lessons'] = json.loads(course_meta['lessons_json'])
-                        del course_meta['lessons_json']  # Remove the JSON string version
-                    parsed_metadata.append(course_meta)
-                return parsed_metadata
-            return []
+            return [dict(metadata) for metadata in self._get_catalog().values()]
         except Exception as e:
             print(f"Error getting courses metadata: {e}")
             return []
+    
+    def get_course_metadata(self, course_title: str) -> Optional[Dict[str, Any]]:
+        """Get parsed metadata (with lessons list) for a course title"""
+        try:
+            metadata = self._get_catalog().get(course_title)
+            return dict(metadata) if metadata is not None else None
+        except Exception as e:
+            print(f"Error getting course metadata: {e}")
+            return None
 
     def get_course_link(self, course_title: str) -> Optional[str]:
         """Get course link for a given course title"""
         try:
-            # Get course by ID (title is the ID)
-            results = self.course_catalog.get(ids=[course_title])
-            if results and 'metadatas' in results and results['metadatas']:
-                metadata = results['metadatas'][0]
-                return metadata.get('course_link')
-            return None
+            metadata = self._get_catalog().get(course_title)
+            return metadata.get('course_link') if metadata is not None else None
         except Exception as e:
             print(f"Error getting course link: {e}")
             return None
     
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
         try:
-            # Get course by ID (title is the ID)
-            results = self.course_catalog.get(ids=[course_title])
-            if results and 'metadatas' in results and results['metadatas']:
-                metadata = results['metadatas'][0]
-                lessons_json = metadata.get('lessons_json')
-                if lessons_json:
-                    lessons = json.loads(lessons_json)
-                    # Find the lesson with matching number
-                    for lesson in lessons:
-                        if lesson.get('lesson_number') == lesson_number:
-                            return lesson.get('lesson_link')
-            return None
+            self._get_catalog()
+            return self._lesson_links.get(course_title, {}).get(lesson_number)
         except Exception as e:
             print(f"Error getting lesson link: {e}")
-    
\ No newline at end of file
+            return None
+    
+    def _get_catalog(self) -> Dict[str, Dict[str, Any]]:
+        """Return the catalog index, loading it from ChromaDB on first use"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        with self._catalog_lock:
+            if self._catalog is None:
+                results = self.course_catalog.get()
+                self._catalog = {}
+                self._lesson_links = {}
+                self._normalized_titles = {}
+                for metadata in (results or {}).get('metadatas') or []:
+                    self._index_course(metadata)
+            return self._catalog
+    
+    def _index_course(self, metadata: Dict[str, Any]):
+        """Add a course's catalog metadata to the index (caller holds the lock)"""
+        course_meta = dict(metadata)
+        if 'lessons_json' in course_meta:
+            course_meta['lessons'] = json.loads(course_meta['lessons_json'])
+            del course_meta['lessons_json']  # Remove the JSON string version
+        title = course_meta['title']
+        self._catalog[title] = course_meta
+        self._lesson_links[title] = {
+            lesson.get('lesson_number'): lesson.get('lesson_link')
+            for lesson in course_meta.get('lessons', [])
+        }
+        self._normalized_titles[self._normalize_title(title)] = title
+    
+    def _unindex_course(self, course_title: str):
+        """Remove a course from the index (caller holds the lock)"""
+        self._catalog.pop(course_title, None)
+        self._lesson_links.pop(course_title, None)
+        self._normalized_titles.pop(self._normalize_title(course_title), None)
+    
+    @staticmethod
+    def _normalize_title(title: str) -> str:
+        """Lowercase and collapse punctuation/whitespace for title matching"""
+        return ' '.join(re.sub(r'[^\w]+', ' ', title.lower()).split())
+    
+    def _match_course_title(self, course_name: str) -> Optional[str]:
+        """
+        Match a course name against the catalog without an embedding query.
+        
+        Tries an exact (normalized) match, then a course name contained in
+        exactly one title, then a close fuzzy match. Returns None when there is
+        no unambiguous match so the caller falls back to semantic search.
+        """
+        try:
+            self._get_catalog()
+        except Exception as e:
+            print(f"Error loading course catalog: {e}")
+            return None
+        
+        name = self._normalize_title(course_name)
+        if not name:
+            return None
+        normalized_titles = self._normalized_titles
+        
+        title = normalized_titles.get(name)
+        if title:
+            return title
+        
+        contained = [title for normalized, title in list(normalized_titles.items())
+                     if re.search(rf'\b{re.escape(name)}\b', normalized)]
+        if len(contained) == 1:
+            return contained[0]
+        if contained:
+            return None
+        
+        close = difflib.get_close_matches(name, list(normalized_titles), n=2, cutoff=0.85)
+        if len(close) == 1:
+            return normalized_titles.get(close[0])
+        return None
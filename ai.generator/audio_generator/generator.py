@@ -6,13 +6,16 @@ import os
 import sys
 import asyncio
 import subprocess
-from typing import List, Dict, Any, Optional
+import io
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import numpy as np
 
 import azure.cognitiveservices.speech as speechsdk
 from pydub import AudioSegment as PydubAudioSegment
-import requests
+import httpx
 
 from shared.config import get_settings
 from .models import (
@@ -72,6 +75,86 @@ class AudioGenerator:
         
         # 检查Windows PowerShell TTS
         self.windows_tts_available = self._check_windows_tts()
+        
+        # 阻塞型引擎（Azure SDK、PowerShell、ChatTTS、pydub）在线程池中运行，不阻塞事件循环
+        self.executor = ThreadPoolExecutor(thread_name_prefix="tts")
+        
+        # 每个提供商同时进行的合成任务数
+        self.concurrency_limits = {
+            "azure": settings.AZURE_TTS_CONCURRENCY,
+            "elevenlabs": settings.ELEVENLABS_CONCURRENCY,
+            "windows": settings.WINDOWS_TTS_CONCURRENCY,
+            "chattts": settings.CHATTTS_CONCURRENCY,
+        }
+        
+        # 信号量和HTTP会话绑定到事件循环，首次使用时创建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._limiters: Dict[str, asyncio.Semaphore] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+    
+    async def __aenter__(self) -> "AudioGenerator":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _bind_loop(self):
+        """
+        事件循环变化时（如多次asyncio.run）重建信号量和HTTP会话，并关闭旧的HTTP会话
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._limiters = {}
+            await self._close_http_client()
+    
+    async def _get_limiter(self, provider: str) -> asyncio.Semaphore:
+        """
+        获取提供商的并发限制信号量
+        """
+        await self._bind_loop()
+        if provider not in self._limiters:
+            limit = max(1, self.concurrency_limits.get(provider, 1))
+            self._limiters[provider] = asyncio.Semaphore(limit)
+        return self._limiters[provider]
+    
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        获取云端提供商共享的异步HTTP会话（复用连接）
+        """
+        await self._bind_loop()
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.TTS_HTTP_TIMEOUT, connect=10.0)
+            )
+        return self._http_client
+    
+    async def _run_blocking(self, func, *args):
+        """
+        在线程池中运行阻塞调用
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    async def close(self):
+        """
+        关闭HTTP会话并停止线程池，关闭后不能再使用该生成器。
+        使用完生成器后调用，或使用 async with AudioGenerator() as generator
+        """
+        await self._close_http_client()
+        self.executor.shutdown(wait=False)
+    
+    async def _close_http_client(self):
+        """
+        关闭HTTP会话
+        """
+        client, self._http_client = self._http_client, None
+        if client is not None:
+            try:
+                await client.aclose()
+            except Exception as e:
+                # 创建会话的事件循环已关闭时，连接已随循环释放
+                print(f"关闭HTTP会话失败: {e}")
     
     async def generate_audio(self, request: AudioGenerationRequest) -> AudioGenerationResponse:
         """
@@ -98,17 +181,27 @@ class AudioGenerator:
             
             voice = request.voice or self._get_default_voice(provider, request.language)
             
-            # 批量处理段落
-            for i in range(0, len(request.segments), request.batch_size):
-                batch = request.segments[i:i + request.batch_size]
-                
-                # 生成批次中的每个段落
-                for seg_info in batch:
-                    text = seg_info.get('text', '')
-                    index = seg_info.get('index', 0)
-                    
-                    # 生成音频
-                    result = await self._generate_single_audio(
+            jobs = [(seg_info.get('text', ''), seg_info.get('index', 0)) for seg_info in request.segments]
+            
+            if provider == "chattts":
+                # ChatTTS每批只调用一次infer，批次间由信号量控制
+                batch_size = max(1, request.batch_size)
+                batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+                results = await asyncio.gather(*(
+                    self._generate_chattts_batch(
+                        batch,
+                        voice=voice,
+                        output_format=request.output_format,
+                        project_id=request.project_id,
+                        output_dir=request.output_dir
+                    )
+                    for batch in batches
+                ))
+                segments = [segment for batch_segments in results for segment in batch_segments]
+            else:
+                # 所有段落同时提交，由提供商的信号量限制并发数
+                segments = list(await asyncio.gather(*(
+                    self._generate_single_audio(
                         text=text,
                         voice=voice,
                         provider=provider,  # 使用实际选择的provider
@@ -118,8 +211,11 @@ class AudioGenerator:
                         project_id=request.project_id,
                         output_dir=request.output_dir
                     )
-                    
-                    segments.append(result)
+                    for text, index in jobs
+                )))
+            
+            # 按段落序号输出
+            segments.sort(key=lambda seg: seg.index)
             
             # 计算总时长
             total_duration = sum(seg.duration or 0 for seg in segments)
@@ -168,53 +264,124 @@ class AudioGenerator:
         """
         try:
             # 生成文件路径
-            filename = f"{project_id}_audio_{index:04d}.{output_format}"
-            # 使用自定义输出目录或默认目录
-            if output_dir:
-                output_path = Path(output_dir) / "audio" / filename
-            else:
-                output_path = settings.OUTPUT_DIR / "audio" / filename
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 根据提供商生成音频
-            if provider == "azure":
-                audio_data, duration = await self._generate_with_azure(text, voice, output_format)
-            elif provider == "elevenlabs":
-                audio_data, duration = await self._generate_with_elevenlabs(text, voice, output_format)
-            elif provider == "windows":
-                audio_data, duration = await self._generate_with_windows(text, voice, output_format)
-            elif provider == "chattts":
-                audio_data, duration = await self._generate_with_chattts(text, voice, output_format)
-            else:
-                raise ValueError(f"不支持的TTS提供商: {provider}")
-            
-            # 保存音频文件
-            with open(output_path, 'wb') as f:
-                f.write(audio_data)
-            
-            # 获取文件大小
-            file_size = os.path.getsize(output_path)
-            
-            return AudioSegment(
-                index=index,
-                text=text,
-                file_path=str(output_path),
-                duration=duration,
-                voice=voice,
-                provider=provider,
-                file_size=file_size,
-                status="completed"
-            )
+            output_path = self._get_output_path(project_id, index, output_format, output_dir)
+            
+            # 根据提供商生成音频，同一提供商的并发数受信号量限制
+            async with await self._get_limiter(provider):
+                if provider == "azure":
+                    audio_data, duration = await self._generate_with_azure(text, voice, output_format)
+                elif provider == "elevenlabs":
+                    audio_data, duration = await self._generate_with_elevenlabs(text, voice, output_format)
+                elif provider == "windows":
+                    audio_data, duration = await self._generate_with_windows(text, voice, output_format)
+                elif provider == "chattts":
+                    audio_data, duration = await self._generate_with_chattts(text, voice, output_format)
+                else:
+                    raise ValueError(f"不支持的TTS提供商: {provider}")
             
+            return self._save_segment(output_path, audio_data, duration, index, text, voice, provider)
+        
         except Exception as e:
-            return AudioSegment(
-                index=index,
-                text=text,
-                voice=voice,
-                provider=provider,
-                status="failed",
-                error_message=str(e)
-            )
+            return self._failed_segment(index, text, voice, provider, e)
+    
+    async def _generate_chattts_batch(
+        self,
+        jobs: List[Tuple[str, int]],
+        voice: str,
+        output_format: str,
+        project_id: str,
+        output_dir: Optional[str] = None
+    ) -> List[AudioSegment]:
+        """
+        使用ChatTTS生成一批段落，整批文本只调用一次infer
+        """
+        try:
+            async with await self._get_limiter("chattts"):
+                results = await self._run_blocking(
+                    self._synthesize_with_chattts,
+                    [text for text, _ in jobs],
+                    output_format
+                )
+        except Exception as e:
+            return [self._failed_segment(index, text, voice, "chattts", e) for text, index in jobs]
+        
+        segments = []
+        for (text, index), (audio_data, duration) in zip(jobs, results):
+            try:
+                output_path = self._get_output_path(project_id, index, output_format, output_dir)
+                segments.append(self._save_segment(output_path, audio_data, duration, index, text, voice, "chattts"))
+            except Exception as e:
+                segments.append(self._failed_segment(index, text, voice, "chattts", e))
+        return segments
+    
+    def _get_output_path(
+        self,
+        project_id: str,
+        index: int,
+        output_format: str,
+        output_dir: Optional[str] = None
+    ) -> Path:
+        """
+        获取段落音频文件路径
+        """
+        filename = f"{project_id}_audio_{index:04d}.{output_format}"
+        # 使用自定义输出目录或默认目录
+        if output_dir:
+            output_path = Path(output_dir) / "audio" / filename
+        else:
+            output_path = settings.OUTPUT_DIR / "audio" / filename
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return output_path
+    
+    def _save_segment(
+        self,
+        output_path: Path,
+        audio_data: bytes,
+        duration: float,
+        index: int,
+        text: str,
+        voice: str,
+        provider: str
+    ) -> AudioSegment:
+        """
+        保存音频文件并返回完成的段落
+        """
+        with open(output_path, 'wb') as f:
+            f.write(audio_data)
+        
+        # 获取文件大小
+        file_size = os.path.getsize(output_path)
+        
+        return AudioSegment(
+            index=index,
+            text=text,
+            file_path=str(output_path),
+            duration=duration,
+            voice=voice,
+            provider=provider,
+            file_size=file_size,
+            status="completed"
+        )
+    
+    def _failed_segment(
+        self,
+        index: int,
+        text: str,
+        voice: str,
+        provider: str,
+        error: Exception
+    ) -> AudioSegment:
+        """
+        生成失败的段落
+        """
+        return AudioSegment(
+            index=index,
+            text=text,
+            voice=voice,
+            provider=provider,
+            status="failed",
+            error_message=str(error)
+        )
     
     async def _generate_with_azure(
         self,
@@ -238,15 +405,15 @@ class AudioGenerator:
         # 创建合成器
         synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.azure_config, audio_config=None)
         
-        # 生成语音
-        result = synthesizer.speak_text_async(text).get()
+        # 生成语音，在线程池中等待SDK返回结果
+        result = await self._run_blocking(synthesizer.speak_text_async(text).get)
         
         if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
             # 获取音频数据
             audio_data = result.audio_data
             
             # 估算时长（Azure不直接返回时长，根据音频数据估算）
-            duration = self._estimate_duration(audio_data, output_format)
+            duration = await self._run_blocking(self._estimate_duration, audio_data, output_format)
             
             return audio_data, duration
         else:
@@ -278,17 +445,18 @@ class AudioGenerator:
             }
         }
         
-        response = requests.post(url, json=data, headers=headers)
+        client = await self._get_http_client()
+        response = await client.post(url, json=data, headers=headers)
         
         if response.status_code == 200:
             audio_data = response.content
             
             # 如果需要其他格式，进行转换
             if output_format != "mp3":
-                audio_data = self._convert_audio_format(audio_data, "mp3", output_format)
+                audio_data = await self._run_blocking(self._convert_audio_format, audio_data, "mp3", output_format)
             
             # 估算时长
-            duration = self._estimate_duration(audio_data, output_format)
+            duration = await self._run_blocking(self._estimate_duration, audio_data, output_format)
             
             return audio_data, duration
         else:
@@ -378,7 +546,18 @@ class AudioGenerator:
         output_format: str
     ) -> tuple[bytes, float]:
         """
-        使用Windows PowerShell TTS生成音频
+        使用Windows PowerShell TTS生成音频（在线程池中运行）
+        """
+        return await self._run_blocking(self._synthesize_with_windows, text, voice, output_format)
+    
+    def _synthesize_with_windows(
+        self,
+        text: str,
+        voice: str,
+        output_format: str
+    ) -> tuple[bytes, float]:
+        """
+        调用PowerShell合成语音（阻塞）
         """
         import tempfile
         import json
@@ -552,7 +731,8 @@ class AudioGenerator:
             url = f"{self.elevenlabs_base_url}/voices"
             headers = {"xi-api-key": self.elevenlabs_api_key}
             
-            response = requests.get(url, headers=headers)
+            client = await self._get_http_client()
+            response = await client.get(url, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -582,15 +762,26 @@ class AudioGenerator:
         output_format: str
     ) -> tuple[bytes, float]:
         """
-        使用ChatTTS生成音频
+        使用ChatTTS生成单个段落的音频（在线程池中运行）
+        """
+        results = await self._run_blocking(self._synthesize_with_chattts, [text], output_format)
+        return results[0]
+    
+    def _synthesize_with_chattts(
+        self,
+        texts: List[str],
+        output_format: str
+    ) -> List[tuple[bytes, float]]:
+        """
+        使用ChatTTS一次推理整批文本（阻塞），按输入顺序返回每段的音频数据和时长
         """
         if not chat_tts_available:
             raise Exception("ChatTTS不可用，请检查模型是否正确加载")
         
         try:
-            # ChatTTS生成音频
+            # ChatTTS批量生成音频
             wavs = chat_tts.infer(
-                text=[text],
+                text=texts,
                 stream=False,
                 lang="zh",
                 skip_refine_text=False,
@@ -599,16 +790,15 @@ class AudioGenerator:
             )
             
             # 获取音频数据
-            if wavs and len(wavs) > 0:
-                audio_array = wavs[0]
-                
+            if not wavs or len(wavs) != len(texts):
+                raise Exception("ChatTTS未生成音频数据")
+            
+            results = []
+            for audio_array in wavs:
                 # 转换为16-bit PCM WAV格式
                 audio_array = (audio_array * 32767).astype(np.int16)
                 
                 # 创建WAV文件头
-                import wave
-                import io
-                
                 wav_buffer = io.BytesIO()
                 with wave.open(wav_buffer, 'wb') as wav_file:
                     wav_file.setnchannels(1)  # 单声道
@@ -625,9 +815,9 @@ class AudioGenerator:
                 if output_format != "wav":
                     audio_data = self._convert_audio_format(audio_data, "wav", output_format)
                 
-                return audio_data, duration
-            else:
-                raise Exception("ChatTTS未生成音频数据")
+                results.append((audio_data, duration))
+            
+            return results
                 
         except Exception as e:
             raise Exception(f"ChatTTS生成失败: {str(e)}")
@@ -67,6 +67,7 @@ class Settings(BaseSettings):
     VIDEO_CODEC: str = "libx264"
     VIDEO_QUALITY: int = 23  # CRF值 (0-51, 越低质量越高)
     VIDEO_PRESET: str = "medium"  # ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow
+    VIDEO_RENDER_WORKERS: int = 0  # 并行渲染的FFmpeg进程数，0表示按CPU核数自动选择
     
     # ==================== FFmpeg配置 ====================
     FFMPEG_PATH: Optional[str] = None  # FFmpeg可执行文件路径
@@ -84,6 +85,13 @@ class Settings(BaseSettings):
     AUDIO_QUALITY: str = "high"  # low, medium, high
     AUDIO_BATCH_SIZE: int = 5  # 批量处理大小
     
+    # 各提供商同时进行的合成任务数
+    AZURE_TTS_CONCURRENCY: int = 4
+    ELEVENLABS_CONCURRENCY: int = 3
+    WINDOWS_TTS_CONCURRENCY: int = 2  # 每个任务启动一个PowerShell进程
+    CHATTTS_CONCURRENCY: int = 1  # 同时推理的批次数（共享同一个模型）
+    TTS_HTTP_TIMEOUT: float = 60.0  # 云端TTS请求超时（秒）
+    
     # ==================== 日志配置 ====================
     LOG_LEVEL: str = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
     LOG_FILE_MAX_SIZE: int = 10 * 1024 * 1024  # 10MB
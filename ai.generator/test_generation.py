@@ -88,9 +88,6 @@ async def test_audio_generation(project_id: str, segments):
     eleven_status = "已配置" if settings.ELEVENLABS_API_KEY else "未配置"
     print(f"  - ElevenLabs: {eleven_status}")
     
-    # 创建音频生成器
-    audio_gen = AudioGenerator()
-    
     # 处理所有段落
     test_segments = [seg.model_dump() for seg in segments]
     
@@ -104,8 +101,9 @@ async def test_audio_generation(project_id: str, segments):
         output_dir=str(output_session_dir)
     )
     
-    # 生成音频
-    result = await audio_gen.generate_audio(request)
+    # 生成音频，结束后关闭生成器的HTTP会话
+    async with AudioGenerator() as audio_gen:
+        result = await audio_gen.generate_audio(request)
     
     print(f"\n✓ 音频生成完成！")
     print(f"  - 状态: {result.status}")
@@ -0,0 +1,11 @@
+"""
+测试配置
+"""
+import os
+import sys
+from pathlib import Path
+
+# 测试中不加载ChatTTS模型
+os.environ.setdefault("CHATTTS_ENABLED", "False")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
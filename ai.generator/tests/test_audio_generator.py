@@ -0,0 +1,110 @@
+"""
+音频生成器调度测试
+"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import audio_generator.generator as generator_module
+from audio_generator import AudioGenerator, AudioGenerationRequest
+
+
+def make_request(tmp_path, provider, count, **kwargs):
+    """生成序号倒序的请求，检查输出是否按序号排序"""
+    segments = [{"text": "x" * (i + 1), "index": i} for i in reversed(range(count))]
+    return AudioGenerationRequest(
+        project_id="test",
+        segments=segments,
+        provider=provider,
+        output_format="wav",
+        output_dir=str(tmp_path),
+        **kwargs
+    )
+
+
+def test_provider_concurrency_is_limited(tmp_path):
+    generator = AudioGenerator()
+    generator.concurrency_limits["windows"] = 2
+    
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+    
+    def fake_synthesize(text, voice, output_format):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return b"audio", float(len(text))
+    
+    generator._synthesize_with_windows = fake_synthesize
+    
+    async def run():
+        async with generator:
+            return await generator.generate_audio(make_request(tmp_path, "windows", 6))
+    
+    result = asyncio.run(run())
+    
+    assert result.status == "success"
+    assert state["peak"] == 2
+    assert [seg.index for seg in result.segments] == list(range(6))
+    assert [seg.duration for seg in result.segments] == [float(i + 1) for i in range(6)]
+    
+    # 退出 async with 后线程池已停止，工作线程随之退出
+    with pytest.raises(RuntimeError):
+        generator.executor.submit(time.sleep, 0)
+    for thread in threading.enumerate():
+        if thread.name.startswith("tts"):
+            thread.join(timeout=1)
+    assert not [t for t in threading.enumerate() if t.name.startswith("tts")]
+
+
+def test_chattts_batches_keep_segment_order(tmp_path, monkeypatch):
+    calls = []
+    
+    class FakeChat:
+        def infer(self, text, **kwargs):
+            calls.append(list(text))
+            # 每段音频长度由文本长度决定，单位为0.1秒
+            return [np.zeros(len(t) * 2400, dtype=np.float32) for t in text]
+    
+    monkeypatch.setattr(generator_module, "chat_tts", FakeChat())
+    monkeypatch.setattr(generator_module, "chat_tts_available", True)
+    
+    generator = AudioGenerator()
+    generator.concurrency_limits["chattts"] = 2
+    
+    async def run():
+        async with generator:
+            return await generator.generate_audio(make_request(tmp_path, "chattts", 5, batch_size=2))
+    
+    result = asyncio.run(run())
+    
+    assert result.status == "success"
+    assert sorted(len(batch) for batch in calls) == [1, 2, 2]
+    assert [seg.index for seg in result.segments] == list(range(5))
+    for seg in result.segments:
+        assert seg.status == "completed"
+        assert seg.text == "x" * (seg.index + 1)
+        assert abs(seg.duration - (seg.index + 1) * 0.1) < 1e-9
+
+
+def test_http_client_closed_when_loop_changes():
+    generator = AudioGenerator()
+    
+    async def get_client():
+        return await generator._get_http_client()
+    
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    
+    assert first is not second
+    assert first.is_closed
+    
+    asyncio.run(generator.close())
+    assert second.is_closed
+    assert generator._http_client is None
@@ -0,0 +1,212 @@
+"""
+视频生成器渲染模式测试
+"""
+import asyncio
+import subprocess
+
+import pytest
+
+import video_generator.generator as generator_module
+from video_generator import VideoGenerator, VideoGenerationRequest
+
+WIDTH, HEIGHT, FPS = 64, 36, 10
+SAMPLE_RATE = 8000
+
+
+SUBTITLE = "时间: 10:30, 'quoted' [note] 100% C:\\path"
+
+
+@pytest.fixture
+def ffmpeg_generator():
+    generator = VideoGenerator()
+    if not generator.ffmpeg_path:
+        pytest.skip("FFmpeg未找到")
+    return generator
+
+
+@pytest.fixture
+def generator(ffmpeg_generator, monkeypatch):
+    # 时长与文字无关，不依赖drawtext滤镜和字体文件
+    monkeypatch.setattr(ffmpeg_generator, "_build_drawtext", lambda *args, **kwargs: "null")
+    return ffmpeg_generator
+
+
+def make_audio(generator, path, seconds):
+    subprocess.run(
+        [generator.ffmpeg_path, '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}', str(path)],
+        capture_output=True,
+        check=True
+    )
+    return str(path)
+
+
+def decode(generator, path, *args):
+    result = subprocess.run(
+        [generator.ffmpeg_path, '-i', str(path), *args, '-'],
+        capture_output=True,
+        check=True
+    )
+    return len(result.stdout)
+
+
+def media_durations(generator, path):
+    """解码后按样本数和帧数计算音频、视频时长"""
+    audio_bytes = decode(generator, path, '-map', '0:a', '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE))
+    video_bytes = decode(generator, path, '-map', '0:v', '-f', 'rawvideo', '-pix_fmt', 'gray')
+    return audio_bytes / 2 / SAMPLE_RATE, video_bytes / (WIDTH * HEIGHT) / FPS
+
+
+def render(generator, tmp_path, render_mode, audio_files):
+    request = VideoGenerationRequest(
+        project_id=render_mode,
+        segments=[{"text": f"段落{i}", "index": i} for i in range(1, len(audio_files) + 1)],
+        duration=1.0,
+        resolution=f"{WIDTH}x{HEIGHT}",
+        fps=FPS,
+        audio_files=audio_files,
+        render_mode=render_mode,
+        output_dir=str(tmp_path)
+    )
+    result = asyncio.run(generator.generate_video(request))
+    assert result.status == "success"
+    assert all(seg.status == "completed" for seg in result.segments)
+    return result
+
+
+def test_render_modes_pad_and_trim_audio_alike(generator, tmp_path):
+    # 段落音频分别短于、长于段落时长，以及没有音频
+    audio_files = [
+        make_audio(generator, tmp_path / "short.wav", 0.4),
+        make_audio(generator, tmp_path / "long.wav", 2.5),
+        None
+    ]
+    
+    segments_result = render(generator, tmp_path, "segments", audio_files)
+    for seg in segments_result.segments:
+        audio, video = media_durations(generator, seg.file_path)
+        assert audio == pytest.approx(1.0, abs=0.05)
+        assert video == pytest.approx(1.0, abs=0.05)
+    
+    single_result = render(generator, tmp_path, "single", audio_files)
+    
+    merged = media_durations(generator, segments_result.metadata["final_video_path"])
+    single = media_durations(generator, single_result.metadata["final_video_path"])
+    assert single[0] == pytest.approx(3.0, abs=0.05)
+    assert single[1] == pytest.approx(3.0, abs=0.05)
+    # 流复制合并时每段AAC编码器延迟会累积（约两帧），因此音频按段数放宽
+    assert merged[0] == pytest.approx(single[0], abs=0.05 * len(audio_files))
+    assert merged[1] == pytest.approx(single[1], abs=0.05)
+
+
+def run_filter_script(generator, tmp_path, filtergraph, *args):
+    """按单次渲染模式的方式从脚本文件读取滤镜图并运行FFmpeg"""
+    script_file = tmp_path / "filtergraph.txt"
+    script_file.write_text(filtergraph, encoding='utf-8')
+    return subprocess.run(
+        [generator.ffmpeg_path, '-hide_banner', '-f', 'lavfi', '-i', f'nullsrc=s={WIDTH}x{HEIGHT}:r={FPS}:d=3',
+         *generator._filter_script_args(script_file), *args],
+        capture_output=True,
+        check=True
+    )
+
+
+def test_single_pass_filter_script(tmp_path, monkeypatch):
+    generator = VideoGenerator()
+    generator.ffmpeg_path = "ffmpeg"
+    scripts = []
+    
+    async def fake_run_ffmpeg(cmd):
+        script_file = cmd[cmd.index(generator._filter_script_args("")[0]) + 1]
+        with open(script_file, encoding='utf-8') as f:
+            scripts.append(f.read())
+        return 0, ""
+    
+    monkeypatch.setattr(generator, "_run_ffmpeg", fake_run_ffmpeg)
+    
+    request = VideoGenerationRequest(
+        project_id="script",
+        segments=[{"text": SUBTITLE, "index": 1}, {"text": "第二段", "index": 2}],
+        duration=1.5,
+        resolution=f"{WIDTH}x{HEIGHT}",
+        fps=FPS,
+        font_family="C:/Windows/Fonts/simhei.ttf",
+        render_mode="single",
+        output_dir=str(tmp_path)
+    )
+    result = asyncio.run(generator.generate_video(request))
+    assert result.status == "success"
+    
+    [script] = scripts
+    video_chain = script.split(";\n")[0]
+    # 先按选项转义 \ ' :，再按滤镜图转义 \ ' , ; [ ]
+    assert (
+        "drawtext=text=时间\\\\: 10\\\\:30\\, \\\\\\'quoted\\\\\\' \\[note\\] 100% C\\\\:\\\\\\\\path"
+        ":expansion=none:fontfile=C\\\\:/Windows/Fonts/simhei.ttf"
+    ) in video_chain
+    assert ":enable=gte(t\\,0.0)*lt(t\\,1.5)," in video_chain
+    assert ":enable=gte(t\\,1.5)*lt(t\\,3.0)[v]" in video_chain
+
+
+def test_escaped_values_parse_back(ffmpeg_generator, tmp_path):
+    value = ffmpeg_generator._escape_filter_value(SUBTITLE)
+    result = run_filter_script(
+        ffmpeg_generator, tmp_path,
+        f"metadata=mode=add:key=subtitle:value={value},metadata=mode=print:key=subtitle",
+        '-frames:v', '1', '-f', 'null', '-'
+    )
+    assert f"subtitle={SUBTITLE}\n" in result.stderr.decode('utf-8')
+
+
+def test_enable_windows_select_segment_frames(ffmpeg_generator, tmp_path):
+    # 每个段落的启用窗口只覆盖自己的时间段：第二段（1-2秒）画白色方块
+    enable = ffmpeg_generator._escape_filter_value("gte(t,1.0)*lt(t,2.0)")
+    result = run_filter_script(
+        ffmpeg_generator, tmp_path,
+        f"format=gray,drawbox=c=white:t=fill:enable={enable}",
+        '-f', 'rawvideo', '-pix_fmt', 'gray', '-'
+    )
+    frames = [result.stdout[i:i + WIDTH * HEIGHT] for i in range(0, len(result.stdout), WIDTH * HEIGHT)]
+    lit = [i for i, frame in enumerate(frames) if frame[0] > 128]
+    assert len(frames) == 3 * FPS
+    assert lit == list(range(FPS, 2 * FPS))
+
+
+def test_image_renderer_streams_one_static_frame(tmp_path, monkeypatch):
+    appended = []
+    
+    class RecordingWriter:
+        def __init__(self, path, **kwargs):
+            self.path = path
+        
+        def __enter__(self):
+            return self
+        
+        def __exit__(self, *exc):
+            return False
+        
+        def append_data(self, frame):
+            appended.append(frame)
+    
+    monkeypatch.setattr(generator_module.imageio, "get_writer", RecordingWriter)
+    
+    ok = VideoGenerator()._generate_video_with_images(
+        text="静态文字",
+        keywords=[],
+        output_path=str(tmp_path / "images.mp4"),
+        width=WIDTH,
+        height=HEIGHT,
+        fps=FPS,
+        duration=2.5,
+        background_style="solid",
+        font_family="SimHei",
+        font_size=12,
+        font_color="#FFFFFF",
+        background_color="#1A1A2E"
+    )
+    
+    assert ok
+    assert len(appended) == int(2.5 * FPS)
+    # 所有帧是同一个数组，不随时长累积
+    assert all(frame is appended[0] for frame in appended)
+    assert appended[0].shape == (HEIGHT, WIDTH, 3)
+    assert (appended[0] != appended[0][0, 0]).any()  # 画面上有文字
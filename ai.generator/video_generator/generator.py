@@ -3,8 +3,10 @@
 """
 import time
 import os
+import asyncio
+import re
 import subprocess
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import random
 
@@ -23,6 +25,9 @@ from .models import (
 
 settings = get_settings()
 
+# 输出音轨采样率（与帧率无关）
+AUDIO_SAMPLE_RATE = 44100
+
 
 class VideoGenerator:
     """视频生成器 - 使用FFmpeg"""
@@ -34,6 +39,7 @@ class VideoGenerator:
         
         # 获取FFmpeg路径
         self.ffmpeg_path = self._get_ffmpeg_path()
+        self.ffmpeg_version = self._get_ffmpeg_version()
     
     def _get_ffmpeg_path(self) -> str:
         """获取FFmpeg路径"""
@@ -54,6 +60,91 @@ class VideoGenerator:
         except:
             return None
     
+    def _get_ffmpeg_version(self) -> Optional[int]:
+        """
+        获取FFmpeg主版本号，git构建（N-xxxxx）视为最新版本，无法识别时返回None
+        """
+        if not self.ffmpeg_path:
+            return None
+        try:
+            result = subprocess.run([self.ffmpeg_path, '-version'], capture_output=True, text=True)
+        except OSError:
+            return None
+        match = re.search(r'ffmpeg version n?(\d+)\.', result.stdout)
+        if match:
+            return int(match.group(1))
+        if re.search(r'ffmpeg version N-', result.stdout):
+            return 99
+        return None
+    
+    def _filter_script_args(self, script_file: Path) -> List[str]:
+        """
+        从文件读取滤镜图的参数：FFmpeg 7起使用 -/filter_complex，
+        更早的版本使用 -filter_complex_script（FFmpeg 7中已弃用）
+        """
+        if self.ffmpeg_version is not None and self.ffmpeg_version >= 7:
+            return ['-/filter_complex', str(script_file)]
+        return ['-filter_complex_script', str(script_file)]
+    
+    def _get_render_workers(self, job_count: int) -> int:
+        """
+        获取并行渲染的FFmpeg进程数（默认按CPU核数，每个进程再使用多个编码线程）
+        """
+        workers = settings.VIDEO_RENDER_WORKERS or max(1, (os.cpu_count() or 1) // 2)
+        return max(1, min(workers, job_count))
+    
+    async def _run_ffmpeg(self, cmd: List[str]) -> Tuple[int, str]:
+        """
+        异步运行FFmpeg命令，返回退出码和错误输出
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        return process.returncode, stderr.decode('utf-8', errors='ignore')
+    
+    async def _run_limited(self, limiter: asyncio.Semaphore, coro):
+        """
+        在并发限制内执行任务
+        """
+        async with limiter:
+            return await coro
+    
+    def _parse_segment(
+        self,
+        request: VideoGenerationRequest,
+        seg_info: Dict[str, Any]
+    ) -> Tuple[str, int, List[str], Optional[str]]:
+        """
+        解析段落信息，返回文本、序号、关键词和对应的音频文件
+        """
+        text = seg_info.get('original_text', seg_info.get('text', ''))
+        index = seg_info.get('index', 0)
+        keywords = seg_info.get('keywords', [])
+        audio_file = None
+        
+        # 获取对应的音频文件
+        if request.audio_files and index - 1 < len(request.audio_files):
+            audio_file = request.audio_files[index - 1]
+        
+        return text, index, keywords, audio_file
+    
+    def _get_final_output_path(self, project_id: str, output_dir: Optional[str] = None) -> Path:
+        """
+        获取完整视频的输出路径
+        """
+        final_filename = f"{project_id}_final.mp4"
+        # 使用自定义输出目录或默认目录
+        if output_dir:
+            final_output_path = Path(output_dir) / "final" / final_filename
+        else:
+            final_output_path = settings.OUTPUT_DIR / "final" / final_filename
+        final_output_path.parent.mkdir(parents=True, exist_ok=True)
+        return final_output_path
+    
     async def generate_video(self, request: VideoGenerationRequest) -> VideoGenerationResponse:
         """
         生成视频
@@ -72,49 +163,51 @@ class VideoGenerator:
             render_config = RenderConfig(
                 width=width,
                 height=height,
-                fps=request.fps
+                fps=request.fps,
+                quality=settings.VIDEO_QUALITY,
+                preset=settings.VIDEO_PRESET
             )
             
-            # 为每个段落生成视频
-            for seg_info in request.segments:
-                text = seg_info.get('original_text', seg_info.get('text', ''))
-                index = seg_info.get('index', 0)
-                keywords = seg_info.get('keywords', [])
-                audio_file = None
+            final_video_path = None
+            if request.render_mode == "single":
+                # 单次FFmpeg调用渲染整个项目，不生成段落文件
+                segments, final_video_path = await self._generate_video_single_pass(request, render_config)
+            else:
+                # 并行渲染各段落，每个FFmpeg进程分得一部分CPU线程
+                workers = self._get_render_workers(len(request.segments))
+                render_config.threads = max(1, (os.cpu_count() or 1) // workers)
+                limiter = asyncio.Semaphore(workers)
                 
-                # 获取对应的音频文件
-                if request.audio_files and index - 1 < len(request.audio_files):
-                    audio_file = request.audio_files[index - 1]
+                segments = list(await asyncio.gather(*(
+                    self._run_limited(limiter, self._generate_single_video(
+                        text=text,
+                        keywords=keywords,
+                        index=index,
+                        project_id=request.project_id,
+                        duration=request.duration,
+                        render_config=render_config,
+                        background_style=request.background_style,
+                        text_animation=request.text_animation,
+                        highlight_keywords=request.highlight_keywords,
+                        font_family=request.font_family,
+                        font_size=request.font_size,
+                        font_color=request.font_color,
+                        background_color=request.background_color,
+                        audio_file=audio_file,  # 传入音频文件
+                        output_dir=request.output_dir  # 传入自定义输出目录
+                    ))
+                    for text, index, keywords, audio_file in (
+                        self._parse_segment(request, seg_info) for seg_info in request.segments
+                    )
+                )))
                 
-                # 生成视频段落（带音频）
-                result = await self._generate_single_video(
-                    text=text,
-                    keywords=keywords,
-                    index=index,
-                    project_id=request.project_id,
-                    duration=request.duration,
-                    render_config=render_config,
-                    background_style=request.background_style,
-                    text_animation=request.text_animation,
-                    highlight_keywords=request.highlight_keywords,
-                    font_family=request.font_family,
-                    font_size=request.font_size,
-                    font_color=request.font_color,
-                    background_color=request.background_color,
-                    audio_file=audio_file,  # 传入音频文件
-                    output_dir=request.output_dir  # 传入自定义输出目录
-                )
-                
-                segments.append(result)
-            
-            # 如果需要合并所有段落
-            final_video_path = None
-            if request.merge_segments and len(segments) > 1:
-                final_video_path = await self._merge_video_segments(
-                    project_id=request.project_id,
-                    segments=segments,
-                    output_dir=request.output_dir
-                )
+                # 如果需要合并所有段落
+                if request.merge_segments and len(segments) > 1:
+                    final_video_path = await self._merge_video_segments(
+                        project_id=request.project_id,
+                        segments=segments,
+                        output_dir=request.output_dir
+                    )
             
             # 计算总时长
             total_duration = sum(seg.duration or 0 for seg in segments)
@@ -127,7 +220,8 @@ class VideoGenerator:
                 "fps": request.fps,
                 "segment_count": len(segments),
                 "background_style": request.background_style,
-                "text_animation": request.text_animation
+                "text_animation": request.text_animation,
+                "render_mode": request.render_mode
             }
             
             if final_video_path:
@@ -184,13 +278,11 @@ class VideoGenerator:
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
             # 使用FFmpeg生成视频（带音频）
-            success = self._generate_video_with_ffmpeg(
+            success = await self._generate_video_with_ffmpeg(
                 text=text,
                 keywords=keywords,
                 output_path=str(output_path),
-                width=render_config.width,
-                height=render_config.height,
-                fps=render_config.fps,
+                render_config=render_config,
                 duration=duration,
                 background_style=background_style,
                 font_family=font_family,
@@ -227,14 +319,71 @@ class VideoGenerator:
                 error_message=str(e)
             )
     
-    def _generate_video_with_ffmpeg(
+    @staticmethod
+    def _escape_filter_value(value: str) -> str:
+        """
+        转义滤镜参数值：先按滤镜选项转义，再按滤镜图转义
+        """
+        for char in ('\\', "'", ':'):
+            value = value.replace(char, '\\' + char)
+        for char in ('\\', "'", ',', ';', '[', ']'):
+            value = value.replace(char, '\\' + char)
+        return value
+    
+    def _build_drawtext(
+        self,
+        text: str,
+        font_family: str,
+        font_size: int,
+        font_color: str,
+        enable: Optional[str] = None
+    ) -> str:
+        """
+        构建居中显示文字的drawtext滤镜，enable为启用该滤镜的时间表达式
+        """
+        drawtext = (
+            f"drawtext=text={self._escape_filter_value(text)}"
+            f":expansion=none"
+            f":fontfile={self._escape_filter_value(font_family)}"
+            f":fontsize={font_size}:fontcolor={font_color}"
+            f":x=(w-text_w)/2:y=(h-text_h)/2"
+        )
+        if enable:
+            drawtext += f":enable={self._escape_filter_value(enable)}"
+        return drawtext
+    
+    @staticmethod
+    def _audio_filter(duration: float) -> str:
+        """
+        段落音频滤镜：统一采样率和声道，不足补静音，超出截断为段落时长
+        """
+        return (
+            f"aresample={AUDIO_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+            f"apad,atrim=duration={duration},asetpts=PTS-STARTPTS"
+        )
+    
+    def _encoder_args(self, render_config: RenderConfig) -> List[str]:
+        """
+        视频和音频编码参数
+        """
+        args = [
+            '-c:v', render_config.codec,
+            '-c:a', 'aac',  # 音频编码
+            '-b:a', render_config.audio_bitrate,
+            '-preset', render_config.preset,
+            '-crf', str(render_config.quality),
+            '-pix_fmt', 'yuv420p'
+        ]
+        if render_config.threads:
+            args += ['-threads', str(render_config.threads)]
+        return args
+    
+    async def _generate_video_with_ffmpeg(
         self,
         text: str,
         keywords: List[str],
         output_path: str,
-        width: int,
-        height: int,
-        fps: int,
+        render_config: RenderConfig,
         duration: float,
         background_style: str,
         font_family: str,
@@ -250,63 +399,40 @@ class VideoGenerator:
             # 生成背景颜色
             bg_color = background_color.lstrip('#')
             
-            # 解析颜色
-            r = int(bg_color[0:2], 16)
-            g = int(bg_color[2:4], 16)
-            b = int(bg_color[4:6], 16)
-            
             # 创建FFmpeg命令
             # 使用color滤镜生成背景
             # 使用drawtext滤镜添加文字
             # 添加静音音轨
-            
-            # 处理文本（转义特殊字符）
-            escaped_text = text.replace('\\', '\\\\').replace(':', '\\:').replace("'", "\\'")
+            width, height, fps = render_config.width, render_config.height, render_config.fps
             
             # 构建FFmpeg命令
+            cmd = [
+                self.ffmpeg_path,
+                '-y',  # 覆盖输出文件
+                '-f', 'lavfi',  # 使用libavfilter输入
+                '-i', f'color=c=0x{bg_color}:s={width}x{height}:r={fps}:d={duration}',  # 纯色背景
+            ]
             if audio_file and os.path.exists(audio_file):
                 # 使用音频文件
-                cmd = [
-                    self.ffmpeg_path,
-                    '-y',  # 覆盖输出文件
-                    '-f', 'lavfi',  # 使用libavfilter输入
-                    '-i', f'color=c=0x{bg_color}:s={width}x{height}:d={int(duration)}',  # 纯色背景
-                    '-i', audio_file,  # 使用音频文件
-                    '-shortest',  # 使用最短的流
-                    '-vf', f'drawtext=text={escaped_text}:fontfile={font_family}:fontsize={font_size}:fontcolor={font_color}:x=(w-text_w)/2:y=(h-text_h)/2',
-                    '-c:v', 'libx264',
-                    '-c:a', 'aac',  # 音频编码
-                    '-preset', 'medium',
-                    '-crf', '23',
-                    '-pix_fmt', 'yuv420p',
-                    '-t', str(duration),
-                    output_path
-                ]
+                cmd += ['-i', audio_file]
             else:
                 # 使用静音音轨
-                cmd = [
-                    self.ffmpeg_path,
-                    '-y',  # 覆盖输出文件
-                    '-f', 'lavfi',  # 使用libavfilter输入
-                    '-i', f'color=c=0x{bg_color}:s={width}x{height}:d={int(duration)}',  # 纯色背景
-                    '-f', 'lavfi',  # 添加静音音轨
-                    '-i', f'anullsrc=r={fps}:cl=stereo',  # 静音源
-                    '-shortest',  # 使用最短的流
-                    '-vf', f'drawtext=text={escaped_text}:fontfile={font_family}:fontsize={font_size}:fontcolor={font_color}:x=(w-text_w)/2:y=(h-text_h)/2',
-                    '-c:v', 'libx264',
-                    '-c:a', 'aac',  # 音频编码
-                    '-preset', 'medium',
-                    '-crf', '23',
-                    '-pix_fmt', 'yuv420p',
-                    '-t', str(duration),
-                    output_path
-                ]
+                cmd += ['-f', 'lavfi', '-i', f'anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo']
+            cmd += [
+                '-map', '0:v',
+                '-map', '1:a',
+                '-vf', self._build_drawtext(text, font_family, font_size, font_color),
+                '-af', self._audio_filter(duration),  # 与单次渲染模式相同的补齐/截断规则
+                *self._encoder_args(render_config),
+                '-t', str(duration),
+                output_path
+            ]
             
             # 执行FFmpeg命令
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            returncode, stderr = await self._run_ffmpeg(cmd)
             
-            if result.returncode != 0:
-                print(f"FFmpeg错误: {result.stderr}")
+            if returncode != 0:
+                print(f"FFmpeg错误: {stderr}")
                 return False
             
             return True
@@ -315,6 +441,104 @@ class VideoGenerator:
             print(f"生成视频时出错: {e}")
             return False
     
+    async def _generate_video_single_pass(
+        self,
+        request: VideoGenerationRequest,
+        render_config: RenderConfig
+    ) -> Tuple[List[VideoSegment], Optional[str]]:
+        """
+        单次FFmpeg调用渲染整个项目：一个背景源，每个段落一个按时间启用的drawtext，
+        各段音频（不足补静音，超出截断）拼接为一条音轨，不生成中间文件
+        """
+        parsed = [self._parse_segment(request, seg_info) for seg_info in request.segments]
+        if not parsed:
+            return [], None
+        
+        duration = request.duration
+        total_duration = duration * len(parsed)
+        bg_color = request.background_color.lstrip('#')
+        final_output_path = self._get_final_output_path(request.project_id, request.output_dir)
+        
+        inputs = [
+            '-f', 'lavfi',
+            '-i', f'color=c=0x{bg_color}:s={render_config.width}x{render_config.height}'
+                  f':r={render_config.fps}:d={total_duration}'
+        ]
+        input_count = 1
+        drawtexts = []
+        audio_chains = []
+        audio_labels = []
+        for position, (text, index, keywords, audio_file) in enumerate(parsed):
+            start = position * duration
+            drawtexts.append(self._build_drawtext(
+                text, request.font_family, request.font_size, request.font_color,
+                enable=f"gte(t,{start})*lt(t,{start + duration})"
+            ))
+            
+            label = f"a{position}"
+            if audio_file and os.path.exists(audio_file):
+                inputs += ['-i', audio_file]
+                audio_chains.append(f"[{input_count}:a]{self._audio_filter(duration)}[{label}]")
+                input_count += 1
+            else:
+                audio_chains.append(
+                    f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo,{self._audio_filter(duration)}[{label}]"
+                )
+            audio_labels.append(f"[{label}]")
+        
+        filtergraph = ";\n".join([
+            "[0:v]" + ",".join(drawtexts) + "[v]",
+            *audio_chains,
+            "".join(audio_labels) + f"concat=n={len(audio_labels)}:v=0:a=1[a]"
+        ])
+        
+        # 滤镜图写入脚本文件，避免段落多时超出命令行长度限制
+        script_file = self.temp_dir / f"{request.project_id}_filtergraph.txt"
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(filtergraph)
+        
+        cmd = [
+            self.ffmpeg_path,
+            '-y',  # 覆盖输出文件
+            *inputs,
+            *self._filter_script_args(script_file),
+            '-map', '[v]',
+            '-map', '[a]',
+            *self._encoder_args(render_config),
+            '-t', str(total_duration),
+            str(final_output_path)
+        ]
+        
+        try:
+            returncode, stderr = await self._run_ffmpeg(cmd)
+        finally:
+            try:
+                os.unlink(script_file)
+            except OSError:
+                pass
+        
+        error_message = None
+        if returncode != 0:
+            print(f"FFmpeg错误: {stderr}")
+            error_message = "FFmpeg视频生成失败"
+        else:
+            print(f"✓ 视频渲染完成: {final_output_path.name}")
+        
+        segments = [
+            VideoSegment(
+                index=index,
+                text=text,
+                keywords=keywords,
+                duration=duration,
+                resolution={"width": render_config.width, "height": render_config.height},
+                fps=render_config.fps,
+                status="failed" if error_message else "completed",
+                error_message=error_message
+            )
+            for text, index, keywords, audio_file in parsed
+        ]
+        return segments, None if error_message else str(final_output_path)
+    
     def _generate_video_with_images(
         self,
         text: str,
@@ -332,6 +556,8 @@ class VideoGenerator:
     ) -> bool:
         """
         使用PIL生成图片，然后用imageio转换为视频
+        
+        文字是静态的，只绘制一帧并重复写入编码器，内存占用与时长无关
         """
         try:
             # 计算帧数
@@ -354,30 +580,26 @@ class VideoGenerator:
                 except:
                     font = ImageFont.load_default()
             
-            # 生成帧
-            frames = []
-            for frame_idx in range(num_frames):
-                # 创建图像
-                img = Image.new('RGB', (width, height), (r, g, b))
-                draw = ImageDraw.Draw(img)
-                
-                # 计算文字位置（居中）
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                x = (width - text_width) // 2
-                y = (height - text_height) // 2
-                
-                # 绘制文字
-                draw.text((x, y), text, font=font, fill=font_rgb)
-                
-                # 转换为numpy数组
-                frame = np.array(img)
-                frames.append(frame)
+            # 创建图像
+            img = Image.new('RGB', (width, height), (r, g, b))
+            draw = ImageDraw.Draw(img)
             
-            # 保存为视频
+            # 计算文字位置（居中）
+            text_bbox = draw.textbbox((0, 0), text, font=font)
+            text_width = text_bbox[2] - text_bbox[0]
+            text_height = text_bbox[3] - text_bbox[1]
+            x = (width - text_width) // 2
+            y = (height - text_height) // 2
+            
+            # 绘制文字
+            draw.text((x, y), text, font=font, fill=font_rgb)
+            
+            # 转换为numpy数组
+            frame = np.asarray(img)
+            
+            # 保存为视频，每一帧都是同一幅画面，直接重复写入
             with imageio.get_writer(output_path, fps=fps, codec='libx264', quality=8) as writer:
-                for frame in frames:
+                for _ in range(num_frames):
                     writer.append_data(frame)
             
             return True
@@ -396,14 +618,8 @@ class VideoGenerator:
         合并所有视频段落为一个完整视频
         """
         try:
-            # 生成最终视频文件名
-            final_filename = f"{project_id}_final.mp4"
-            # 使用自定义输出目录或默认目录
-            if output_dir:
-                final_output_path = Path(output_dir) / "final" / final_filename
-            else:
-                final_output_path = settings.OUTPUT_DIR / "final" / final_filename
-            final_output_path.parent.mkdir(parents=True, exist_ok=True)
+            # 生成最终视频文件路径
+            final_output_path = self._get_final_output_path(project_id, output_dir)
             
             # 收集所有视频文件路径
             video_files = []
@@ -434,13 +650,13 @@ class VideoGenerator:
                 str(final_output_path)
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            returncode, stderr = await self._run_ffmpeg(cmd)
             
-            if result.returncode != 0:
-                print(f"合并视频失败: {result.stderr}")
+            if returncode != 0:
+                print(f"合并视频失败: {stderr}")
                 return None
             
-            print(f"✓ 视频合并完成: {final_filename}")
+            print(f"✓ 视频合并完成: {final_output_path.name}")
             return str(final_output_path)
             
         except Exception as e:
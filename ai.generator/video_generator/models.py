@@ -38,6 +38,7 @@ class VideoGenerationRequest(BaseModel):
     background_color: str = "#1A1A2E"  # 背景颜色
     audio_files: Optional[List[Optional[str]]] = None  # 音频文件路径列表（与segments对应，可以是None）
     merge_segments: bool = True  # 是否将所有段落合并为一个完整视频
+    render_mode: str = "segments"  # segments（并行渲染各段落后合并）, single（单次FFmpeg调用渲染整个项目）
     output_dir: Optional[str] = None  # 自定义输出目录
 
 
@@ -68,3 +69,4 @@ class RenderConfig(BaseModel):
     quality: int = 23  # CRF值
     audio_bitrate: str = "192k"
     preset: str = "medium"  # ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow
+    threads: int = 0  # 每个FFmpeg进程的编码线程数，0表示由FFmpeg决定
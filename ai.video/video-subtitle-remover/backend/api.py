@@ -1,10 +1,11 @@
 import os
 import sys
 import json
+import queue
 import tempfile
 import shutil
 from pathlib import Path
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -16,6 +17,8 @@ import threading
 import time
 from datetime import datetime
 from contextlib import asynccontextmanager
+from worker_pool import SubtitleRemoverWorkerPool
+from resource_governor import ResourceGovernor
 
 # 全局变量存储任务状态
 tasks: Dict[str, Dict[str, Any]] = {}
@@ -29,12 +32,42 @@ OUTPUT_DIR = Path(__file__).parent / "outputs"
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# worker进程数量，每个worker常驻并只加载一次模型
+WORKER_NUM = int(os.getenv("VSR_WORKER_NUM", "1"))
+# 排队任务的最大数量，超过后拒绝新任务
+MAX_QUEUE_SIZE = int(os.getenv("VSR_MAX_QUEUE_SIZE", "16"))
+# 每个任务的线程数(同时也是独占的CPU核心数)，0表示按worker数量平分CPU核心
+JOB_THREADS = int(os.getenv("VSR_JOB_THREADS", "0"))
+# 保留给API进程的CPU核心数
+RESERVED_CORES = int(os.getenv("VSR_RESERVED_CORES", "0"))
+# 每个任务的预估内存(MB)，0表示按算法使用默认值
+JOB_MEMORY_MB = int(os.getenv("VSR_JOB_MEMORY_MB", "0"))
+
+worker_pool: Optional[SubtitleRemoverWorkerPool] = None
+governor: Optional[ResourceGovernor] = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
+    global worker_pool, governor
     # 启动时不再清理文件，保留已上传的视频
+    governor = ResourceGovernor(
+        threads_per_job=JOB_THREADS,
+        num_workers=WORKER_NUM,
+        reserved_cores=RESERVED_CORES,
+        memory_per_job_mb=JOB_MEMORY_MB or None
+    )
+    worker_pool = SubtitleRemoverWorkerPool(
+        num_workers=WORKER_NUM,
+        max_queue_size=MAX_QUEUE_SIZE,
+        on_event=handle_worker_event,
+        governor=governor
+    )
+    worker_pool.start()
     yield
-    # 关闭时的清理工作（如果需要）
+    # 关闭时停止worker进程
+    worker_pool.shutdown()
+    worker_pool = None
 
 app = FastAPI(
     title="Video Subtitle Remover API", 
@@ -90,6 +123,7 @@ class ProcessRequest(BaseModel):
     propainterParams: Optional[Dict[str, Any]] = None
     lamaParams: Optional[Dict[str, Any]] = None
     commonParams: Optional[Dict[str, Any]] = None
+    priority: int = 0  # 优先级，数值越大越先处理
 
 class TaskResponse(BaseModel):
     task_id: str
@@ -98,6 +132,7 @@ class TaskResponse(BaseModel):
     message: Optional[str] = None
     result_url: Optional[str] = None
     error: Optional[str] = None
+    resources: Optional[Dict[str, Any]] = None  # 分配的CPU核心/线程数与资源占用
 
 @app.get("/files", response_model=List[FileInfo])
 async def list_uploaded_files():
@@ -307,7 +342,7 @@ async def debug_process(request: Request):
         return {"status": "error", "error": str(e)}
 
 @app.post("/process", response_model=TaskResponse)
-async def start_processing(request: ProcessRequest, background_tasks: BackgroundTasks):
+async def start_processing(request: ProcessRequest):
     """开始处理视频"""
     task_id = str(uuid.uuid4())
     
@@ -340,24 +375,25 @@ async def start_processing(request: ProcessRequest, background_tasks: Background
             "message": "任务已创建",
             "result_url": None,
             "error": None,
+            "resources": None,
             "created_at": datetime.now(),
             "file_path": str(file_path),
             "config": request.model_dump()  # 修复：使用model_dump替代dict
         }
     
-    # 在后台启动处理任务
-    background_tasks.add_task(
-        process_video_task,
-        task_id,
-        str(file_path),
-        request.model_dump()  # 修复：使用model_dump替代dict
-    )
+    # 提交到worker进程池排队处理
+    try:
+        submit_video_task(task_id, str(file_path), request.model_dump())
+    except queue.Full:
+        with lock:
+            del tasks[task_id]
+        raise HTTPException(status_code=429, detail="任务队列已满，请稍后再试")
     
     return TaskResponse(
         task_id=task_id,
         status="pending",
         progress=0,
-        message="处理任务已开始"
+        message="任务已加入队列"
     )
 
 @app.get("/tasks/{task_id}", response_model=TaskResponse)
@@ -375,12 +411,13 @@ async def get_task_status(task_id: str):
             progress=task["progress"],
             message=task.get("message"),
             result_url=task.get("result_url"),
-            error=task.get("error")
+            error=task.get("error"),
+            resources=task.get("resources")
         )
 
 @app.get("/tasks")
 async def list_tasks():
-    """获取所有任务列表"""
+    """获取所有任务列表，包含每个任务的资源分配与占用"""
     with lock:
         return {
             "tasks": [
@@ -388,12 +425,42 @@ async def list_tasks():
                     "task_id": task_id,
                     "status": task["status"],
                     "progress": task["progress"],
-                    "created_at": task["created_at"].isoformat()
+                    "created_at": task["created_at"].isoformat(),
+                    "resources": task.get("resources")
                 }
                 for task_id, task in tasks.items()
-            ]
+            ],
+            "resources": governor.snapshot() if governor else None
         }
 
+@app.post("/tasks/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: str):
+    """取消排队中或正在处理的任务"""
+    with lock:
+        if task_id not in tasks:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        if tasks[task_id]["status"] not in ("pending", "processing"):
+            raise HTTPException(status_code=400, detail="任务已结束，无法取消")
+    
+    state = worker_pool.cancel(task_id) if worker_pool else None
+    with lock:
+        task = tasks[task_id]
+        if state == "running":
+            # 正在处理的任务由worker中断后上报cancelled事件
+            task["message"] = "正在取消任务"
+        else:
+            task["status"] = "cancelled"
+            task["message"] = "任务已取消"
+        
+        return TaskResponse(
+            task_id=task_id,
+            status=task["status"],
+            progress=task["progress"],
+            message=task.get("message"),
+            result_url=task.get("result_url"),
+            error=task.get("error")
+        )
+
 @app.delete("/tasks/{task_id}")
 async def delete_task(task_id: str):
     """删除任务"""
@@ -401,6 +468,10 @@ async def delete_task(task_id: str):
         if task_id not in tasks:
             raise HTTPException(status_code=404, detail="任务不存在")
         
+        # 未结束的任务先取消
+        if tasks[task_id]["status"] in ("pending", "processing") and worker_pool:
+            worker_pool.cancel(task_id)
+        
         # 清理相关文件
         task = tasks[task_id]
         if task.get("result_url"):
@@ -439,85 +510,94 @@ async def download_result(task_id: str):
             media_type='application/octet-stream'
         )
 
-def process_video_task(task_id: str, file_path: str, config: Dict[str, Any]):
-    """后台处理视频任务"""
-    try:
-        # 延迟导入main模块以避免启动时的torch权限问题
-        import main as subtitle_remover
-        
-        # 更新任务状态为处理中
-        with lock:
-            tasks[task_id]["status"] = "processing"
-            tasks[task_id]["message"] = "开始处理视频"
-        
-        # 构建字幕区域参数 - 支持多个字幕区域
-        subtitle_areas = []
-        
-        if config.get("detectionMode") == "manual":
-            # 优先使用新的subtitleAreas字段
-            if config.get("subtitleAreas"):
-                for area in config["subtitleAreas"]:
-                    # 转换为后端期望的格式 (ymin, ymax, xmin, xmax)
-                    subtitle_areas.append((
-                        int(area["y"]),  # ymin
-                        int(area["y"] + area["height"]),  # ymax
-                        int(area["x"]),  # xmin  
-                        int(area["x"] + area["width"])   # xmax
-                    ))
-                    print(f"Added subtitle area {area.get('name', area['id'])}: {subtitle_areas[-1]}")
-            # 向后兼容：如果只有一个subtitleArea
-            elif config.get("subtitleArea"):
-                area = config["subtitleArea"]
+def build_subtitle_areas(config: Dict[str, Any]) -> List[tuple]:
+    """根据请求参数构建字幕区域列表 - 支持多个字幕区域"""
+    subtitle_areas = []
+    
+    if config.get("detectionMode") == "manual":
+        # 优先使用新的subtitleAreas字段
+        if config.get("subtitleAreas"):
+            for area in config["subtitleAreas"]:
+                # 转换为后端期望的格式 (ymin, ymax, xmin, xmax)
                 subtitle_areas.append((
                     int(area["y"]),  # ymin
                     int(area["y"] + area["height"]),  # ymax
                     int(area["x"]),  # xmin  
                     int(area["x"] + area["width"])   # xmax
                 ))
-                print(f"Added legacy subtitle area: {subtitle_areas[-1]}")
-        
-        print(f"Processing with {len(subtitle_areas)} subtitle area(s)")
-        
-        # 创建字幕去除器实例
-        remover = subtitle_remover.SubtitleRemover(
-            vd_path=file_path,
-            sub_areas=subtitle_areas,  # 传递多个字幕区域
-            gui_mode=False
-        )
-        
-        # 开始处理
-        with lock:
-            tasks[task_id]["message"] = f"正在处理视频... ({len(subtitle_areas)}个字幕区域)"
-        
-        # 运行字幕去除
-        remover.run()
-        
-        # 获取输出文件路径
-        output_path = remover.video_out_name
-        
-        # 复制输出文件到outputs目录
-        output_file = Path(output_path)
-        safe_output_name = f"{task_id}_{output_file.name}"
-        final_output_path = OUTPUT_DIR / safe_output_name
-        
-        shutil.copy2(output_path, final_output_path)
-        
-        # 更新任务状态为完成
-        with lock:
-            tasks[task_id]["status"] = "completed"
-            tasks[task_id]["progress"] = 100
-            tasks[task_id]["message"] = "处理完成"
-            tasks[task_id]["result_url"] = str(final_output_path)
-        
-    except Exception as e:
-        # 处理失败
-        error_message = str(e)
-        print(f"Task {task_id} failed: {error_message}")
-        
-        with lock:
-            tasks[task_id]["status"] = "failed"
-            tasks[task_id]["error"] = error_message
-            tasks[task_id]["message"] = f"处理失败: {error_message}"
+                print(f"Added subtitle area {area.get('name', area['id'])}: {subtitle_areas[-1]}")
+        # 向后兼容：如果只有一个subtitleArea
+        elif config.get("subtitleArea"):
+            area = config["subtitleArea"]
+            subtitle_areas.append((
+                int(area["y"]),  # ymin
+                int(area["y"] + area["height"]),  # ymax
+                int(area["x"]),  # xmin  
+                int(area["x"] + area["width"])   # xmax
+            ))
+            print(f"Added legacy subtitle area: {subtitle_areas[-1]}")
+    
+    return subtitle_areas
+
+def submit_video_task(task_id: str, file_path: str, config: Dict[str, Any]):
+    """将视频处理任务提交到worker进程池"""
+    subtitle_areas = build_subtitle_areas(config)
+    print(f"Queueing task {task_id} with {len(subtitle_areas)} subtitle area(s)")
+    worker_pool.submit(
+        task_id,
+        {
+            "file_path": file_path,
+            "sub_areas": subtitle_areas,  # 传递多个字幕区域
+            "algorithm": config.get("algorithm"),
+        },
+        priority=config.get("priority", 0)
+    )
+
+def handle_worker_event(event: Dict[str, Any]):
+    """处理worker进程上报的任务事件"""
+    task_id = event["task_id"]
+    event_type = event["type"]
+    
+    if event_type == "completed":
+        try:
+            # 复制输出文件到outputs目录
+            output_file = Path(event["output_path"])
+            safe_output_name = f"{task_id}_{output_file.name}"
+            final_output_path = OUTPUT_DIR / safe_output_name
+            shutil.copy2(output_file, final_output_path)
+        except Exception as e:
+            event_type = "failed"
+            event["error"] = f"复制输出文件失败: {str(e)}"
+    
+    with lock:
+        task = tasks.get(task_id)
+        # 任务已被删除
+        if task is None:
+            return
+        if event.get("resources"):
+            task["resources"] = dict(task.get("resources") or {}, allocation=event["resources"])
+        if event.get("usage"):
+            task["resources"] = dict(task.get("resources") or {}, usage=event["usage"])
+        if event_type == "started":
+            task["status"] = "processing"
+            task["message"] = "开始处理视频"
+        elif event_type == "progress":
+            task["progress"] = event["progress"]
+            task["message"] = f"正在处理视频... {event['progress']}%"
+        elif event_type == "completed":
+            task["status"] = "completed"
+            task["progress"] = 100
+            task["message"] = "处理完成"
+            task["result_url"] = str(final_output_path)
+        elif event_type == "cancelled":
+            task["status"] = "cancelled"
+            task["message"] = "任务已取消"
+        elif event_type == "failed":
+            error_message = event.get("error", "")
+            print(f"Task {task_id} failed: {error_message}")
+            task["status"] = "failed"
+            task["error"] = error_message
+            task["message"] = f"处理失败: {error_message}"
 
 @app.get("/")
 async def root():
@@ -536,6 +616,7 @@ async def root():
             "outputs": "/outputs - 获取outputs目录中的文件列表",
             "delete_file": "/files/{file_id} - 删除上传文件",
             "download": "/download/{task_id} - 下载结果",
+            "cancel_task": "/tasks/{task_id}/cancel - 取消任务",
             "delete_task": "/tasks/{task_id} - 删除任务",
             "static_uploads": "/uploads/ - 静态文件服务（上传文件）",
             "static_outputs": "/outputs/ - 静态文件服务（输出文件）"
@@ -28,6 +28,8 @@ VIDEO_INPAINT_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'video')
 MODEL_VERSION = 'V4'
 DET_MODEL_BASE = os.path.join(BASE_DIR, 'models')
 DET_MODEL_PATH = os.path.join(DET_MODEL_BASE, MODEL_VERSION, 'ch_det')
+# 导出的ONNX模型缓存目录
+ONNX_MODEL_CACHE_DIR = os.path.join(BASE_DIR, 'models_onnx')
 
 # 查看该路径下是否有模型完整文件，没有的话合并小文件生成完整文件
 if 'big-lama.pt' not in (os.listdir(LAMA_MODEL_PATH)):
@@ -92,6 +94,15 @@ class InpaintMode(Enum):
     PROPAINTER = 'propainter'
 
 
+@unique
+class InferenceBackend(Enum):
+    """
+    重绘模型推理后端枚举
+    """
+    TORCH = 'torch'
+    ONNX = 'onnx'
+
+
 # ×××××××××××××××××××× [可以改] start ××××××××××××××××××××
 # 是否使用h264编码，如果需要安卓手机分享生成的视频，请打开该选项
 USE_H264 = True
@@ -115,8 +126,102 @@ THRESHOLD_HEIGHT_DIFFERENCE = 20
 # 用于判断两个字幕文本的矩形框是否相似，如果X轴和Y轴偏差都在指定阈值内，则认为时同一个文本框
 PIXEL_TOLERANCE_Y = 20  # 允许检测框纵向偏差的像素点数
 PIXEL_TOLERANCE_X = 20  # 允许检测框横向偏差的像素点数
+# 【设置场景切换检测】在场景切换处切分需要整体重绘的字幕区间，检测结果写入检测缓存
+# 场景切换检测时缩小到的宽度(像素)，在低分辨率的亮度/色度图上比较相邻帧，设置为None则使用原分辨率
+SCENE_DETECT_PROXY_WIDTH = 160
+# 场景切换检测时与解码并行预处理帧(缩放、颜色空间转换)的线程数，设置为0则在检测线程内处理
+SCENE_DETECT_WORKERS = 2
+# 相邻帧画面变化超过该阈值时认为发生场景切换，调小会切分出更多场景
+SCENE_DETECT_THRESHOLD = 27.0
+# 两次场景切换之间最少间隔的帧数
+SCENE_DETECT_MIN_SCENE_LEN = 15
+# 开启检测缓存时，每帧的场景指标保存在缓存目录中，修改以上阈值后直接从指标重新计算场景切换，不需要重新解码视频
+# 【设置帧缓冲区内存上限(MB)】
+# STTN与PROPAINTER算法按批读取字幕区间的帧，一个批次的帧超过该大小时改用临时文件内存映射，峰值内存由该值而不是字幕区间长度决定
+FRAME_STORE_MAX_MB = 1024
 # ×××××××××× 通用设置 end ××××××××××
 
+# ×××××××××× ROI区域重绘设置 start ××××××××××
+"""
+1. ROI_INPAINT
+含义：是否只对mask所在的区域(ROI)进行重绘
+效果：开启后只裁剪出字幕框及其周围的上下文区域送入模型，重绘完成后再贴回原帧，高分辨率视频速度提升明显、显存/内存占用大幅降低
+
+2. ROI_CONTEXT_MARGIN
+含义：在mask外接矩形的基础上向外扩展的上下文像素数
+效果：调大能让模型参考更多的背景信息，效果更稳定，但是处理速度变慢
+"""
+ROI_INPAINT = True
+# ROI上下文扩展像素
+ROI_CONTEXT_MARGIN = 64
+# ×××××××××× ROI区域重绘设置 end ××××××××××
+
+# ×××××××××× 检测缓存与断点续处理设置 start ××××××××××
+"""
+1. DETECTION_CACHE
+含义：是否缓存字幕检测结果
+效果：缓存保存在视频同目录下的 .<视频文件名>.vsr 目录中，同一视频使用相同的检测配置再次处理时(如更换inpaint算法)会跳过字幕检测
+
+2. RESUMABLE
+含义：是否分段提交去除字幕后的视频
+效果：任务中断后使用相同配置再次处理同一视频时，会从最后一个已完成的分段继续处理
+
+3. SEGMENT_COMMIT_FRAMES
+含义：每个分段最少包含的帧数
+效果：调小后中断时需要重新处理的帧更少，但分段文件更多
+"""
+DETECTION_CACHE = True
+RESUMABLE = True
+# 每个分段最少包含的帧数
+SEGMENT_COMMIT_FRAMES = 500
+# ×××××××××× 检测缓存与断点续处理设置 end ××××××××××
+
+# ×××××××××× 分段并行设置 start ××××××××××
+"""
+1. SEGMENT_PARALLEL_NUM
+含义：分段并行处理的进程数量，设置为1时按顺序处理整个视频
+效果：在场景切换或无字幕的位置将视频切分为多个分段，多个进程(各自常驻模型)同时处理，适合CPU核心数较多的机器
+注意：每个进程都会加载一份模型，使用GPU时请根据显存大小设置；跳过字幕检测的STTN模式不支持分段并行
+
+2. SEGMENT_THREAD_NUM
+含义：每个进程使用的线程数
+效果：SEGMENT_PARALLEL_NUM * SEGMENT_THREAD_NUM 不宜超过CPU核心数
+
+3. SEGMENT_MIN_FRAMES
+含义：每个分段最少包含的帧数
+"""
+SEGMENT_PARALLEL_NUM = 1
+# 每个进程使用的线程数
+SEGMENT_THREAD_NUM = 2
+# 每个分段最少包含的帧数
+SEGMENT_MIN_FRAMES = 500
+# ×××××××××× 分段并行设置 end ××××××××××
+
+# ×××××××××× 推理后端设置 start ××××××××××
+"""
+1. INFERENCE_BACKEND
+含义：STTN与LAMA模型的推理后端
+- InferenceBackend.TORCH：使用PyTorch推理
+- InferenceBackend.ONNX：首次运行时将模型导出为ONNX并缓存到models_onnx目录，之后使用onnxruntime推理，CPU上速度更快
+注意：ProPainter始终使用PyTorch推理；LAMA导出失败时自动回退到PyTorch
+
+2. ONNX_QUANTIZE
+含义：是否对导出的ONNX模型进行动态int8量化
+效果：CPU推理速度进一步提升、内存占用降低，但效果会略有下降
+
+3. ONNX_INTRA_OP_THREADS / ONNX_INTER_OP_THREADS
+含义：onnxruntime算子内/算子间并行的线程数，设置为0时由onnxruntime自动决定
+效果：算子内线程数一般设置为物理核心数；多进程并行时应设置为每个进程可用的核心数
+注意：通过api.py处理任务时，算子内线程数由ResourceGovernor按每个任务分配的线程数自动设置(环境变量VSR_JOB_THREADS)
+"""
+INFERENCE_BACKEND = InferenceBackend.TORCH
+ONNX_QUANTIZE = False
+# 算子内并行线程数
+ONNX_INTRA_OP_THREADS = 0
+# 算子间并行线程数
+ONNX_INTER_OP_THREADS = 1
+# ×××××××××× 推理后端设置 end ××××××××××
+
 # ×××××××××× InpaintMode.STTN算法设置 start ××××××××××
 # 以下参数仅适用STTN算法时，才生效
 """
@@ -136,6 +241,15 @@ PIXEL_TOLERANCE_X = 20  # 允许检测框横向偏差的像素点数
 含义：STTN算法每次最多加载的视频帧数量
 效果：设置越大速度越慢，但效果越好
 注意：要保证STTN_MAX_LOAD_NUM大于STTN_NEIGHBOR_STRIDE和STTN_REFERENCE_LENGTH
+
+5. STTN_STREAMING
+含义：跳过字幕检测时是否使用流式STTN
+效果：不再把视频切成互不相关的STTN_MAX_LOAD_NUM帧片段，而是以滑动窗口逐帧处理，每一帧只编码一次，
+     参考帧从以当前帧为中心、长度为STTN_MAX_LOAD_NUM的窗口中选取，片段交界处也有前后文，不会出现接缝
+
+6. STTN_FEATURE_CACHE_MB
+含义：流式STTN编码特征缓存的内存上限(MB)
+效果：缓存不下整个窗口时按最近最少使用淘汰，被淘汰的帧需要重新编码；640x120的输入每帧特征约5MB
 """
 STTN_SKIP_DETECTION = True
 # 参考帧步长
@@ -146,6 +260,10 @@ STTN_REFERENCE_LENGTH = 10
 STTN_MAX_LOAD_NUM = 50
 if STTN_MAX_LOAD_NUM < STTN_REFERENCE_LENGTH * STTN_NEIGHBOR_STRIDE:
     STTN_MAX_LOAD_NUM = STTN_REFERENCE_LENGTH * STTN_NEIGHBOR_STRIDE
+# 是否使用流式STTN
+STTN_STREAMING = True
+# 流式STTN编码特征缓存的内存上限(MB)
+STTN_FEATURE_CACHE_MB = 512
 # ×××××××××× InpaintMode.STTN算法设置 end ××××××××××
 
 # ×××××××××× InpaintMode.PROPAINTER算法设置 start ××××××××××
@@ -153,10 +271,30 @@ if STTN_MAX_LOAD_NUM < STTN_REFERENCE_LENGTH * STTN_NEIGHBOR_STRIDE:
 # 1280x720p视频设置80需要25G显存，设置50需要19G显存
 # 720x480p视频设置80需要8G显存，设置50需要7G显存
 PROPAINTER_MAX_LOAD_NUM = 70
+# ROI区域送入ProPainter时的最大边长，超过该尺寸会先缩小再重绘(RAFT光流计算量与分辨率成正比)
+PROPAINTER_ROI_MAX_SIDE = 640
+# 计算光流(RAFT)时的最大边长，超过该尺寸先缩小计算光流再上采样，RAFT是ProPainter在CPU上最耗时的部分
+PROPAINTER_FLOW_MAX_SIDE = 480
+# RAFT计算光流的内存预算(MB)，用于决定每次同时计算光流的帧数
+PROPAINTER_FLOW_MEMORY_MB = 1024
+# RAFT最少迭代次数，光流分辨率较低时在该值与20次之间选择迭代次数
+PROPAINTER_RAFT_MIN_ITERS = 12
+# 已计算光流的缓存大小(MB)，重试或重叠的批次直接复用
+PROPAINTER_FLOW_CACHE_MB = 256
 # ×××××××××× InpaintMode.PROPAINTER算法设置 end ××××××××××
 
 # ×××××××××× InpaintMode.LAMA算法设置 start ××××××××××
 # 是否开启极速模式，开启后不保证inpaint效果，仅仅对包含文本的区域文本进行去除
 LAMA_SUPER_FAST = False
+# ROI区域送入LAMA时的最大边长，超过该尺寸会先缩小再重绘
+LAMA_ROI_MAX_SIDE = 1024
+# 批量推理的最大帧数，ROI尺寸相同的帧组成一个batch，使用GPU时请根据显存大小设置
+LAMA_BATCH_SIZE = 4
+# 是否开启时域补丁复用：mask相同且mask周围背景几乎不变时，直接复用上一次重绘的结果，跳过模型推理
+LAMA_PATCH_REUSE = True
+# 复用阈值，mask周围上下文像素与上一次推理时的平均绝对差(0~255)小于该值时复用，调大速度更快但可能出现拖影
+LAMA_REUSE_THRESHOLD = 2.0
+# 最多连续复用的帧数，超过后强制重新推理
+LAMA_REUSE_MAX_RUN = 12
 # ×××××××××× InpaintMode.LAMA算法设置 end ××××××××××
 # ×××××××××××××××××××× [可以改] end ××××××××××××××××××××
@@ -0,0 +1,133 @@
+import hashlib
+import math
+from collections import OrderedDict
+
+import torch
+import torch.nn.functional as F
+
+from backend import config
+
+
+class AdaptiveFlowEngine:
+    """
+    ProPainter的自适应光流计算，替代固定分辨率、固定迭代次数与固定clip长度的RAFT调用
+    1. 帧的最大边长超过max_side时先缩小再计算光流，再将光流上采样回原尺寸(光流向量按缩放比例放大)
+    2. 根据内存预算估算RAFT每对帧相关体(correlation volume)的大小，决定每次送入RAFT的clip长度
+    3. RAFT的迭代次数不影响峰值内存，按光流分辨率在[min_iters, max_iters]之间选择，分辨率越低收敛越快
+    4. 以相邻两帧的内容hash为key缓存前向/后向光流，重试或相邻批次重叠的帧不会重复计算
+    """
+    # 迭代次数取max_iters时对应的光流分辨率
+    REFERENCE_AREA = 640 * 360
+
+    def __init__(self, raft, max_side=None, memory_mb=None, max_iters=20, min_iters=None, cache_mb=None, align=8):
+        self.raft = raft
+        self.max_side = config.PROPAINTER_FLOW_MAX_SIDE if max_side is None else max_side
+        self.memory_bytes = (config.PROPAINTER_FLOW_MEMORY_MB if memory_mb is None else memory_mb) * 1024 * 1024
+        self.max_iters = max_iters
+        self.min_iters = min(config.PROPAINTER_RAFT_MIN_ITERS if min_iters is None else min_iters, max_iters)
+        self.cache_bytes = (config.PROPAINTER_FLOW_CACHE_MB if cache_mb is None else cache_mb) * 1024 * 1024
+        self.align = align
+        # {(前一帧hash, 后一帧hash, 光流尺寸, 迭代次数): (forward, backward)}，保存在CPU上
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.stats = {'computed': 0, 'cached': 0}
+
+    def get_flow_size(self, height, width):
+        """
+        计算光流的分辨率 (h, w)，不超过max_side且对齐到align的整数倍
+        """
+        if self.max_side is None or self.max_side <= 0 or max(height, width) <= self.max_side:
+            return height, width
+        scale = self.max_side / max(height, width)
+        flow_h = max(int(round(height * scale / self.align)) * self.align, self.align)
+        flow_w = max(int(round(width * scale / self.align)) * self.align, self.align)
+        return flow_h, flow_w
+
+    def get_iters(self, flow_h, flow_w):
+        iters = int(math.ceil(self.max_iters * math.sqrt(flow_h * flow_w / self.REFERENCE_AREA)))
+        return max(self.min_iters, min(self.max_iters, iters))
+
+    @staticmethod
+    def estimate_pair_bytes(flow_h, flow_w):
+        """
+        估算RAFT计算一对帧的光流所需的内存：4层相关体金字塔与两帧的256维特征图(1/8分辨率)
+        """
+        n = (flow_h // 8) * (flow_w // 8)
+        return int(4 * n * n * (1 + 1 / 4 + 1 / 16 + 1 / 64) + 4 * n * 256 * 2)
+
+    def get_clip_len(self, flow_h, flow_w):
+        """
+        每次送入RAFT的帧数，clip中所有相邻帧对的相关体同时存在
+        """
+        return max(int(self.memory_bytes // self.estimate_pair_bytes(flow_h, flow_w)) + 1, 2)
+
+    @staticmethod
+    def get_frame_key(frame: torch.Tensor):
+        return hashlib.blake2b(frame.detach().cpu().numpy().tobytes(), digest_size=16).hexdigest()
+
+    def put(self, key, flows):
+        size = sum(flow.numel() * flow.element_size() for flow in flows)
+        if size > self.cache_bytes:
+            return
+        self.cache[key] = tuple(flow.cpu() for flow in flows)
+        self.cached_bytes += size
+        while self.cached_bytes > self.cache_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= sum(flow.numel() * flow.element_size() for flow in evicted)
+
+    def __call__(self, frames: torch.Tensor):
+        """
+        :param frames: [1, T, 3, H, W]，取值范围-1~1
+        :return (前向光流, 后向光流)，形状均为[1, T - 1, 2, H, W]
+        """
+        _, length, _, height, width = frames.size()
+        if length < 2:
+            empty = frames.new_zeros(1, 0, 2, height, width)
+            return empty, empty.clone()
+        flow_h, flow_w = self.get_flow_size(height, width)
+        if (flow_h, flow_w) != (height, width):
+            frames_small = F.interpolate(frames[0], size=(flow_h, flow_w), mode='area')
+        else:
+            frames_small = frames[0]
+        iters = self.get_iters(flow_h, flow_w)
+        frame_keys = [self.get_frame_key(frame) for frame in frames_small]
+        pair_keys = [(frame_keys[i], frame_keys[i + 1], flow_h, flow_w, iters) for i in range(length - 1)]
+        flows = {}
+        missing = []
+        for i, key in enumerate(pair_keys):
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                flows[i] = tuple(flow.to(frames.device) for flow in self.cache[key])
+                self.stats['cached'] += 1
+            else:
+                missing.append(i)
+        # 连续缺失的帧对按clip长度分块计算
+        max_pairs = self.get_clip_len(flow_h, flow_w) - 1
+        chunk = []
+        for n, i in enumerate(missing):
+            chunk.append(i)
+            if n + 1 == len(missing) or missing[n + 1] != i + 1 or len(chunk) == max_pairs:
+                flows_f, flows_b = self.raft(frames_small[None, chunk[0]:chunk[-1] + 2], iters=iters)
+                for j, pair in enumerate(chunk):
+                    flows[pair] = (flows_f[0, j], flows_b[0, j])
+                    self.put(pair_keys[pair], flows[pair])
+                self.stats['computed'] += len(chunk)
+                chunk = []
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+        flows_f = torch.stack([flows[i][0] for i in range(length - 1)])
+        flows_b = torch.stack([flows[i][1] for i in range(length - 1)])
+        if (flow_h, flow_w) != (height, width):
+            flows_f = self.upsample_flow(flows_f, height, width)
+            flows_b = self.upsample_flow(flows_b, height, width)
+        return flows_f[None], flows_b[None]
+
+    @staticmethod
+    def upsample_flow(flows: torch.Tensor, height, width):
+        """
+        将光流上采样到(height, width)，x、y方向的位移分别按宽、高的缩放比例放大
+        """
+        flow_h, flow_w = flows.shape[-2:]
+        flows = F.interpolate(flows, size=(height, width), mode='bilinear', align_corners=False)
+        scale = torch.tensor([width / flow_w, height / flow_h], device=flows.device, dtype=flows.dtype)
+        return flows * scale.view(1, 2, 1, 1)
@@ -1,9 +1,12 @@
 import os
-from typing import Union
+from typing import List, Union
+import cv2
 import torch
 import numpy as np
 from PIL import Image
-from backend.inpaint.utils.lama_util import prepare_img_and_mask
+from backend.inpaint.utils.lama_util import prepare_img_and_mask, get_image, ceil_modulo
+from backend.inpaint.roi_inpaint import ROIInpaint
+from backend.inpaint.onnx_backend import load_lama_onnx_model
 from backend import config
 
 
@@ -15,8 +18,20 @@ class LamaInpaint:
         self.model.eval()
         self.model.to(device)
         self.device = device
+        # 使用ONNX后端时替换TorchScript模型，导出失败则继续使用TorchScript
+        if config.INFERENCE_BACKEND == config.InferenceBackend.ONNX:
+            onnx_model = load_lama_onnx_model(self.model, device, source_path=model_path)
+            if onnx_model is not None:
+                self.model = onnx_model
+        # 只对mask所在区域进行重绘
+        self.roi_inpaint = ROIInpaint(max_side=config.LAMA_ROI_MAX_SIDE) if config.ROI_INPAINT else None
 
     def __call__(self, image: Union[Image.Image, np.ndarray], mask: Union[Image.Image, np.ndarray]):
+        if self.roi_inpaint is not None and isinstance(image, np.ndarray) and isinstance(mask, np.ndarray):
+            return self.roi_inpaint.inpaint_image(self.inpaint, image, mask)
+        return self.inpaint(image, mask)
+
+    def inpaint(self, image: Union[Image.Image, np.ndarray], mask: Union[Image.Image, np.ndarray]):
         if isinstance(image, np.ndarray):
             orig_height, orig_width = image.shape[:2]
         else:
@@ -29,3 +44,113 @@ class LamaInpaint:
             cur_res = cur_res[:orig_height, :orig_width]
             return cur_res
 
+    def inpaint_frames(self, images: List[np.ndarray], masks: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        批量重绘多帧，每帧可以使用不同的mask，返回与输入顺序一致的结果列表
+        """
+        if self.roi_inpaint is not None:
+            return self.roi_inpaint.inpaint_images(self.inpaint_batch, images, masks)
+        return self.inpaint_batch(images, masks)
+
+    def inpaint_batch(self, images: List[np.ndarray], masks: List[np.ndarray], pad_out_to_modulo=8):
+        """
+        将尺寸相同的图片组成batch推理，每个batch只做一次填充与设备传输
+        """
+        results = [None] * len(images)
+        groups = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.shape[:2], []).append(i)
+        batch_size = max(config.LAMA_BATCH_SIZE, 1)
+        for (orig_height, orig_width), ids in groups.items():
+            # 与prepare_img_and_mask相同，宽高对称填充到pad_out_to_modulo的整数倍
+            pad = ((0, 0), (0, 0), (0, ceil_modulo(orig_height, pad_out_to_modulo) - orig_height),
+                   (0, ceil_modulo(orig_width, pad_out_to_modulo) - orig_width))
+            for start in range(0, len(ids), batch_size):
+                batch_ids = ids[start:start + batch_size]
+                image = np.pad(np.stack([get_image(images[i]) for i in batch_ids]), pad, mode='symmetric')
+                mask = np.pad(np.stack([get_image(masks[i]) for i in batch_ids]), pad, mode='symmetric')
+                image = torch.from_numpy(image).to(self.device)
+                mask = (torch.from_numpy(mask).to(self.device) > 0) * 1
+                with torch.inference_mode():
+                    inpainted = self.model(image, mask)
+                    cur_res = inpainted.permute(0, 2, 3, 1).detach().cpu().numpy()
+                cur_res = np.clip(cur_res * 255, 0, 255).astype('uint8')[:, :orig_height, :orig_width]
+                for i, res in zip(batch_ids, cur_res):
+                    results[i] = res
+        return results
+
+
+
+class LamaPatchCache:
+    """
+    LaMa时域补丁复用：相邻帧的mask相同，且mask周围的上下文像素与锚点帧几乎相同时，直接复用锚点帧重绘后的补丁
+    适用于固定机位、人物访谈等背景基本不动的视频，可以跳过大部分帧的模型推理
+    1. 锚点为最近一次需要推理的帧，与锚点(而不是上一帧)比较，避免缓慢变化的背景累积误差
+    2. 锚点在加入时就记录上下文，批量推理时后续帧可以在锚点的结果出来之前确定复用关系
+    3. 连续复用超过max_run帧后强制重新推理
+    """
+
+    def __init__(self, threshold, max_run, margin=config.ROI_CONTEXT_MARGIN):
+        # 上下文像素平均绝对差(0~255)小于该值时复用
+        self.threshold = threshold
+        self.max_run = max_run
+        self.roi_inpaint = ROIInpaint(margin=margin, min_size=0, align=1)
+        self.stats = {'inferred': 0, 'reused': 0}
+        self.anchor = None
+        self.run = 0
+
+    def match(self, image: np.ndarray, mask_key):
+        """
+        满足复用条件时返回锚点，否则返回None
+        """
+        anchor = self.anchor
+        if anchor is None or mask_key != anchor['mask_key'] or self.run >= self.max_run:
+            return None
+        x1, y1, x2, y2 = anchor['roi']
+        diff = cv2.mean(cv2.absdiff(image[y1:y2, x1:x2], anchor['context']), mask=anchor['context_mask'])
+        if max(diff[:3]) >= self.threshold:
+            return None
+        self.run += 1
+        self.stats['reused'] += 1
+        return anchor
+
+    def add_anchor(self, image: np.ndarray, mask: np.ndarray, mask_key):
+        """
+        记录一个需要实际推理的帧，推理完成后调用方将结果写入anchor['result']
+        """
+        self.stats['inferred'] += 1
+        self.run = 0
+        anchor = {'mask_key': mask_key, 'result': None}
+        self.anchor = None
+        roi = self.roi_inpaint.get_roi(mask)
+        if roi is None:
+            return anchor
+        x1, y1, x2, y2 = roi
+        # ROI内mask之外的像素作为上下文，mask向外膨胀几个像素，排除字幕边缘的抗锯齿
+        mask_roi = (mask[y1:y2, x1:x2] if mask.ndim == 2 else mask[y1:y2, x1:x2, 0]) > 0
+        context_mask = (cv2.dilate(mask_roi.astype(np.uint8), np.ones((5, 5), np.uint8)) == 0).astype(np.uint8)
+        # 没有上下文像素可以比较时不复用
+        if not context_mask.any():
+            return anchor
+        anchor.update(roi=roi, patch_mask=mask_roi[:, :, None], context_mask=context_mask,
+                      context=image[y1:y2, x1:x2].copy())
+        self.anchor = anchor
+        return anchor
+
+    @staticmethod
+    def paste(image: np.ndarray, anchor):
+        """
+        将锚点重绘后的补丁贴到image上，返回新的帧
+        """
+        x1, y1, x2, y2 = anchor['roi']
+        result = image.copy()
+        np.copyto(result[y1:y2, x1:x2], anchor['result'][y1:y2, x1:x2], where=anchor['patch_mask'])
+        return result
+
+    def __call__(self, inpaint_fn, image: np.ndarray, mask: np.ndarray, mask_key):
+        anchor = self.match(image, mask_key)
+        if anchor is not None:
+            return self.paste(image, anchor)
+        anchor = self.add_anchor(image, mask, mask_key)
+        anchor['result'] = inpaint_fn(image, mask)
+        return anchor['result']
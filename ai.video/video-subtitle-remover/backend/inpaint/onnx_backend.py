@@ -0,0 +1,191 @@
+import hashlib
+import inspect
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend import config
+
+# 导出ONNX使用的opset版本
+ONNX_OPSET_VERSION = 17
+
+
+def get_artifact_key(name, source_path=None, quantize=False):
+    """
+    ONNX模型缓存文件的key，源模型、opset或量化配置变化后重新导出
+    """
+    h = hashlib.md5(f'{name}|{ONNX_OPSET_VERSION}|{torch.__version__}'.encode('utf-8'))
+    if source_path is not None and os.path.exists(source_path):
+        stat = os.stat(source_path)
+        h.update(f'{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}'.encode('utf-8'))
+    return f"{name}_{h.hexdigest()[:12]}{'_int8' if quantize else ''}"
+
+
+def create_session(model_path):
+    """
+    创建onnxruntime推理会话，根据配置设置算子内/算子间线程数
+    """
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # 模型是串行结构，算子间并行收益很小，线程主要留给算子内并行
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if config.ONNX_INTRA_OP_THREADS > 0:
+        options.intra_op_num_threads = config.ONNX_INTRA_OP_THREADS
+    if config.ONNX_INTER_OP_THREADS > 0:
+        options.inter_op_num_threads = config.ONNX_INTER_OP_THREADS
+    providers = list(config.ONNX_PROVIDERS) + ['CPUExecutionProvider']
+    return ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+
+def export_onnx_model(module: nn.Module, sample_inputs: Sequence[torch.Tensor], model_path,
+                      input_names: List[str], output_names: List[str], dynamic_axes: Dict[str, Dict[int, str]],
+                      quantize=False):
+    """
+    将torch模型导出为ONNX，可选动态int8量化
+    """
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    fp32_path = model_path if not quantize else f'{model_path}.fp32.onnx'
+    tmp_path = f'{fp32_path}.tmp'
+    print(f'[ONNX] exporting {os.path.basename(model_path)}...')
+    export_kwargs = {}
+    # 新版本torch默认使用dynamo导出，这里使用基于trace的导出以支持dynamic_axes
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs['dynamo'] = False
+    with torch.no_grad():
+        torch.onnx.export(module, tuple(sample_inputs), tmp_path, input_names=input_names, output_names=output_names,
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET_VERSION, do_constant_folding=True,
+                          **export_kwargs)
+    os.replace(tmp_path, fp32_path)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f'[ONNX] quantizing {os.path.basename(model_path)} to int8...')
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, model_path)
+        os.remove(fp32_path)
+    return model_path
+
+
+class OnnxModule:
+    """
+    onnxruntime推理会话的封装，调用方式与torch模块一致：输入输出均为torch张量
+    会话的线程数在创建时确定，ONNX_INTRA_OP_THREADS变化(例如worker进程按任务的线程预算调整)后重建会话
+    """
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.intra_op_threads = config.ONNX_INTRA_OP_THREADS
+        self.session = create_session(model_path)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, *inputs: torch.Tensor):
+        if self.intra_op_threads != config.ONNX_INTRA_OP_THREADS:
+            self.intra_op_threads = config.ONNX_INTRA_OP_THREADS
+            self.session = create_session(self.model_path)
+        feeds = {name: np.ascontiguousarray(x.detach().float().cpu().numpy())
+                 for name, x in zip(self.input_names, inputs)}
+        output = self.session.run(None, feeds)[0]
+        return torch.from_numpy(output).to(inputs[0].device)
+
+
+def load_onnx_module(name, module: nn.Module, sample_inputs: Sequence[torch.Tensor], input_names, output_names,
+                     dynamic_axes, source_path=None, quantize=None, cache_dir=None):
+    """
+    从缓存目录加载ONNX模型，不存在时从torch模型导出
+    """
+    quantize = config.ONNX_QUANTIZE if quantize is None else quantize
+    cache_dir = cache_dir or config.ONNX_MODEL_CACHE_DIR
+    model_path = os.path.join(cache_dir, f'{get_artifact_key(name, source_path, quantize)}.onnx')
+    if not os.path.exists(model_path):
+        export_onnx_model(module, sample_inputs, model_path, input_names, output_names, dynamic_axes, quantize)
+    return OnnxModule(model_path)
+
+
+class _STTNTransformer(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, feat):
+        return self.model.infer(feat)
+
+
+class STTNOnnxModel:
+    """
+    STTN的ONNX推理后端，分别导出编码器、transformer与解码器，帧数(clip长度)为动态维度
+    提供与InpaintGenerator一致的encoder/infer/decoder接口
+    """
+
+    def __init__(self, model: nn.Module, source_path=None, input_size=(120, 640), quantize=None, cache_dir=None):
+        device = next(model.parameters()).device
+        height, width = input_size
+        frames = torch.zeros(2, 3, height, width, device=device)
+        with torch.no_grad():
+            feat = model.encoder(frames)
+        self.encoder = load_onnx_module('sttn_encoder', model.encoder, [frames], ['frames'], ['feat'],
+                                        {'frames': {0: 'clip'}, 'feat': {0: 'clip'}},
+                                        source_path, quantize, cache_dir)
+        self.transformer = load_onnx_module('sttn_transformer', _STTNTransformer(model), [feat], ['feat'],
+                                            ['pred_feat'], {'feat': {0: 'clip'}, 'pred_feat': {0: 'clip'}},
+                                            source_path, quantize, cache_dir)
+        self.decoder = load_onnx_module('sttn_decoder', model.decoder, [feat], ['feat'], ['image'],
+                                        {'feat': {0: 'clip'}, 'image': {0: 'clip'}},
+                                        source_path, quantize, cache_dir)
+
+    def infer(self, feat):
+        return self.transformer(feat)
+
+
+def load_lama_onnx_model(model, device, source_path=None, quantize=None, cache_dir=None) -> Optional[OnnxModule]:
+    """
+    导出LaMa的ONNX推理后端，batch与图像宽高为动态维度(宽高需为8的倍数)
+    LaMa包含FFT算子，导出失败时返回None，继续使用TorchScript模型
+    """
+    image = torch.zeros(1, 3, 256, 256, device=device)
+    mask = torch.zeros(1, 1, 256, 256, device=device)
+    try:
+        return load_onnx_module('lama', model, [image, mask], ['image', 'mask'], ['inpainted'],
+                                {'image': {0: 'batch', 2: 'height', 3: 'width'},
+                                 'mask': {0: 'batch', 2: 'height', 3: 'width'},
+                                 'inpainted': {0: 'batch', 2: 'height', 3: 'width'}},
+                                source_path, quantize, cache_dir)
+    except Exception as e:
+        print(f'[ONNX] failed to export LaMa, fall back to torch: {e}')
+        return None
+
+
+def check_sttn_parity(frame_length=20, quantize=False, cache_dir=None):
+    """
+    对比STTN的torch与ONNX推理结果，返回编码器、transformer、解码器输出的最大绝对误差
+    没有权重文件时使用随机初始化的模型
+    """
+    import tempfile
+    from backend.inpaint.sttn.auto_sttn import InpaintGenerator
+    torch.manual_seed(0)
+    model = InpaintGenerator().eval()
+    source_path = None
+    if os.path.exists(config.STTN_MODEL_PATH):
+        model.load_state_dict(torch.load(config.STTN_MODEL_PATH, map_location='cpu')['netG'])
+        source_path = config.STTN_MODEL_PATH
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix='vsr_onnx_')
+    onnx_model = STTNOnnxModel(model, source_path=source_path, quantize=quantize, cache_dir=cache_dir)
+    frames = torch.rand(frame_length, 3, 120, 640) * 2 - 1
+    with torch.no_grad():
+        feat = model.encoder(frames)
+        pred_feat = model.infer(feat)
+        image = model.decoder(pred_feat)
+        return {
+            'encoder': float((onnx_model.encoder(frames) - feat).abs().max()),
+            'transformer': float((onnx_model.infer(feat) - pred_feat).abs().max()),
+            'decoder': float((onnx_model.decoder(pred_feat) - image).abs().max()),
+        }
+
+
+if __name__ == '__main__':
+    print(check_sttn_parity())
@@ -0,0 +1,185 @@
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+from backend import config
+
+
+def get_mask_bbox(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    获取mask非零区域的外接矩形
+    :param mask: 单通道或三通道mask
+    :return (x1, y1, x2, y2)，右下角为开区间；mask全为0时返回None
+    """
+    if mask.ndim == 3:
+        mask = mask[:, :, 0]
+    ys = np.flatnonzero(mask.any(axis=1))
+    if ys.size == 0:
+        return None
+    xs = np.flatnonzero(mask.any(axis=0))
+    return int(xs[0]), int(ys[0]), int(xs[-1]) + 1, int(ys[-1]) + 1
+
+
+def expand_span(start, end, margin, min_size, align, limit):
+    """
+    将一维区间[start, end)向两侧扩展margin个像素，保证长度不小于min_size且尽量按align对齐，并限制在[0, limit)内
+    """
+    start = max(start - margin, 0)
+    end = min(end + margin, limit)
+    # 保证最小尺寸，优先向两边平均扩展
+    size = max(end - start, min(min_size, limit))
+    # 尽量对齐到align的整数倍
+    if align > 1 and size % align != 0:
+        size = size + align - size % align
+    size = min(size, limit)
+    center = (start + end) // 2
+    start = min(max(center - size // 2, 0), limit - size)
+    return start, start + size
+
+
+class ROIInpaint:
+    """
+    ROI区域重绘引擎：只把mask外接矩形加上下文边距的区域送入模型，按模型适合的分辨率档位缩放后重绘，再贴回原帧
+    """
+
+    def __init__(self, max_side=None, margin=config.ROI_CONTEXT_MARGIN, min_size=128, align=8, paste_dilation=0):
+        # 送入模型的ROI最大边长，为None时不缩放
+        self.max_side = max_side
+        # 上下文边距
+        self.margin = margin
+        # ROI最小边长，防止区域过小模型无法提取特征(RAFT下采样8倍)
+        self.min_size = min_size
+        # 模型输入尺寸对齐的倍数
+        self.align = align
+        # 贴回时mask向外膨胀的像素，用于保留模型对mask边缘的修复结果
+        self.paste_dilation = paste_dilation
+
+    def get_roi(self, mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        根据mask计算ROI区域 (x1, y1, x2, y2)
+        """
+        bbox = get_mask_bbox(mask)
+        if bbox is None:
+            return None
+        H, W = mask.shape[:2]
+        x1, y1, x2, y2 = bbox
+        x1, x2 = expand_span(x1, x2, self.margin, self.min_size, self.align, W)
+        y1, y2 = expand_span(y1, y2, self.margin, self.min_size, self.align, H)
+        return x1, y1, x2, y2
+
+    def get_strip_columns(self, mask: np.ndarray, aspect_ratio=16 / 3):
+        """
+        获取条带式模型(STTN)需要处理的列范围 (x1, x2)
+        STTN的条带高度由宽度按固定宽高比得到，因此ROI宽度至少要保证条带高度能覆盖mask高度
+        """
+        W = mask.shape[1]
+        bbox = get_mask_bbox(mask)
+        if bbox is None:
+            return 0, W
+        x1, y1, x2, y2 = bbox
+        min_width = int((y2 - y1 + 2 * self.margin) * aspect_ratio)
+        return expand_span(x1, x2, self.margin, max(min_width, self.min_size), self.align, W)
+
+    def get_model_size(self, roi_w, roi_h):
+        """
+        获取ROI送入模型时的尺寸 (w, h)，按max_side等比缩放并对齐到align的整数倍
+        """
+        scale = 1.0
+        if self.max_side is not None and max(roi_w, roi_h) > self.max_side:
+            scale = self.max_side / max(roi_w, roi_h)
+        model_w = max(int(round(roi_w * scale / self.align)) * self.align, self.align)
+        model_h = max(int(round(roi_h * scale / self.align)) * self.align, self.align)
+        return model_w, model_h
+
+    def crop(self, image: np.ndarray, roi, model_size, interpolation=cv2.INTER_AREA):
+        """
+        从原图中裁剪ROI区域并缩放到模型尺寸
+        """
+        x1, y1, x2, y2 = roi
+        image_crop = image[y1:y2, x1:x2]
+        if (x2 - x1, y2 - y1) != model_size:
+            image_crop = cv2.resize(image_crop, model_size, interpolation=interpolation)
+        return image_crop
+
+    def get_paste_mask(self, mask: np.ndarray, roi):
+        """
+        获取贴回时使用的mask(0/1)，形状为ROI尺寸
+        """
+        x1, y1, x2, y2 = roi
+        mask_roi = mask[y1:y2, x1:x2]
+        if mask_roi.ndim == 3:
+            mask_roi = mask_roi[:, :, 0]
+        mask_roi = (mask_roi > 0).astype(np.uint8)
+        if self.paste_dilation > 0:
+            kernel = np.ones((2 * self.paste_dilation + 1, 2 * self.paste_dilation + 1), np.uint8)
+            mask_roi = cv2.dilate(mask_roi, kernel, iterations=1)
+        return mask_roi[:, :, None]
+
+    @staticmethod
+    def paste(image: np.ndarray, inpainted_crop: np.ndarray, paste_mask: np.ndarray, roi):
+        """
+        将重绘后的ROI区域缩放回原尺寸，只替换mask内的像素，原地写回image
+        """
+        x1, y1, x2, y2 = roi
+        if inpainted_crop.shape[1] != x2 - x1 or inpainted_crop.shape[0] != y2 - y1:
+            inpainted_crop = cv2.resize(inpainted_crop, (x2 - x1, y2 - y1), interpolation=cv2.INTER_LINEAR)
+        region = image[y1:y2, x1:x2]
+        np.copyto(region, inpainted_crop, where=paste_mask.astype(bool))
+        return image
+
+    def inpaint_image(self, inpaint_func: Callable, image: np.ndarray, mask: np.ndarray):
+        """
+        对单张图片进行ROI重绘
+        :param inpaint_func: 模型重绘函数，签名为 inpaint_func(image, mask) -> image
+        """
+        roi = self.get_roi(mask)
+        if roi is None:
+            return image
+        x1, y1, x2, y2 = roi
+        model_size = self.get_model_size(x2 - x1, y2 - y1)
+        image_crop = self.crop(image, roi, model_size)
+        mask_crop = self.crop(mask, roi, model_size, interpolation=cv2.INTER_NEAREST)
+        inpainted_crop = inpaint_func(image_crop, mask_crop)
+        result = image.copy()
+        return self.paste(result, inpainted_crop, self.get_paste_mask(mask, roi), roi)
+
+    def inpaint_images(self, inpaint_func: Callable, images: List[np.ndarray], masks: List[np.ndarray]):
+        """
+        对一批使用各自mask的图片进行ROI重绘，ROI裁剪后一次性交给模型
+        :param inpaint_func: 模型批量重绘函数，签名为 inpaint_func(images, masks) -> images
+        """
+        results = list(images)
+        jobs = []
+        for i, (image, mask) in enumerate(zip(images, masks)):
+            roi = self.get_roi(mask)
+            if roi is None:
+                continue
+            x1, y1, x2, y2 = roi
+            model_size = self.get_model_size(x2 - x1, y2 - y1)
+            jobs.append((i, roi, self.crop(image, roi, model_size),
+                         self.crop(mask, roi, model_size, interpolation=cv2.INTER_NEAREST)))
+        if not jobs:
+            return results
+        inpainted_crops = inpaint_func([job[2] for job in jobs], [job[3] for job in jobs])
+        for (i, roi, _, _), inpainted_crop in zip(jobs, inpainted_crops):
+            results[i] = self.paste(images[i].copy(), inpainted_crop, self.get_paste_mask(masks[i], roi), roi)
+        return results
+
+    def inpaint_frames(self, inpaint_func: Callable, frames: List[np.ndarray], mask: np.ndarray):
+        """
+        对一批共用同一mask的视频帧进行ROI重绘
+        :param inpaint_func: 模型重绘函数，签名为 inpaint_func(frames, mask) -> frames
+        """
+        roi = self.get_roi(mask)
+        if roi is None:
+            return frames
+        x1, y1, x2, y2 = roi
+        model_size = self.get_model_size(x2 - x1, y2 - y1)
+        frames_crop = [self.crop(frame, roi, model_size) for frame in frames]
+        mask_crop = self.crop(mask, roi, model_size, interpolation=cv2.INTER_NEAREST)
+        inpainted_crops = inpaint_func(frames_crop, mask_crop)
+        paste_mask = self.get_paste_mask(mask, roi)
+        inpainted_frames = []
+        for frame, inpainted_crop in zip(frames, inpainted_crops):
+            inpainted_frames.append(self.paste(frame.copy(), inpainted_crop, paste_mask, roi))
+        return inpainted_frames
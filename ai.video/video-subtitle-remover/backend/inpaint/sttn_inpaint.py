@@ -1,17 +1,20 @@
-import copy
 import time
+from collections import OrderedDict, deque
 
 import cv2
 import numpy as np
 import torch
+import torch.nn.functional as F
 from torchvision import transforms
-from typing import List
+from typing import Iterable, List
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from backend import config
 from backend.inpaint.sttn.auto_sttn import InpaintGenerator
+from backend.inpaint.roi_inpaint import ROIInpaint
+from backend.inpaint.onnx_backend import STTNOnnxModel
 from backend.inpaint.utils.sttn_utils import Stack, ToTorchFormatTensor
 
 # 定义图像预处理方式
@@ -30,15 +33,28 @@ class STTNInpaint:
         self.model.load_state_dict(torch.load(config.STTN_MODEL_PATH, map_location='cpu')['netG'])
         # 3. # 将模型设置为评估模式
         self.model.eval()
+        # 4. 使用ONNX后端时，用导出的编码器、transformer与解码器替换torch模型
+        if config.INFERENCE_BACKEND == config.InferenceBackend.ONNX:
+            self.model = STTNOnnxModel(self.model, source_path=config.STTN_MODEL_PATH)
         # 模型输入用的宽和高
         self.model_input_width, self.model_input_height = 640, 120
         # 2. 设置相连帧数
         self.neighbor_stride = config.STTN_NEIGHBOR_STRIDE
         self.ref_length = config.STTN_REFERENCE_LENGTH
+        # 只对mask所在的列范围进行重绘
+        self.roi_inpaint = ROIInpaint() if config.ROI_INPAINT else None
+
+    def get_inpaint_columns(self, mask):
+        """
+        获取需要重绘的列范围 (x1, x2)，未开启ROI时为整个帧宽
+        """
+        if self.roi_inpaint is None:
+            return 0, mask.shape[1]
+        return self.roi_inpaint.get_strip_columns(mask, self.model_input_width / self.model_input_height)
 
     def __call__(self, input_frames: List[np.ndarray], input_mask: np.ndarray):
         """
-        :param input_frames: 原视频帧
+        :param input_frames: 原视频帧，修复结果会原地写回
         :param mask: 字幕区域mask
         """
         _, mask = cv2.threshold(input_mask, 127, 1, cv2.THRESH_BINARY)
@@ -46,49 +62,103 @@ class STTNInpaint:
         H_ori, W_ori = mask.shape[:2]
         H_ori = int(H_ori + 0.5)
         W_ori = int(W_ori + 0.5)
-        # 确定去字幕的垂直高度部分
-        split_h = int(W_ori * 3 / 16)
-        inpaint_area = self.get_inpaint_area_by_mask(H_ori, split_h, mask)
-        # 初始化帧存储变量
-        # 高分辨率帧存储列表
-        frames_hr = copy.deepcopy(input_frames)
-        frames_scaled = {}  # 存放缩放后帧的字典
-        comps = {}  # 存放补全后帧的字典
-        # 存储最终的视频帧
-        inpainted_frames = []
-        for k in range(len(inpaint_area)):
-            frames_scaled[k] = []  # 为每个去除部分初始化一个列表
-
-        # 读取并缩放帧
-        for j in range(len(frames_hr)):
-            image = frames_hr[j]
-            # 对每个去除部分进行切割和缩放
-            for k in range(len(inpaint_area)):
-                image_crop = image[inpaint_area[k][0]:inpaint_area[k][1], :, :]  # 切割
-                image_resize = cv2.resize(image_crop, (self.model_input_width, self.model_input_height))  # 缩放
-                frames_scaled[k].append(image_resize)  # 将缩放后的帧添加到对应列表
-
-        # 处理每一个去除部分
-        for k in range(len(inpaint_area)):
-            # 调用inpaint函数进行处理
-            comps[k] = self.inpaint(frames_scaled[k])
-
-        # 如果存在去除部分
-        if inpaint_area:
-            for j in range(len(frames_hr)):
-                frame = frames_hr[j]  # 取出原始帧
-                # 对于模式中的每一个段落
-                for k in range(len(inpaint_area)):
-                    comp = cv2.resize(comps[k][j], (W_ori, split_h))  # 将补全帧缩放回原大小
-                    comp = cv2.cvtColor(np.array(comp).astype(np.uint8), cv2.COLOR_BGR2RGB)  # 转换颜色空间
-                    # 获取遮罩区域并进行图像合成
-                    mask_area = mask[inpaint_area[k][0]:inpaint_area[k][1], :]  # 取出遮罩区域
-                    # 实现遮罩区域内的图像融合
-                    frame[inpaint_area[k][0]:inpaint_area[k][1], :, :] = mask_area * comp + (1 - mask_area) * frame[inpaint_area[k][0]:inpaint_area[k][1], :, :]
-                # 将最终帧添加到列表
-                inpainted_frames.append(frame)
-                print(f'processing frame, {len(frames_hr) - j} left')
-        return inpainted_frames
+        # 确定去字幕的列范围与垂直高度部分
+        x1, x2 = self.get_inpaint_columns(mask)
+        split_h = int((x2 - x1) * 3 / 16)
+        inpaint_area = self.get_inpaint_area_by_mask(H_ori, split_h, mask[:, x1:x2])
+        # 批量修复每一个去除部分并原地写回
+        return self.composite(input_frames, mask, inpaint_area, x1, x2)
+
+    def composite(self, frames: List[np.ndarray], mask: np.ndarray, inpaint_area, x1, x2):
+        """
+        批量合成：每个去除部分的条带一次性上传到推理设备，在设备上完成整段视频的缩放、修复、还原与融合，再原地写回frames
+        :param frames: 原视频帧(BGR)
+        :param mask: 0/1 mask，形状为(H, W, 1)
+        :param inpaint_area: 需要修复的条带纵向区间列表
+        :param x1, x2: 需要修复的列范围
+        """
+        if not inpaint_area or len(frames) == 0:
+            return frames
+        frame_length = len(frames)
+        # 全分辨率条带按块处理，避免整段视频的浮点张量占用过多内存
+        chunk = self.neighbor_stride * 2
+        with torch.no_grad():
+            for from_H, to_H in inpaint_area:
+                # 1. 将条带一次性上传到推理设备 [T, h, w, 3] uint8 BGR
+                strips = torch.from_numpy(np.stack([frame[from_H:to_H, x1:x2] for frame in frames])).to(self.device)
+                h, w = strips.shape[1:3]
+                # 2. 在设备上缩放到模型输入尺寸
+                frames_scaled = torch.cat([
+                    F.interpolate(self.to_rgb_tensor(strips[s:s + chunk]),
+                                  size=(self.model_input_height, self.model_input_width),
+                                  mode='bilinear', align_corners=False)
+                    for s in range(0, frame_length, chunk)
+                ])
+                # 3. 修复
+                comps = self.inpaint_tensor(frames_scaled)
+                # 4. 还原到原尺寸，并只替换mask内的像素
+                mask_area = torch.from_numpy(mask[from_H:to_H, x1:x2].astype(bool)).to(self.device)
+                for s in range(0, frame_length, chunk):
+                    comp = F.interpolate(comps[s:s + chunk], size=(h, w), mode='bilinear', align_corners=False)
+                    comp = self.to_bgr_uint8(comp)
+                    blended = torch.where(mask_area, comp, strips[s:s + chunk]).cpu().numpy()
+                    for j in range(blended.shape[0]):
+                        frames[s + j][from_H:to_H, x1:x2] = blended[j]
+        return frames
+
+    def composite_stream(self, frames: Iterable[np.ndarray], mask: np.ndarray, inpaint_area, x1, x2, ref_window):
+        """
+        流式合成：逐帧读入原视频帧，按输入顺序产出修复后的帧(原地写回)
+        每个去除部分对应一个STTNStream，输出帧会滞后约ref_window帧
+        :param frames: 原视频帧(BGR)的迭代器
+        :param ref_window: 参考帧窗口半径
+        """
+        if not inpaint_area:
+            yield from frames
+            return
+        streams = [STTNStream(self, ref_window, config.STTN_FEATURE_CACHE_MB) for _ in inpaint_area]
+        mask_areas = [mask[from_H:to_H, x1:x2].astype(bool) for from_H, to_H in inpaint_area]
+        # 等待修复的原始帧，以及每个去除部分已完成修复的条带
+        pending = deque()
+        done = [deque() for _ in inpaint_area]
+
+        def pop_ready():
+            while pending and all(done):
+                frame = pending.popleft()
+                for (from_H, to_H), mask_area, comps in zip(inpaint_area, mask_areas, done):
+                    strip = frame[from_H:to_H, x1:x2]
+                    comp = F.interpolate(comps.popleft()[None], size=strip.shape[:2], mode='bilinear',
+                                         align_corners=False)
+                    np.copyto(strip, self.to_bgr_uint8(comp)[0].cpu().numpy(), where=mask_area)
+                yield frame
+
+        with torch.no_grad():
+            for frame in frames:
+                pending.append(frame)
+                for (from_H, to_H), stream, comps in zip(inpaint_area, streams, done):
+                    strip = torch.from_numpy(np.ascontiguousarray(frame[from_H:to_H, x1:x2])).to(self.device)
+                    frame_scaled = F.interpolate(self.to_rgb_tensor(strip[None]),
+                                                 size=(self.model_input_height, self.model_input_width),
+                                                 mode='bilinear', align_corners=False)[0]
+                    comps.extend(stream.push(frame_scaled))
+                yield from pop_ready()
+            for stream, comps in zip(streams, done):
+                comps.extend(stream.flush())
+            yield from pop_ready()
+
+    @staticmethod
+    def to_rgb_tensor(strips):
+        """
+        [T, h, w, 3] uint8 BGR -> [T, 3, h, w] float RGB (0~1)
+        """
+        return strips.permute(0, 3, 1, 2)[:, [2, 1, 0]].float().div_(255)
+
+    @staticmethod
+    def to_bgr_uint8(comp):
+        """
+        [T, 3, h, w] float RGB (0~1) -> [T, h, w, 3] uint8 BGR
+        """
+        return comp[:, [2, 1, 0]].mul(255).round_().clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1)
 
     @staticmethod
     def read_mask(path):
@@ -116,50 +186,53 @@ class STTNInpaint:
     def inpaint(self, frames: List[np.ndarray]):
         """
         使用STTN完成空洞填充（空洞即被遮罩的区域）
+        :param frames: 缩放到模型输入尺寸的BGR帧列表
+        :return 修复后的RGB帧列表(uint8)
         """
-        frame_length = len(frames)
-        # 对帧进行预处理转换为张量，并进行归一化
-        feats = _to_tensors(frames).unsqueeze(0) * 2 - 1
-        # 把特征张量转移到指定的设备（CPU或GPU）
-        feats = feats.to(self.device)
-        # 初始化一个与视频长度相同的列表，用于存储处理完成的帧
-        comp_frames = [None] * frame_length
+        # 对帧进行预处理转换为张量，并转移到指定的设备（CPU或GPU）
+        feats = _to_tensors(frames).to(self.device)
+        comp_frames = self.inpaint_tensor(feats)
+        # 将结果张量重新缩放到0到255的范围内，移动回CPU并转为NumPy数组
+        comp_frames = comp_frames.mul(255).round_().clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+        return list(comp_frames)
+
+    def inpaint_tensor(self, frames: torch.Tensor):
+        """
+        使用STTN完成空洞填充，输入输出均为推理设备上的张量
+        :param frames: [T, 3, H, W] RGB，取值范围0~1
+        :return 修复后的帧，[T, 3, H, W] RGB，取值范围0~1
+        """
+        frame_length = frames.size(0)
+        # 预分配存储修复结果的浮点缓冲区，重叠的邻近帧结果直接在缓冲区内混合
+        comp_frames = torch.empty_like(frames)
+        filled = [False] * frame_length
         # 关闭梯度计算，用于推理阶段节省内存并加速
         with torch.no_grad():
-            # 将处理好的帧通过编码器，产生特征表示
-            feats = self.model.encoder(feats.view(frame_length, 3, self.model_input_height, self.model_input_width))
+            # 将处理好的帧归一化到-1~1后通过编码器，产生特征表示
+            feats = self.model.encoder(frames * 2 - 1)
             # 获取特征维度信息
             _, c, feat_h, feat_w = feats.size()
             # 调整特征形状以匹配模型的期望输入
             feats = feats.view(1, frame_length, c, feat_h, feat_w)
-        # 获取重绘区域
-        # 在设定的邻居帧步幅内循环处理视频
-        for f in range(0, frame_length, self.neighbor_stride):
-            # 计算邻近帧的ID
-            neighbor_ids = [i for i in range(max(0, f - self.neighbor_stride), min(frame_length, f + self.neighbor_stride + 1))]
-            # 获取参考帧的索引
-            ref_ids = self.get_ref_index(neighbor_ids, frame_length)
-            # 同样关闭梯度计算
-            with torch.no_grad():
+            # 在设定的邻居帧步幅内循环处理视频
+            for f in range(0, frame_length, self.neighbor_stride):
+                # 计算邻近帧的ID
+                neighbor_ids = [i for i in range(max(0, f - self.neighbor_stride), min(frame_length, f + self.neighbor_stride + 1))]
+                # 获取参考帧的索引
+                ref_ids = self.get_ref_index(neighbor_ids, frame_length)
                 # 通过模型推断特征并传递给解码器以生成完成的帧
                 pred_feat = self.model.infer(feats[0, neighbor_ids + ref_ids, :, :, :])
-                # 将预测的特征通过解码器生成图片，并应用激活函数tanh，然后分离出张量
-                pred_img = torch.tanh(self.model.decoder(pred_feat[:len(neighbor_ids), :, :, :])).detach()
-                # 将结果张量重新缩放到0到255的范围内（图像像素值）
-                pred_img = (pred_img + 1) / 2
-                # 将张量移动回CPU并转为NumPy数组
-                pred_img = pred_img.cpu().permute(0, 2, 3, 1).numpy() * 255
+                # 将预测的特征通过解码器生成图片，并应用激活函数tanh，缩放到0~1
+                pred_img = (torch.tanh(self.model.decoder(pred_feat[:len(neighbor_ids), :, :, :])) + 1) / 2
                 # 遍历邻近帧
-                for i in range(len(neighbor_ids)):
-                    idx = neighbor_ids[i]
-                    # 将预测的图片转换为无符号8位整数格式
-                    img = np.array(pred_img[i]).astype(np.uint8)
-                    if comp_frames[idx] is None:
-                        # 如果该位置为空，则赋值为新计算出的图片
-                        comp_frames[idx] = img
-                    else:
+                for i, idx in enumerate(neighbor_ids):
+                    if filled[idx]:
                         # 如果此位置之前已有图片，则将新旧图片混合以提高质量
-                        comp_frames[idx] = comp_frames[idx].astype(np.float32) * 0.5 + img.astype(np.float32) * 0.5
+                        comp_frames[idx].add_(pred_img[i]).mul_(0.5)
+                    else:
+                        # 如果该位置为空，则赋值为新计算出的图片
+                        comp_frames[idx].copy_(pred_img[i])
+                        filled[idx] = True
         # 返回处理完成的帧序列
         return comp_frames
 
@@ -220,6 +293,119 @@ class STTNInpaint:
         return inpaint_area  # 返回绘画区域列表
 
 
+class STTNStream:
+    """
+    流式STTN：以滑动窗口处理连续输入的帧
+    1. 每一帧只编码一次，编码特征保存在按内存上限淘汰的LRU缓存中，相邻窗口之间直接复用
+    2. 参考帧从以当前帧为中心、半径为ref_window的窗口中按ref_length采样，窗口彼此重叠，不存在片段边界
+    """
+
+    def __init__(self, sttn_inpaint: STTNInpaint, ref_window, cache_mb):
+        self.model = sttn_inpaint.model
+        self.neighbor_stride = sttn_inpaint.neighbor_stride
+        self.ref_length = sttn_inpaint.ref_length
+        self.ref_window = max(ref_window, self.neighbor_stride)
+        self.cache_bytes = cache_mb * 1024 * 1024
+        # 缩放到模型输入尺寸的帧 {帧序号: [3, H, W]}，特征被淘汰后用于重新编码
+        self.frames = {}
+        # 编码特征LRU {帧序号: [c, h, w]}
+        self.features = OrderedDict()
+        self.feature_bytes = 0
+        # 尚未输出的修复结果 {帧序号: [3, H, W]}
+        self.comps = {}
+        # 已输入的帧数、下一个待处理的中心帧、下一个待输出的帧
+        self.length = 0
+        self.next_center = 0
+        self.next_output = 0
+        # 编码次数统计，特征缓存足够时与帧数相等
+        self.encode_count = 0
+
+    def push(self, frame: torch.Tensor):
+        """
+        输入一帧 [3, H, W] RGB (0~1)，返回已完成修复的帧列表
+        """
+        self.frames[self.length] = frame
+        self.length += 1
+        return self.process(final=False)
+
+    def flush(self):
+        """
+        输入结束，处理剩余的帧并返回
+        """
+        return self.process(final=True)
+
+    def process(self, final):
+        outputs = []
+        # 中心帧需要的邻近帧与参考帧都已输入时才处理
+        lookahead = max(self.neighbor_stride, self.ref_window)
+        while self.next_center < self.length and (final or self.next_center + lookahead < self.length):
+            self.process_center(self.next_center)
+            self.next_center += self.neighbor_stride
+            # 之后的中心帧不会再更新小于刚处理完的中心帧的帧，可以输出
+            outputs += self.pop_outputs(self.next_center - self.neighbor_stride)
+        if final:
+            outputs += self.pop_outputs(self.length)
+        return outputs
+
+    def pop_outputs(self, end):
+        outputs = []
+        while self.next_output < end:
+            outputs.append(self.comps.pop(self.next_output))
+            self.next_output += 1
+        return outputs
+
+    def get_ref_index(self, f, neighbor_ids):
+        start = max(0, f - self.ref_window)
+        end = min(self.length, f + self.ref_window + 1)
+        first = (start + self.ref_length - 1) // self.ref_length * self.ref_length
+        return [i for i in range(first, end, self.ref_length) if i not in neighbor_ids]
+
+    def get_features(self, ids):
+        """
+        从LRU缓存中获取特征，未命中的帧一次性批量编码
+        """
+        missing = [i for i in ids if i not in self.features]
+        if missing:
+            feats = self.model.encoder(torch.stack([self.frames[i] for i in missing]) * 2 - 1)
+            self.encode_count += len(missing)
+            for i, feat in zip(missing, feats):
+                self.features[i] = feat
+                self.feature_bytes += feat.numel() * feat.element_size()
+        result = []
+        for i in ids:
+            self.features.move_to_end(i)
+            result.append(self.features[i])
+        return torch.stack(result)
+
+    def evict(self, min_index):
+        """
+        丢弃之后不会再用到的帧，并在超出内存上限时淘汰最近最少使用的特征
+        """
+        for i in [i for i in self.frames if i < min_index]:
+            del self.frames[i]
+            if i in self.features:
+                feat = self.features.pop(i)
+                self.feature_bytes -= feat.numel() * feat.element_size()
+        while self.features and self.feature_bytes > self.cache_bytes:
+            _, feat = self.features.popitem(last=False)
+            self.feature_bytes -= feat.numel() * feat.element_size()
+
+    def process_center(self, f):
+        neighbor_ids = list(range(max(0, f - self.neighbor_stride), min(self.length, f + self.neighbor_stride + 1)))
+        ref_ids = self.get_ref_index(f, neighbor_ids)
+        feats = self.get_features(neighbor_ids + ref_ids)
+        pred_feat = self.model.infer(feats)
+        pred_img = (torch.tanh(self.model.decoder(pred_feat[:len(neighbor_ids)])) + 1) / 2
+        for i, idx in enumerate(neighbor_ids):
+            if idx in self.comps:
+                # 与之前窗口的结果混合
+                self.comps[idx].add_(pred_img[i]).mul_(0.5)
+            else:
+                self.comps[idx] = pred_img[i].clone()
+        # 之后的中心帧不小于f + neighbor_stride，用到的帧不小于f + neighbor_stride - ref_window
+        self.evict(f + self.neighbor_stride - self.ref_window)
+
+
 class STTNVideoInpaint:
 
     def read_frame_info_from_video(self):
@@ -235,9 +421,9 @@ class STTNVideoInpaint:
         # 返回视频读取对象、帧信息和视频写入对象
         return reader, frame_info
 
-    def __init__(self, video_path, mask_path=None, clip_gap=None):
-        # STTNInpaint视频修复实例初始化
-        self.sttn_inpaint = STTNInpaint()
+    def __init__(self, video_path, mask_path=None, clip_gap=None, sttn_inpaint=None):
+        # STTNInpaint视频修复实例初始化，可传入已加载的实例复用模型
+        self.sttn_inpaint = sttn_inpaint if sttn_inpaint is not None else STTNInpaint()
         # 视频和掩码路径
         self.video_path = video_path
         self.mask_path = mask_path
@@ -266,19 +452,24 @@ class STTNVideoInpaint:
             
             # 计算需要迭代修复视频的次数
             rec_time = frame_info['len'] // self.clip_gap if frame_info['len'] % self.clip_gap == 0 else frame_info['len'] // self.clip_gap + 1
-            # 计算分割高度，用于确定修复区域的大小
-            split_h = int(frame_info['W_ori'] * 3 / 16)
-            
             if input_mask is None:
                 # 读取掩码
                 mask = self.sttn_inpaint.read_mask(self.mask_path)
             else:
                 _, mask = cv2.threshold(input_mask, 127, 1, cv2.THRESH_BINARY)
                 mask = mask[:, :, None]
+
+            # 计算需要修复的列范围与分割高度，用于确定修复区域的大小
+            x1, x2 = self.sttn_inpaint.get_inpaint_columns(mask)
+            split_h = int((x2 - x1) * 3 / 16)
                 
             # 得到修复区域位置
-            inpaint_area = self.sttn_inpaint.get_inpaint_area_by_mask(frame_info['H_ori'], split_h, mask)
-            
+            inpaint_area = self.sttn_inpaint.get_inpaint_area_by_mask(frame_info['H_ori'], split_h, mask[:, x1:x2])
+
+            if config.STTN_STREAMING:
+                self.inpaint_stream(reader, writer, frame_info, mask, inpaint_area, x1, x2, input_sub_remover, tbar)
+                return
+
             # 遍历每一次的迭代次数
             for i in range(rec_time):
                 start_f = i * self.clip_gap  # 起始帧位置
@@ -286,14 +477,8 @@ class STTNVideoInpaint:
                 print('Processing:', start_f + 1, '-', end_f, ' / Total:', frame_info['len'])
                 
                 frames_hr = []  # 高分辨率帧列表
-                frames = {}  # 帧字典，用于存储裁剪后的图像
-                comps = {}  # 组合字典，用于存储修复后的图像
-                
-                # 初始化帧字典
-                for k in range(len(inpaint_area)):
-                    frames[k] = []
                     
-                # 读取和修复高分辨率帧
+                # 读取高分辨率帧
                 valid_frames_count = 0
                 for j in range(start_f, end_f):
                     success, image = reader.read()
@@ -303,57 +488,66 @@ class STTNVideoInpaint:
                     
                     frames_hr.append(image)
                     valid_frames_count += 1
-                    
-                    for k in range(len(inpaint_area)):
-                        # 裁剪、缩放并添加到帧字典
-                        image_crop = image[inpaint_area[k][0]:inpaint_area[k][1], :, :]
-                        image_resize = cv2.resize(image_crop, (self.sttn_inpaint.model_input_width, self.sttn_inpaint.model_input_height))
-                        frames[k].append(image_resize)
                 
                 # 如果没有读取到有效帧，则跳过当前迭代
                 if valid_frames_count == 0:
                     print(f"Warning: No valid frames found in range {start_f+1}-{end_f}. Skipping this segment.")
                     continue
+
+                # 预览需要保留原始帧
+                if input_sub_remover is not None and input_sub_remover.gui_mode:
+                    original_frames = [frame.copy() for frame in frames_hr]
+                else:
+                    original_frames = None
+
+                # 对每个修复区域批量运行修复，并原地融合到原始帧
+                self.sttn_inpaint.composite(frames_hr, mask, inpaint_area, x1, x2)
+
+                for j in range(valid_frames_count):
+                    frame = frames_hr[j]
+                    writer.write(frame)
                     
-                # 对每个修复区域运行修复
-                for k in range(len(inpaint_area)):
-                    if len(frames[k]) > 0:  # 确保有帧可以处理
-                        comps[k] = self.sttn_inpaint.inpaint(frames[k])
-                    else:
-                        comps[k] = []
-                
-                # 如果有要修复的区域
-                if inpaint_area and valid_frames_count > 0:
-                    for j in range(valid_frames_count):
-                        if input_sub_remover is not None and input_sub_remover.gui_mode:
-                            original_frame = copy.deepcopy(frames_hr[j])
-                        else:
-                            original_frame = None
-                            
-                        frame = frames_hr[j]
-                        
-                        for k in range(len(inpaint_area)):
-                            if j < len(comps[k]):  # 确保索引有效
-                                # 将修复的图像重新扩展到原始分辨率，并融合到原始帧
-                                comp = cv2.resize(comps[k][j], (frame_info['W_ori'], split_h))
-                                comp = cv2.cvtColor(np.array(comp).astype(np.uint8), cv2.COLOR_BGR2RGB)
-                                mask_area = mask[inpaint_area[k][0]:inpaint_area[k][1], :]
-                                frame[inpaint_area[k][0]:inpaint_area[k][1], :, :] = mask_area * comp + (1 - mask_area) * frame[inpaint_area[k][0]:inpaint_area[k][1], :, :]
-                        
-                        writer.write(frame)
-                        
-                        if input_sub_remover is not None:
-                            if tbar is not None:
-                                input_sub_remover.update_progress(tbar, increment=1)
-                            if original_frame is not None and input_sub_remover.gui_mode:
-                                input_sub_remover.preview_frame = cv2.hconcat([original_frame, frame])
+                    if input_sub_remover is not None:
+                        if tbar is not None:
+                            input_sub_remover.update_progress(tbar, increment=1)
+                        if original_frames is not None:
+                            input_sub_remover.preview_frame = cv2.hconcat([original_frames[j], frame])
         except Exception as e:
             print(f"Error during video processing: {str(e)}")
             # 不抛出异常，允许程序继续执行
         finally:
-            if writer:
+            # 使用外部传入的writer时，由调用方负责释放
+            if writer and input_sub_remover is None:
                 writer.release()
 
+    def inpaint_stream(self, reader, writer, frame_info, mask, inpaint_area, x1, x2, input_sub_remover=None, tbar=None):
+        """
+        流式修复整个视频：以clip_gap为参考窗口长度滑动处理，每帧只编码一次
+        """
+        gui_mode = input_sub_remover is not None and input_sub_remover.gui_mode
+        # 预览需要保留原始帧，输出滞后于读取，按顺序缓存
+        original_frames = deque()
+
+        def read_frames():
+            for j in range(frame_info['len']):
+                success, image = reader.read()
+                if not success:
+                    print(f"Warning: Failed to read frame {j}.")
+                    break
+                if gui_mode:
+                    original_frames.append(image.copy())
+                if j % self.clip_gap == 0:
+                    print('Processing:', j + 1, '-', min(j + self.clip_gap, frame_info['len']), ' / Total:', frame_info['len'])
+                yield image
+
+        for frame in self.sttn_inpaint.composite_stream(read_frames(), mask, inpaint_area, x1, x2, self.clip_gap // 2):
+            writer.write(frame)
+            if input_sub_remover is not None:
+                if tbar is not None:
+                    input_sub_remover.update_progress(tbar, increment=1)
+                if gui_mode:
+                    input_sub_remover.preview_frame = cv2.hconcat([original_frames.popleft(), frame])
+
 
 if __name__ == '__main__':
     mask_path = '../../test/test.png'
@@ -14,6 +14,8 @@ from backend.inpaint.video.model.recurrent_flow_completion import RecurrentFlowC
 from backend.inpaint.video.model.propainter import InpaintGenerator
 from backend.inpaint.video.core.utils import to_tensors
 from backend.inpaint.video.model.misc import get_device
+from backend.inpaint.roi_inpaint import ROIInpaint
+from backend.inpaint.flow_engine import AdaptiveFlowEngine
 
 import warnings
 
@@ -150,10 +152,15 @@ class VideoInpaint:
         self.ref_stride = 10
         # 设置raft模型
         self.fix_raft = self.init_raft_model()
+        # 自适应分辨率、clip长度与迭代次数的光流计算，并缓存已计算的光流
+        self.flow_engine = AdaptiveFlowEngine(self.fix_raft, max_iters=self.raft_iter)
         # 设置fix_flow模型
         self.fix_flow_complete = self.init_fix_flow_model()
         # 设置inpaint模型
         self.model = self.init_inpaint_model()
+        # 只对mask所在区域进行重绘，贴回时保留膨胀后的mask边缘
+        self.roi_inpaint = ROIInpaint(max_side=config.PROPAINTER_ROI_MAX_SIDE,
+                                      paste_dilation=self.mask_dilation * 2) if config.ROI_INPAINT else None
 
     def init_raft_model(self):
         # set up RAFT and flow competition model
@@ -174,6 +181,11 @@ class VideoInpaint:
             self.device).eval()
 
     def inpaint(self, frames, mask):
+        if self.roi_inpaint is not None and isinstance(frames[0], np.ndarray) and isinstance(mask, np.ndarray):
+            return self.roi_inpaint.inpaint_frames(self.inpaint_full_frame, frames, mask)
+        return self.inpaint_full_frame(frames, mask)
+
+    def inpaint_full_frame(self, frames, mask):
         if isinstance(frames[0], np.ndarray):
             frames = [Image.fromarray(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)) for f in frames]
         size = frames[0].size
@@ -182,18 +194,6 @@ class VideoInpaint:
                                               flow_mask_dilates=self.mask_dilation,
                                               mask_dilates=self.mask_dilation)
         w, h = size
-        # for saving the masked frames or video
-        masked_frame_for_save = []
-        for i in range(len(frames)):
-            mask_ = np.expand_dims(np.array(masks_dilated[i]), 2).repeat(3, axis=2) / 255.
-            img = np.array(frames[i])
-            green = np.zeros([h, w, 3])
-            green[:, :, 1] = 255
-            alpha = 0.6
-            # alpha = 1.0
-            fuse_img = (1 - alpha) * img + alpha * green
-            fuse_img = mask_ * fuse_img + (1 - mask_) * img
-            masked_frame_for_save.append(fuse_img.astype(np.uint8))
 
         frames_inp = [np.array(f).astype(np.uint8) for f in frames]
         frames = to_tensors()(frames).unsqueeze(0) * 2 - 1
@@ -204,34 +204,9 @@ class VideoInpaint:
         video_length = frames.size(1)
         with torch.no_grad():
             # ---- compute flow ----
-            if frames.size(-1) <= 640:
-                short_clip_len = 12
-            elif frames.size(-1) <= 720:
-                short_clip_len = 8
-            elif frames.size(-1) <= 1280:
-                short_clip_len = 4
-            else:
-                short_clip_len = 2
-
-            # use fp32 for RAFT
-            if frames.size(1) > short_clip_len:
-                gt_flows_f_list, gt_flows_b_list = [], []
-                for f in range(0, video_length, short_clip_len):
-                    end_f = min(video_length, f + short_clip_len)
-                    if f == 0:
-                        flows_f, flows_b = self.fix_raft(frames[:, f:end_f], iters=self.raft_iter)
-                    else:
-                        flows_f, flows_b = self.fix_raft(frames[:, f - 1:end_f], iters=self.raft_iter)
-                    gt_flows_f_list.append(flows_f)
-                    gt_flows_b_list.append(flows_b)
-                    torch.cuda.empty_cache()
-                gt_flows_f = torch.cat(gt_flows_f_list, dim=1)
-                gt_flows_b = torch.cat(gt_flows_b_list, dim=1)
-                gt_flows_bi = (gt_flows_f, gt_flows_b)
-            else:
-                gt_flows_bi = self.fix_raft(frames, iters=self.raft_iter)
-                torch.cuda.empty_cache()
+            gt_flows_bi = self.flow_engine(frames)
 
+            fix_flow_complete = self.fix_flow_complete
             if self.use_half:
                 frames, flow_masks, masks_dilated = frames.half(), flow_masks.half(), masks_dilated.half()
                 gt_flows_bi = (gt_flows_bi[0].half(), gt_flows_bi[1].half())
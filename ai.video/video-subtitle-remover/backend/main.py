@@ -4,6 +4,7 @@ import subprocess
 import os
 from pathlib import Path
 import threading
+from collections import deque
 import cv2
 import sys
 from functools import cached_property
@@ -12,12 +13,16 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 from backend.tools.common_tools import is_video_or_image, is_image_file
-from backend.scenedetect import scene_detect
+from backend.scenedetect import scene_detect, StatsFileCorrupt
 from backend.scenedetect.detectors import ContentDetector
 from backend.inpaint.sttn_inpaint import STTNInpaint, STTNVideoInpaint
-from backend.inpaint.lama_inpaint import LamaInpaint
+from backend.inpaint.lama_inpaint import LamaInpaint, LamaPatchCache
 from backend.inpaint.video_inpaint import VideoInpaint
-from backend.tools.inpaint_tools import create_mask, batch_generator
+from backend.tools.inpaint_tools import create_mask, get_batch_sizes
+from backend.tools.frame_store import FrameStore
+from backend.tools.job_cache import JobCache, SegmentWriter, get_config_hash, concat_videos
+from backend.tools.segment_tools import FrameRangeCapture, split_segments
+from backend.tools.region_tracker import SubtitleRegionTracker, box_iou
 import importlib
 import platform
 import tempfile
@@ -26,6 +31,83 @@ from shapely.geometry import Polygon
 import time
 from tqdm import tqdm
 
+# 进程内共享的模型实例，常驻的worker进程处理多个任务时无需重复加载模型
+_shared_models = {}
+
+
+def get_shared_model(name, factory):
+    """
+    获取进程内共享的模型实例，不存在时通过factory创建
+    """
+    model = _shared_models.get(name)
+    if model is None:
+        model = factory()
+        _shared_models[name] = model
+    return model
+
+
+def warm_up_models(mode=None, with_detector=True):
+    """
+    预先加载字幕检测模型与指定算法的重绘模型
+    """
+    mode = mode or config.MODE
+    if with_detector:
+        get_shared_model('text_detector', SubtitleDetect.create_text_detector)
+    if mode == config.InpaintMode.STTN:
+        get_shared_model('sttn', STTNInpaint)
+    elif mode == config.InpaintMode.PROPAINTER:
+        get_shared_model('propainter', lambda: VideoInpaint(config.PROPAINTER_MAX_LOAD_NUM))
+    get_shared_model('lama', LamaInpaint)
+
+
+class TaskCancelledError(Exception):
+    """
+    任务被取消
+    """
+    pass
+
+
+# 分段并行处理时各分段已处理的帧数，由进程池初始化时设置
+_segment_progress = None
+
+
+def init_segment_worker(thread_num, mode, progress):
+    """
+    分段并行进程池的初始化函数：限制线程数，并预先加载重绘模型
+    """
+    global _segment_progress
+    _segment_progress = progress
+    torch.set_num_threads(thread_num)
+    cv2.setNumThreads(thread_num)
+    config.MODE = config.InpaintMode(mode)
+    warm_up_models(with_detector=False)
+
+
+def remove_segment(task):
+    """
+    在进程池中处理一个分段，结果写入该分段自己的分段目录
+    """
+    index, video_path, frame_range, sub_area, sub_areas, video_hash, detection_cache = task
+
+    def on_read(frame_no):
+        _segment_progress[index] = frame_no - frame_range[0] + 1
+
+    remover = SubtitleRemover(video_path, sub_area=sub_area, sub_areas=sub_areas, reload_config=False,
+                              frame_range=frame_range, video_hash=video_hash)
+    remover.detection_cache = detection_cache
+    remover.video_cap.on_read = on_read
+    tbar = tqdm(total=remover.segment_frame_count, unit='frame', disable=True)
+    try:
+        remover.remove_subtitles(tbar)
+    finally:
+        remover.release()
+        remover.video_temp_file.close()
+        try:
+            os.remove(remover.video_temp_file.name)
+        except Exception:
+            pass
+    return index
+
 
 class SubtitleDetect:
     """
@@ -38,6 +120,10 @@ class SubtitleDetect:
 
     @cached_property
     def text_detector(self):
+        return get_shared_model('text_detector', self.create_text_detector)
+
+    @classmethod
+    def create_text_detector(cls):
         import paddle
         paddle.disable_signal_handler()
         from paddleocr.tools.infer import utility
@@ -46,7 +132,7 @@ class SubtitleDetect:
         importlib.reload(config)
         args = utility.parse_args()
         args.det_algorithm = 'DB'
-        args.det_model_dir = self.convertToOnnxModelIfNeeded(config.DET_MODEL_PATH)
+        args.det_model_dir = cls.convertToOnnxModelIfNeeded(config.DET_MODEL_PATH)
         args.use_onnx=len(config.ONNX_PROVIDERS) > 0
         args.onnx_providers=config.ONNX_PROVIDERS
         return TextDetector(args)
@@ -78,6 +164,9 @@ class SubtitleDetect:
         return coordinate_list
 
     def find_subtitle_frame_no(self, sub_remover=None):
+        """
+        检测字幕帧号与坐标，返回{帧号: [文本框, ...]}以及与之对应的(统一坐标后)SubtitleRegionTracker
+        """
         video_cap = cv2.VideoCapture(self.video_path)
         frame_count = video_cap.get(cv2.CAP_PROP_FRAME_COUNT)
         tbar = tqdm(total=int(frame_count), unit='frame', position=0, file=sys.__stdout__, desc='Subtitle Finding')
@@ -109,8 +198,10 @@ class SubtitleDetect:
                     subtitle_frame_no_box_dict[current_frame_no] = temp_list
             tbar.update(1)
             if sub_remover:
+                sub_remover.check_cancelled()
                 sub_remover.progress_total = (100 * float(current_frame_no) / float(frame_count)) // 2
-        subtitle_frame_no_box_dict = self.unify_regions(subtitle_frame_no_box_dict)
+        region_tracker = self.get_region_tracker(subtitle_frame_no_box_dict).unify_regions()
+        subtitle_frame_no_box_dict = region_tracker.to_dict()
         # if config.UNITE_COORDINATES:
         #     subtitle_frame_no_box_dict = self.get_subtitle_frame_no_box_dict_with_united_coordinates(subtitle_frame_no_box_dict)
         #     if sub_remover is not None:
@@ -127,9 +218,10 @@ class SubtitleDetect:
         for key in subtitle_frame_no_box_dict.keys():
             if len(subtitle_frame_no_box_dict[key]) > 0:
                 new_subtitle_frame_no_box_dict[key] = subtitle_frame_no_box_dict[key]
-        return new_subtitle_frame_no_box_dict
+        return new_subtitle_frame_no_box_dict, region_tracker
 
-    def convertToOnnxModelIfNeeded(self, model_dir, model_filename="inference.pdmodel", params_filename="inference.pdiparams", opset_version=14):
+    @staticmethod
+    def convertToOnnxModelIfNeeded(model_dir, model_filename="inference.pdmodel", params_filename="inference.pdiparams", opset_version=14):
         """Converts a Paddle model to ONNX if ONNX providers are available and model does not already exist."""
         
         if not config.ONNX_PROVIDERS:
@@ -199,12 +291,22 @@ class SubtitleDetect:
         return result_intervals
 
     @staticmethod
-    def get_scene_div_frame_no(v_path):
+    def get_scene_div_frame_no(v_path, stats_file_path=None):
         """
-        获取发生场景切换的帧号
+        获取发生场景切换的帧号，stats_file_path为.npz文件时保存每帧指标，文件已存在时直接从指标计算而不解码视频
         """
         scene_div_frame_no_list = []
-        scene_list = scene_detect(v_path, ContentDetector())
+        detector = ContentDetector(threshold=config.SCENE_DETECT_THRESHOLD,
+                                   min_scene_len=config.SCENE_DETECT_MIN_SCENE_LEN,
+                                   proxy_width=config.SCENE_DETECT_PROXY_WIDTH)
+        try:
+            scene_list = scene_detect(v_path, detector, stats_file_path=stats_file_path,
+                                      workers=config.SCENE_DETECT_WORKERS)
+        except StatsFileCorrupt as e:
+            # 指标文件损坏(如写入时中断)，删除后重新检测
+            print(f'failed to load scene stats {stats_file_path}: {e}')
+            os.remove(stats_file_path)
+            return SubtitleDetect.get_scene_div_frame_no(v_path, stats_file_path)
         for scene in scene_list:
             start, end = scene
             if start.frame_num == 0:
@@ -213,6 +315,16 @@ class SubtitleDetect:
                 scene_div_frame_no_list.append(start.frame_num + 1)
         return scene_div_frame_no_list
 
+    @staticmethod
+    def get_region_tracker(subtitle_frame_no_box_dict):
+        """
+        将{帧号: [文本框, ...]}转换为列式存储的SubtitleRegionTracker
+        """
+        return SubtitleRegionTracker.from_dict(subtitle_frame_no_box_dict,
+                                               tolerance_x=config.PIXEL_TOLERANCE_X,
+                                               tolerance_y=config.PIXEL_TOLERANCE_Y,
+                                               height_difference=config.THRESHOLD_HEIGHT_DIFFERENCE)
+
     @staticmethod
     def are_similar(region1, region2):
         """判断两个区域是否相似。"""
@@ -225,36 +337,7 @@ class SubtitleDetect:
     def unify_regions(self, raw_regions):
         """将连续相似的区域统一，保持列表结构。"""
         if len(raw_regions) > 0:
-            keys = sorted(raw_regions.keys())  # 对键进行排序以确保它们是连续的
-            unified_regions = {}
-
-            # 初始化
-            last_key = keys[0]
-            unify_value_map = {last_key: raw_regions[last_key]}
-
-            for key in keys[1:]:
-                current_regions = raw_regions[key]
-
-                # 新增一个列表来存放匹配过的标准区间
-                new_unify_values = []
-
-                for idx, region in enumerate(current_regions):
-                    last_standard_region = unify_value_map[last_key][idx] if idx < len(unify_value_map[last_key]) else None
-
-                    # 如果当前的区间与前一个键的对应区间相似，我们统一它们
-                    if last_standard_region and self.are_similar(region, last_standard_region):
-                        new_unify_values.append(last_standard_region)
-                    else:
-                        new_unify_values.append(region)
-
-                # 更新unify_value_map为最新的区间值
-                unify_value_map[key] = new_unify_values
-                last_key = key
-
-            # 将最终统一后的结果传递给unified_regions
-            for key in keys:
-                unified_regions[key] = unify_value_map[key]
-            return unified_regions
+            return self.get_region_tracker(raw_regions).unify_regions().to_dict()
         else:
             return raw_regions
 
@@ -280,26 +363,10 @@ class SubtitleDetect:
 
     @staticmethod
     def find_continuous_ranges_with_same_mask(subtitle_frame_no_box_dict):
-        numbers = sorted(list(subtitle_frame_no_box_dict.keys()))
-        ranges = []
-        start = numbers[0]  # 初始区间开始值
-        for i in range(1, len(numbers)):
-            # 如果当前帧号与前一个帧号间隔超过1，
-            # 则上一个区间结束，记录当前区间的开始与结束
-            if numbers[i] - numbers[i - 1] != 1:
-                end = numbers[i - 1]  # 则该数字是当前连续区间的终点
-                ranges.append((start, end))
-                start = numbers[i]  # 开始下一个连续区间
-            # 如果当前帧号与前一个帧号间隔为1，且当前帧号对应的坐标点与上一帧号对应的坐标点不一致
-            # 记录当前区间的开始与结束
-            if numbers[i] - numbers[i - 1] == 1:
-                if subtitle_frame_no_box_dict[numbers[i]] != subtitle_frame_no_box_dict[numbers[i - 1]]:
-                    end = numbers[i - 1]  # 则该数字是当前连续区间的终点
-                    ranges.append((start, end))
-                    start = numbers[i]  # 开始下一个连续区间
-        # 添加最后一个区间
-        ranges.append((start, numbers[-1]))
-        return ranges
+        """
+        获取帧号连续且文本框列表相同的区间
+        """
+        return SubtitleDetect.get_region_tracker(subtitle_frame_no_box_dict).find_continuous_ranges_with_same_mask()
 
     @staticmethod
     def sub_area_to_polygon(sub_area):
@@ -394,115 +461,21 @@ class SubtitleDetect:
         return merged
 
     def compute_iou(self, box1, box2):
-        box1_polygon = self.sub_area_to_polygon(box1)
-        box2_polygon = self.sub_area_to_polygon(box2)
-        intersection = box1_polygon.intersection(box2_polygon)
-        if intersection.is_empty:
-            return -1
-        else:
-            union_area = (box1_polygon.area + box2_polygon.area - intersection.area)
-            if union_area > 0:
-                intersection_area_rate = intersection.area / union_area
-            else:
-                intersection_area_rate = 0
-            return intersection_area_rate
+        iou = float(box_iou(box1, box2)[0, 0])
+        return -1 if iou == -1 else iou
 
     def get_area_max_box_dict(self, sub_frame_no_list_continuous, subtitle_frame_no_box_dict):
-        _area_max_box_dict = dict()
-        for start_no, end_no in sub_frame_no_list_continuous:
-            # 寻找面积最大文本框
-            current_no = start_no
-            # 查找当前区间矩形框最大面积
-            area_max_box_list = []
-            while current_no <= end_no:
-                for coord in subtitle_frame_no_box_dict[current_no]:
-                    # 取出每一个文本框坐标
-                    xmin, xmax, ymin, ymax = coord
-                    # 计算当前文本框坐标面积
-                    current_area = abs(xmax - xmin) * abs(ymax - ymin)
-                    # 如果区间最大框列表为空，则当前面积为区间最大面积
-                    if len(area_max_box_list) < 1:
-                        area_max_box_list.append({
-                            'area': current_area,
-                            'xmin': xmin,
-                            'xmax': xmax,
-                            'ymin': ymin,
-                            'ymax': ymax
-                        })
-                    # 如果列表非空，判断当前文本框是与区间最大文本框在同一区域
-                    else:
-                        has_same_position = False
-                        # 遍历每个区间最大文本框，判断当前文本框位置是否与区间最大文本框列表的某个文本框位于同一行且交叉
-                        for area_max_box in area_max_box_list:
-                            if (area_max_box['ymin'] - config.THRESHOLD_HEIGHT_DIFFERENCE <= ymin
-                                    and ymax <= area_max_box['ymax'] + config.THRESHOLD_HEIGHT_DIFFERENCE):
-                                if self.compute_iou((xmin, xmax, ymin, ymax), (
-                                        area_max_box['xmin'], area_max_box['xmax'], area_max_box['ymin'],
-                                        area_max_box['ymax'])) != -1:
-                                    # 如果高度差异不一样
-                                    if abs(abs(area_max_box['ymax'] - area_max_box['ymin']) - abs(
-                                            ymax - ymin)) < config.THRESHOLD_HEIGHT_DIFFERENCE:
-                                        has_same_position = True
-                                    # 如果在同一行，则计算当前面积是不是最大
-                                    # 判断面积大小，若当前面积更大，则将当前行的最大区域坐标点更新
-                                    if has_same_position and current_area > area_max_box['area']:
-                                        area_max_box['area'] = current_area
-                                        area_max_box['xmin'] = xmin
-                                        area_max_box['xmax'] = xmax
-                                        area_max_box['ymin'] = ymin
-                                        area_max_box['ymax'] = ymax
-                        # 如果遍历了所有的区间最大文本框列表，发现是新的一行，则直接添加
-                        if not has_same_position:
-                            new_large_area = {
-                                'area': current_area,
-                                'xmin': xmin,
-                                'xmax': xmax,
-                                'ymin': ymin,
-                                'ymax': ymax
-                            }
-                            if new_large_area not in area_max_box_list:
-                                area_max_box_list.append(new_large_area)
-                                break
-                current_no += 1
-            _area_max_box_list = list()
-            for area_max_box in area_max_box_list:
-                if area_max_box not in _area_max_box_list:
-                    _area_max_box_list.append(area_max_box)
-            _area_max_box_dict[f'{start_no}->{end_no}'] = _area_max_box_list
-        return _area_max_box_dict
+        """
+        获取每个区间内每一行面积最大的文本框
+        """
+        tracker = self.get_region_tracker(subtitle_frame_no_box_dict)
+        return tracker.get_area_max_box_dict(sub_frame_no_list_continuous)
 
     def get_subtitle_frame_no_box_dict_with_united_coordinates(self, subtitle_frame_no_box_dict):
         """
         将多个视频帧的文本区域坐标统一
         """
-        subtitle_frame_no_box_dict_with_united_coordinates = dict()
-        frame_no_list = self.find_continuous_ranges_with_same_mask(subtitle_frame_no_box_dict)
-        area_max_box_dict = self.get_area_max_box_dict(frame_no_list, subtitle_frame_no_box_dict)
-        for start_no, end_no in frame_no_list:
-            current_no = start_no
-            while True:
-                area_max_box_list = area_max_box_dict[f'{start_no}->{end_no}']
-                current_boxes = subtitle_frame_no_box_dict[current_no]
-                new_subtitle_frame_no_box_list = []
-                for current_box in current_boxes:
-                    current_xmin, current_xmax, current_ymin, current_ymax = current_box
-                    for max_box in area_max_box_list:
-                        large_xmin = max_box['xmin']
-                        large_xmax = max_box['xmax']
-                        large_ymin = max_box['ymin']
-                        large_ymax = max_box['ymax']
-                        box1 = (current_xmin, current_xmax, current_ymin, current_ymax)
-                        box2 = (large_xmin, large_xmax, large_ymin, large_ymax)
-                        res = self.compute_iou(box1, box2)
-                        if res != -1:
-                            new_subtitle_frame_no_box = (large_xmin, large_xmax, large_ymin, large_ymax)
-                            if new_subtitle_frame_no_box not in new_subtitle_frame_no_box_list:
-                                new_subtitle_frame_no_box_list.append(new_subtitle_frame_no_box)
-                subtitle_frame_no_box_dict_with_united_coordinates[current_no] = new_subtitle_frame_no_box_list
-                current_no += 1
-                if current_no > end_no:
-                    break
-        return subtitle_frame_no_box_dict_with_united_coordinates
+        return self.get_region_tracker(subtitle_frame_no_box_dict).unite_coordinates()
 
     def prevent_missed_detection(self, subtitle_frame_no_box_dict):
         """
@@ -543,28 +516,14 @@ class SubtitleDetect:
         """
         过滤错误的字幕区域
         """
-        sub_frame_no_list_continuous = self.find_continuous_ranges_with_same_mask(subtitle_frame_no_box_dict)
-        sub_area_with_frequency = self.get_frequency_in_range(sub_frame_no_list_continuous, subtitle_frame_no_box_dict)
-        correct_sub_area = []
-        for sub_area in sub_area_with_frequency.keys():
-            if sub_area_with_frequency[sub_area] >= (fps // 2):
-                correct_sub_area.append(sub_area)
-            else:
-                print(f'drop {sub_area}')
-        correct_subtitle_frame_no_box_dict = dict()
-        for frame_no in subtitle_frame_no_box_dict.keys():
-            current_box_list = subtitle_frame_no_box_dict[frame_no]
-            new_box_list = []
-            for current_box in current_box_list:
-                if str(current_box) in correct_sub_area and current_box not in new_box_list:
-                    new_box_list.append(current_box)
-            correct_subtitle_frame_no_box_dict[frame_no] = new_box_list
-        return correct_subtitle_frame_no_box_dict
-
+        return self.get_region_tracker(subtitle_frame_no_box_dict).filter_mistake_sub_area(fps).to_dict()
 
 class SubtitleRemover:
-    def __init__(self, vd_path, sub_area=None, sub_areas=None, gui_mode=False):
-        importlib.reload(config)
+    def __init__(self, vd_path, sub_area=None, sub_areas=None, gui_mode=False, reload_config=True,
+                 frame_range=None, video_hash=None):
+        # 常驻worker进程中配置不会被修改，无需重新加载
+        if reload_config:
+            importlib.reload(config)
         # 线程锁
         self.lock = threading.RLock()
         # 用户指定的字幕区域位置
@@ -592,15 +551,35 @@ class SubtitleRemover:
         self.mask_size = (int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
         self.frame_height = int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.frame_width = int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        # 分段并行处理时当前进程只处理[start, end]范围内的帧，end为None表示处理到视频结尾
+        self.frame_range = frame_range
+        if frame_range is not None:
+            self.video_cap = FrameRangeCapture(self.video_cap, frame_range[1])
+        # 分段并行处理的各分段目录
+        self.part_writers = []
         # 创建字幕检测对象
         self.sub_detector = SubtitleDetect(self.video_path, self.sub_area)
         # 创建视频临时对象，windows下delete=True会有permission denied的报错
         self.video_temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-        # 创建视频写对象
-        self.video_writer = cv2.VideoWriter(self.video_temp_file.name, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, self.size)
+        # 检测结果缓存与分段续处理使用的sidecar目录
+        self.job_cache = None if self.is_picture else JobCache(self.video_path, video_hash)
+        self.detection_cache = None
+        # 本次检测得到的(字幕帧号与坐标, SubtitleRegionTracker)，用于计算区间时避免重新构建tracker
+        self.detected_regions = None
+        # 创建视频写对象，开启断点续处理或分段并行处理时分段写入
+        if frame_range is not None:
+            self.video_writer = SegmentWriter(self.get_part_dir(frame_range), self.fps, self.size,
+                                              self.get_inpaint_key(), config.SEGMENT_COMMIT_FRAMES)
+        elif config.RESUMABLE and self.job_cache is not None:
+            self.video_writer = SegmentWriter(self.job_cache.segment_dir, self.fps, self.size,
+                                              self.get_inpaint_key(), config.SEGMENT_COMMIT_FRAMES)
+        else:
+            self.video_writer = cv2.VideoWriter(self.video_temp_file.name, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, self.size)
         self.video_out_name = os.path.join(os.path.dirname(self.video_path), f'{self.vd_name}_no_sub.mp4')
         self.video_inpaint = None
         self.lama_inpaint = None
+        # 分批读取重绘区间的帧缓冲区
+        self.frame_store = None
         self.ext = os.path.splitext(vd_path)[-1]
         if self.is_picture:
             pic_dir = os.path.join(os.path.dirname(self.video_path), 'no_sub')
@@ -625,6 +604,10 @@ class SubtitleRemover:
         self.preview_frame = None
         # 是否将原音频嵌入到去除字幕后的视频
         self.is_successful_merged = False
+        # 取消任务的事件，由worker进程设置
+        self.cancel_event = None
+        # 重绘阶段的统计信息，如LaMa补丁复用次数
+        self.inpaint_stats = {}
 
     @staticmethod
     def get_coordinates(dt_box):
@@ -668,7 +651,188 @@ class SubtitleRemover:
                 return end_no
         return -1
 
+    def get_detection_key(self):
+        """
+        检测结果缓存的key，由视频文件hash与检测配置决定
+        """
+        return get_config_hash(self.job_cache.video_hash, config.MODEL_VERSION, self.sub_area,
+                               config.PIXEL_TOLERANCE_X, config.PIXEL_TOLERANCE_Y)
+
+    @staticmethod
+    def get_scene_cuts_key():
+        """
+        场景切换结果缓存的key，由场景检测配置决定（与字幕检测结果分开，修改时不需要重新检测字幕）
+        """
+        return get_config_hash(config.SCENE_DETECT_PROXY_WIDTH, config.SCENE_DETECT_THRESHOLD,
+                               config.SCENE_DETECT_MIN_SCENE_LEN)
+
+    def get_scene_stats_path(self):
+        """
+        场景检测每帧指标的缓存文件，指标只取决于视频和缩放宽度，与切换阈值无关
+        """
+        if not config.DETECTION_CACHE or self.job_cache is None:
+            return None
+        return self.job_cache.get_scene_stats_path(
+            get_config_hash(self.job_cache.video_hash, config.SCENE_DETECT_PROXY_WIDTH))
+
+    def get_inpaint_key(self):
+        """
+        分段续处理的key，检测结果或重绘配置发生变化时，之前完成的分段作废
+        """
+        return get_config_hash(self.get_detection_key(), self.get_scene_cuts_key(), config.MODE.value, self.sub_areas,
+                               config.STTN_SKIP_DETECTION, config.STTN_NEIGHBOR_STRIDE, config.STTN_REFERENCE_LENGTH,
+                               config.STTN_MAX_LOAD_NUM, config.PROPAINTER_MAX_LOAD_NUM,
+                               config.PROPAINTER_ROI_MAX_SIDE, config.LAMA_SUPER_FAST, config.LAMA_ROI_MAX_SIDE,
+                               config.ROI_INPAINT, config.ROI_CONTEXT_MARGIN,
+                               config.THRESHOLD_HEIGHT_WIDTH_DIFFERENCE, config.SUBTITLE_AREA_DEVIATION_PIXEL,
+                               config.STTN_STREAMING, config.LAMA_PATCH_REUSE, config.LAMA_REUSE_THRESHOLD,
+                               config.LAMA_REUSE_MAX_RUN, config.PROPAINTER_FLOW_MAX_SIDE,
+                               config.PROPAINTER_RAFT_MIN_ITERS)
+
+    def get_detection_cache(self):
+        """
+        读取检测结果缓存，未开启缓存或没有缓存时返回空dict
+        """
+        if self.detection_cache is None:
+            self.detection_cache = {}
+            if config.DETECTION_CACHE and self.job_cache is not None:
+                self.detection_cache = self.job_cache.load_detection(self.get_detection_key()) or {}
+                # 场景切换结果取决于场景检测配置，配置变化时丢弃，重新检测
+                if self.detection_cache.get('scene_cuts_key') != self.get_scene_cuts_key():
+                    self.detection_cache.pop('scene_cuts', None)
+                    self.detection_cache.pop('scene_cuts_key', None)
+        return self.detection_cache
+
+    def save_detection_cache(self):
+        if config.DETECTION_CACHE and self.job_cache is not None and 'subtitle_frame_no_box_dict' in self.detection_cache:
+            self.job_cache.save_detection(self.get_detection_key(), **self.detection_cache)
+
+    def find_subtitle_frame_no(self):
+        """
+        获取字幕帧号与坐标，优先从检测结果缓存中读取
+        """
+        cache = self.get_detection_cache()
+        if 'subtitle_frame_no_box_dict' in cache:
+            print('[Finished] load subtitles from detection cache')
+            self.progress_total = 50
+            return cache['subtitle_frame_no_box_dict']
+        sub_list, region_tracker = self.sub_detector.find_subtitle_frame_no(sub_remover=self)
+        self.detected_regions = (sub_list, region_tracker)
+        cache['subtitle_frame_no_box_dict'] = sub_list
+        self.save_detection_cache()
+        return sub_list
+
+    def find_continuous_ranges_with_same_mask(self, sub_list):
+        cache = self.get_detection_cache()
+        if 'continuous_ranges' not in cache:
+            if self.detected_regions is not None and self.detected_regions[0] is sub_list:
+                # sub_list就是本次检测的结果，直接使用检测时构建的tracker计算区间
+                cache['continuous_ranges'] = self.detected_regions[1].find_continuous_ranges_with_same_mask()
+            else:
+                cache['continuous_ranges'] = self.sub_detector.find_continuous_ranges_with_same_mask(sub_list)
+            self.save_detection_cache()
+        return list(cache['continuous_ranges'])
+
+    def get_scene_div_frame_no(self):
+        cache = self.get_detection_cache()
+        if 'scene_cuts' not in cache:
+            cache['scene_cuts'] = self.sub_detector.get_scene_div_frame_no(self.video_path, self.get_scene_stats_path())
+            cache['scene_cuts_key'] = self.get_scene_cuts_key()
+            self.save_detection_cache()
+        return list(cache['scene_cuts'])
+
+    @property
+    def segment_frame_count(self):
+        """
+        当前需要处理的帧数
+        """
+        if self.frame_range is None:
+            return self.frame_count
+        start, end = self.frame_range
+        return (end if end is not None else self.frame_count) - start + 1
+
+    def get_part_dir(self, frame_range):
+        start, end = frame_range
+        return os.path.join(self.job_cache.segment_dir, f'part_{start}_{end if end is not None else "end"}')
+
+    def skip_committed_frames(self, tbar):
+        """
+        跳过分段起点之前的帧以及断点续处理时已提交分段中的帧，返回跳过后的帧号
+        """
+        start_frame_no = 0
+        if self.frame_range is not None:
+            start_frame_no = self.frame_range[0] - 1
+            self.video_cap.seek(start_frame_no)
+        committed_frames = self.video_writer.committed_frames if isinstance(self.video_writer, SegmentWriter) else 0
+        if committed_frames == 0:
+            return start_frame_no
+        print(f'[Resume] {committed_frames} frames have been processed, continue from frame {start_frame_no + committed_frames + 1}')
+        for _ in range(committed_frames):
+            if not self.video_cap.grab():
+                break
+        self.update_progress(tbar, increment=committed_frames)
+        return start_frame_no + committed_frames
+
+    def get_inpaint_intervals(self, sub_list):
+        """
+        获取当前算法需要整体重绘的区间，区间内的帧需要在同一个分段中处理
+        """
+        if len(sub_list) == 0:
+            return []
+        if config.MODE == config.InpaintMode.PROPAINTER:
+            continuous_frame_no_list = self.find_continuous_ranges_with_same_mask(sub_list)
+            scene_div_points = self.get_scene_div_frame_no()
+            return self.sub_detector.split_range_by_scene(continuous_frame_no_list, scene_div_points)
+        elif config.MODE == config.InpaintMode.STTN:
+            continuous_frame_no_list = self.find_continuous_ranges_with_same_mask(sub_list)
+            return self.sub_detector.filter_and_merge_intervals(continuous_frame_no_list)
+        # LAMA逐帧处理
+        return []
+
+    def checkpoint(self, force=False):
+        """
+        在安全点(之前的帧均已写入，且不处于重绘区间中间)提交分段
+        """
+        if isinstance(self.video_writer, SegmentWriter):
+            self.video_writer.checkpoint(force=force)
+
+    def check_cancelled(self):
+        """
+        如果任务已被取消，则抛出TaskCancelledError中断处理
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise TaskCancelledError(f'task for {self.video_path} has been cancelled')
+
+    def release(self):
+        """
+        释放视频读写对象
+        """
+        self.video_cap.release()
+        self.video_writer.release()
+        if self.frame_store is not None:
+            self.frame_store.release()
+            self.frame_store = None
+
+    def read_interval_batches(self, first_frame, frame_count, max_batch_size):
+        """
+        分批读取从first_frame开始的frame_count帧，每个批次为帧缓冲区的视图，读取下一批时会被覆盖
+        """
+        frame_shape = first_frame.shape
+        if self.frame_store is None or not self.frame_store.fits(frame_shape, max_batch_size):
+            if self.frame_store is not None:
+                self.frame_store.release()
+            self.frame_store = FrameStore(frame_shape, max_batch_size, config.FRAME_STORE_MAX_MB)
+        for batch_size in get_batch_sizes(frame_count, max_batch_size):
+            batch = self.frame_store.read(self.video_cap, batch_size, first_frame)
+            first_frame = None
+            if len(batch) == 0:
+                break
+            yield batch
+            if len(batch) < batch_size:
+                break
+
     def update_progress(self, tbar, increment):
+        self.check_cancelled()
         tbar.update(increment)
         current_percentage = (tbar.n / tbar.total) * 100
         self.progress_remover = int(current_percentage) // 2
@@ -676,15 +840,13 @@ class SubtitleRemover:
 
     def propainter_mode(self, tbar):
         print('use propainter mode')
-        sub_list = self.sub_detector.find_subtitle_frame_no(sub_remover=self)
-        continuous_frame_no_list = self.sub_detector.find_continuous_ranges_with_same_mask(sub_list)
-        scene_div_points = self.sub_detector.get_scene_div_frame_no(self.video_path)
-        continuous_frame_no_list = self.sub_detector.split_range_by_scene(continuous_frame_no_list,
-                                                                          scene_div_points)
-        self.video_inpaint = VideoInpaint(config.PROPAINTER_MAX_LOAD_NUM)
+        sub_list = self.find_subtitle_frame_no()
+        continuous_frame_no_list = self.get_inpaint_intervals(sub_list)
+        self.video_inpaint = get_shared_model('propainter', lambda: VideoInpaint(config.PROPAINTER_MAX_LOAD_NUM))
         print('[Processing] start removing subtitles...')
-        index = 0
+        index = self.skip_committed_frames(tbar)
         while True:
+            self.checkpoint()
             ret, frame = self.video_cap.read()
             if not ret:
                 break
@@ -708,56 +870,32 @@ class SubtitleRemover:
                     # 如果获取的结束帧号不为-1则说明
                     if end_frame_no != -1:
                         print(f'find end: {end_frame_no}')
-                        # ************ 读取该区间所有帧 start ************
-                        temp_frames = list()
-                        # 将头帧加入处理列表
-                        temp_frames.append(frame)
+                        # 1. 获取当前区间使用的mask
+                        mask = create_mask(self.mask_size, sub_list[start_frame_no])
                         inner_index = 0
-                        # 一直读取到尾帧
-                        while index < end_frame_no:
-                            ret, frame = self.video_cap.read()
-                            if not ret:
-                                break
-                            index += 1
-                            temp_frames.append(frame)
-                        # ************ 读取该区间所有帧 end ************
-                        if len(temp_frames) < 1:
-                            # 没有待处理，直接跳过
-                            continue
-                        elif len(temp_frames) == 1:
-                            inner_index += 1
-                            single_mask = create_mask(self.mask_size, sub_list[index])
-                            if self.lama_inpaint is None:
-                                self.lama_inpaint = LamaInpaint()
-                            inpainted_frame = self.lama_inpaint(frame, single_mask)
-                            self.video_writer.write(inpainted_frame)
-                            print(f'write frame: {start_frame_no + inner_index} with mask {sub_list[start_frame_no]}')
-                            self.update_progress(tbar, increment=1)
-                            continue
-                        else:
-                            # 将读取的视频帧分批处理
-                            # 1. 获取当前批次使用的mask
-                            mask = create_mask(self.mask_size, sub_list[start_frame_no])
-                            for batch in batch_generator(temp_frames, config.PROPAINTER_MAX_LOAD_NUM):
-                                # 2. 调用批推理
-                                if len(batch) == 1:
-                                    single_mask = create_mask(self.mask_size, sub_list[start_frame_no])
-                                    if self.lama_inpaint is None:
-                                        self.lama_inpaint = LamaInpaint()
-                                    inpainted_frame = self.lama_inpaint(frame, single_mask)
+                        # 2. 分批读取该区间的帧并推理，不再一次性读入整个区间
+                        for batch in self.read_interval_batches(frame, end_frame_no - start_frame_no + 1,
+                                                                config.PROPAINTER_MAX_LOAD_NUM):
+                            index = start_frame_no + inner_index + len(batch) - 1
+                            if len(batch) == 1:
+                                # 只有一帧时ProPainter无法计算光流，使用LaMa重绘该批次中的帧
+                                if self.lama_inpaint is None:
+                                    self.lama_inpaint = get_shared_model('lama', LamaInpaint)
+                                inpainted_frame = self.lama_inpaint(batch[0], mask)
+                                self.video_writer.write(inpainted_frame)
+                                print(f'write frame: {start_frame_no + inner_index} with mask {sub_list[start_frame_no]}')
+                                inner_index += 1
+                                if self.gui_mode:
+                                    self.preview_frame = cv2.hconcat([batch[0], inpainted_frame])
+                            else:
+                                inpainted_frames = self.video_inpaint.inpaint(batch, mask)
+                                for i, inpainted_frame in enumerate(inpainted_frames):
                                     self.video_writer.write(inpainted_frame)
-                                    print(f'write frame: {start_frame_no + inner_index} with mask {sub_list[index]}')
+                                    print(f'write frame: {start_frame_no + inner_index} with mask {sub_list[start_frame_no]}')
                                     inner_index += 1
-                                    self.update_progress(tbar, increment=1)
-                                elif len(batch) > 1:
-                                    inpainted_frames = self.video_inpaint.inpaint(batch, mask)
-                                    for i, inpainted_frame in enumerate(inpainted_frames):
-                                        self.video_writer.write(inpainted_frame)
-                                        print(f'write frame: {start_frame_no + inner_index} with mask {sub_list[index]}')
-                                        inner_index += 1
-                                        if self.gui_mode:
-                                            self.preview_frame = cv2.hconcat([batch[i], inpainted_frame])
-                                self.update_progress(tbar, increment=len(batch))
+                                    if self.gui_mode:
+                                        self.preview_frame = cv2.hconcat([batch[i], inpainted_frame])
+                            self.update_progress(tbar, increment=len(batch))
 
     def sttn_mode_with_no_detection(self, tbar):
         """
@@ -778,7 +916,12 @@ class SubtitleRemover:
             ymin, ymax, xmin, xmax = 0, self.frame_height, 0, self.frame_width
             mask_area_coordinates = [(xmin, xmax, ymin, ymax)]
         mask = create_mask(self.mask_size, mask_area_coordinates)
-        sttn_video_inpaint = STTNVideoInpaint(self.video_path)
+        # 该流程总是从第一帧开始写入，不能续处理，丢弃上次运行已提交的分段，否则拼接后视频内容会重复
+        if isinstance(self.video_writer, SegmentWriter) and self.video_writer.committed_frames > 0:
+            print(f'[Resume] sttn mode with no detection can not resume, '
+                  f'discard {self.video_writer.committed_frames} committed frames')
+            self.video_writer.reset()
+        sttn_video_inpaint = STTNVideoInpaint(self.video_path, sttn_inpaint=get_shared_model('sttn', STTNInpaint))
         sttn_video_inpaint(input_mask=mask, input_sub_remover=self, tbar=tbar)
 
     def sttn_mode(self, tbar):
@@ -788,19 +931,18 @@ class SubtitleRemover:
             self.sttn_mode_with_no_detection(tbar)
         else:
             print('use sttn mode')
-            sttn_inpaint = STTNInpaint()
-            sub_list = self.sub_detector.find_subtitle_frame_no(sub_remover=self)
-            continuous_frame_no_list = self.sub_detector.find_continuous_ranges_with_same_mask(sub_list)
-            print(continuous_frame_no_list)
-            continuous_frame_no_list = self.sub_detector.filter_and_merge_intervals(continuous_frame_no_list)
+            sttn_inpaint = get_shared_model('sttn', STTNInpaint)
+            sub_list = self.find_subtitle_frame_no()
+            continuous_frame_no_list = self.get_inpaint_intervals(sub_list)
             print(continuous_frame_no_list)
             start_end_map = dict()
             for interval in continuous_frame_no_list:
                 start, end = interval
                 start_end_map[start] = end
-            current_frame_index = 0
             print('[Processing] start removing subtitles...')
+            current_frame_index = self.skip_committed_frames(tbar)
             while True:
+                self.checkpoint()
                 ret, frame = self.video_cap.read()
                 # 如果读取到为，则结束
                 if not ret:
@@ -818,17 +960,7 @@ class SubtitleRemover:
                     start_frame_index = current_frame_index
                     end_frame_index = start_end_map[current_frame_index]
                     print(f'processing frame {start_frame_index} to {end_frame_index}')
-                    # 用于存储需要去字幕的视频帧
-                    frames_need_inpaint = list()
-                    frames_need_inpaint.append(frame)
                     inner_index = 0
-                    # 接着往下读，直到读取到尾巴
-                    for j in range(end_frame_index - start_frame_index):
-                        ret, frame = self.video_cap.read()
-                        if not ret:
-                            break
-                        current_frame_index += 1
-                        frames_need_inpaint.append(frame)
                     mask_area_coordinates = []
                     # 1. 获取当前批次的mask坐标全集
                     for mask_index in range(start_frame_index, end_frame_index):
@@ -843,46 +975,149 @@ class SubtitleRemover:
                     # 1. 获取当前批次使用的mask
                     mask = create_mask(self.mask_size, mask_area_coordinates)
                     print(f'inpaint with mask: {mask_area_coordinates}')
-                    for batch in batch_generator(frames_need_inpaint, config.STTN_MAX_LOAD_NUM):
-                        # 2. 调用批推理
-                        if len(batch) >= 1:
-                            inpainted_frames = sttn_inpaint(batch, mask)
-                            for i, inpainted_frame in enumerate(inpainted_frames):
-                                self.video_writer.write(inpainted_frame)
-                                print(f'write frame: {start_frame_index + inner_index} with mask')
-                                inner_index += 1
-                                if self.gui_mode:
-                                    self.preview_frame = cv2.hconcat([batch[i], inpainted_frame])
+                    # 2. 分批读取该区间的帧并推理，不再一次性读入整个区间
+                    for batch in self.read_interval_batches(frame, end_frame_index - start_frame_index + 1,
+                                                            config.STTN_MAX_LOAD_NUM):
+                        current_frame_index = start_frame_index + inner_index + len(batch) - 1
+                        # sttn会原地写回修复结果，预览时需要保留原始帧
+                        original_frames = [f.copy() for f in batch] if self.gui_mode else None
+                        inpainted_frames = sttn_inpaint(batch, mask)
+                        for i, inpainted_frame in enumerate(inpainted_frames):
+                            self.video_writer.write(inpainted_frame)
+                            inner_index += 1
+                            if self.gui_mode:
+                                self.preview_frame = cv2.hconcat([original_frames[i], inpainted_frame])
                         self.update_progress(tbar, increment=len(batch))
 
     def lama_mode(self, tbar):
         print('use lama mode')
-        sub_list = self.sub_detector.find_subtitle_frame_no(sub_remover=self)
+        sub_list = self.find_subtitle_frame_no()
         if self.lama_inpaint is None:
-            self.lama_inpaint = LamaInpaint()
-        index = 0
+            self.lama_inpaint = get_shared_model('lama', LamaInpaint)
+        # 背景不变时复用上一次重绘的补丁
+        patch_cache = None
+        if config.LAMA_PATCH_REUSE and not config.LAMA_SUPER_FAST and not self.is_picture:
+            patch_cache = LamaPatchCache(config.LAMA_REUSE_THRESHOLD, config.LAMA_REUSE_MAX_RUN)
+            self.inpaint_stats = patch_cache.stats
+        # 等待写出的帧，按读取顺序排列；需要推理的帧攒够一批后批量推理
+        pending = deque()
+        anchors = []
+        max_pending = config.LAMA_BATCH_SIZE * (config.LAMA_REUSE_MAX_RUN + 1)
+
+        def flush():
+            if anchors:
+                results = self.lama_inpaint.inpaint_frames([anchor['frame'] for anchor in anchors],
+                                                           [anchor['mask'] for anchor in anchors])
+                for anchor, result in zip(anchors, results):
+                    anchor['result'] = result
+                    anchor['frame'] = anchor['mask'] = None
+                anchors.clear()
+
+        def write_ready():
+            while pending and (pending[0]['anchor'] is None or pending[0]['anchor']['result'] is not None):
+                item = pending.popleft()
+                frame = item['frame']
+                if item['anchor'] is not None:
+                    frame = LamaPatchCache.paste(frame, item['anchor']) if item['reuse'] else item['anchor']['result']
+                if self.gui_mode:
+                    self.preview_frame = cv2.hconcat([item['frame'], frame])
+                if self.is_picture:
+                    cv2.imencode(self.ext, frame)[1].tofile(self.video_out_name)
+                else:
+                    self.video_writer.write(frame)
+                self.check_cancelled()
+                tbar.update(1)
+                self.progress_remover = 100 * float(item['index']) / float(self.frame_count) // 2
+                self.progress_total = 50 + self.progress_remover
+
         print('[Processing] start removing subtitles...')
+        index = self.skip_committed_frames(tbar)
         while True:
+            self.checkpoint()
             ret, frame = self.video_cap.read()
             if not ret:
                 break
-            original_frame = frame
             index += 1
+            item = {'index': index, 'frame': frame, 'anchor': None, 'reuse': False}
             if index in sub_list.keys():
                 mask = create_mask(self.mask_size, sub_list[index])
                 if config.LAMA_SUPER_FAST:
-                    frame = cv2.inpaint(frame, mask, 3, cv2.INPAINT_TELEA)
+                    item['anchor'] = {'result': cv2.inpaint(frame, mask, 3, cv2.INPAINT_TELEA)}
                 else:
-                    frame = self.lama_inpaint(frame, mask)
-            if self.gui_mode:
-                self.preview_frame = cv2.hconcat([original_frame, frame])
-            if self.is_picture:
-                cv2.imencode(self.ext, frame)[1].tofile(self.video_out_name)
-            else:
-                self.video_writer.write(frame)
-            tbar.update(1)
-            self.progress_remover = 100 * float(index) / float(self.frame_count) // 2
-            self.progress_total = 50 + self.progress_remover
+                    mask_key = tuple(map(tuple, sub_list[index]))
+                    anchor = patch_cache.match(frame, mask_key) if patch_cache is not None else None
+                    if anchor is not None:
+                        item['reuse'] = True
+                    else:
+                        anchor = patch_cache.add_anchor(frame, mask, mask_key) if patch_cache is not None else \
+                            {'result': None}
+                        anchor.update(frame=frame, mask=mask)
+                        anchors.append(anchor)
+                    item['anchor'] = anchor
+            pending.append(item)
+            # 复用补丁时需要推理的帧很少，限制等待写出的帧数，避免内存随视频长度增长
+            if len(anchors) >= config.LAMA_BATCH_SIZE or len(pending) >= max_pending:
+                flush()
+            write_ready()
+        flush()
+        write_ready()
+        if patch_cache is not None:
+            print(f"[LaMa] inferred {patch_cache.stats['inferred']} frames, reused {patch_cache.stats['reused']} patches")
+
+    def remove_subtitles(self, tbar):
+        """
+        使用当前算法去除字幕，结果写入video_writer
+        """
+        # 精准模式下，获取场景分割的帧号，进一步切割
+        if config.MODE == config.InpaintMode.PROPAINTER:
+            self.propainter_mode(tbar)
+        elif config.MODE == config.InpaintMode.STTN:
+            self.sttn_mode(tbar)
+        else:
+            self.lama_mode(tbar)
+        # 重绘中途被取消时不生成结果，已提交的分段保留用于续处理
+        self.check_cancelled()
+        self.checkpoint(force=True)
+
+    def can_run_in_parallel(self):
+        if config.SEGMENT_PARALLEL_NUM <= 1 or self.frame_range is not None or self.job_cache is None:
+            return False
+        # 跳过字幕检测的STTN由STTNVideoInpaint整体读取视频，不支持分段
+        if config.MODE == config.InpaintMode.STTN and config.STTN_SKIP_DETECTION:
+            return False
+        return self.frame_count >= 2 * config.SEGMENT_MIN_FRAMES
+
+    def run_segments_in_parallel(self, tbar):
+        """
+        分段并行去除字幕：在场景切换或无字幕的位置将视频切分为互相独立的分段，交给常驻模型的进程池并行处理
+        """
+        sub_list = self.find_subtitle_frame_no()
+        intervals = self.get_inpaint_intervals(sub_list)
+        detection_cache = self.get_detection_cache()
+        segments = split_segments(self.frame_count, intervals, list(sub_list.keys()),
+                                  detection_cache.get('scene_cuts', []),
+                                  config.SEGMENT_PARALLEL_NUM * 2, config.SEGMENT_MIN_FRAMES)
+        if len(segments) <= 1:
+            self.remove_subtitles(tbar)
+            return
+        # 最后一个分段读取到视频结尾，防止视频帧数不准确时丢帧
+        segments[-1] = (segments[-1][0], None)
+        print(f'[Processing] start removing subtitles in {len(segments)} segments '
+              f'with {config.SEGMENT_PARALLEL_NUM} processes...')
+        tasks = [(i, self.video_path, frame_range, self.sub_area, self.sub_areas, self.job_cache.video_hash,
+                  detection_cache) for i, frame_range in enumerate(segments)]
+        ctx = multiprocessing.get_context('spawn')
+        progress = ctx.Array('i', len(segments), lock=False)
+        with ctx.Pool(processes=config.SEGMENT_PARALLEL_NUM, initializer=init_segment_worker,
+                      initargs=(config.SEGMENT_THREAD_NUM, config.MODE.value, progress)) as pool:
+            result = pool.map_async(remove_segment, tasks, chunksize=1)
+            # 等待处理完成并汇总各分段的进度，取消任务时退出with语句会终止进程池
+            while not result.ready():
+                result.wait(0.5)
+                self.update_progress(tbar, increment=min(sum(progress), tbar.total) - tbar.n)
+            result.get()
+        self.part_writers = [SegmentWriter(self.get_part_dir(frame_range), self.fps, self.size, self.get_inpaint_key())
+                             for frame_range in segments]
 
     def run(self):
         # 记录开始时间
@@ -892,8 +1127,8 @@ class SubtitleRemover:
         tbar = tqdm(total=int(self.frame_count), unit='frame', position=0, file=sys.__stdout__,
                     desc='Subtitle Removing')
         if self.is_picture:
-            sub_list = self.sub_detector.find_subtitle_frame_no(sub_remover=self)
-            self.lama_inpaint = LamaInpaint()
+            sub_list = self.find_subtitle_frame_no()
+            self.lama_inpaint = get_shared_model('lama', LamaInpaint)
             original_frame = cv2.imread(self.video_path)
             if len(sub_list):
                 mask = create_mask(original_frame.shape[0:2], sub_list[1])
@@ -905,19 +1140,23 @@ class SubtitleRemover:
             cv2.imencode(self.ext, inpainted_frame)[1].tofile(self.video_out_name)
             tbar.update(1)
             self.progress_total = 100
+        elif self.can_run_in_parallel():
+            self.run_segments_in_parallel(tbar)
         else:
-            # 精准模式下，获取场景分割的帧号，进一步切割
-            if config.MODE == config.InpaintMode.PROPAINTER:
-                self.propainter_mode(tbar)
-            elif config.MODE == config.InpaintMode.STTN:
-                self.sttn_mode(tbar)
-            else:
-                self.lama_mode(tbar)
-        self.video_cap.release()
-        self.video_writer.release()
+            self.remove_subtitles(tbar)
+        self.release()
+        if self.part_writers:
+            # 按顺序拼接各分段的结果
+            concat_videos([f for part_writer in self.part_writers for f in part_writer.segment_files],
+                          self.video_temp_file.name, config.FFMPEG_PATH)
+        elif isinstance(self.video_writer, SegmentWriter):
+            # 将所有分段拼接为完整视频
+            self.video_writer.concat(self.video_temp_file.name, config.FFMPEG_PATH)
         if not self.is_picture:
             # 将原音频合并到新生成的视频文件中
             self.merge_audio_to_video()
+            if self.job_cache is not None:
+                self.job_cache.clear_segments()
             print(f"[Finished]Subtitle successfully removed, video generated at：{self.video_out_name}")
         else:
             print(f"[Finished]Subtitle successfully removed, picture generated at：{self.video_out_name}")
@@ -0,0 +1,221 @@
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 各算法单个任务的预估内存占用(MB)，用于任务准入
+JOB_MEMORY_MB = {
+    'sttn': 3072,
+    'lama': 2560,
+    'propainter': 6144,
+}
+# 未知算法时的预估内存占用(MB)
+DEFAULT_JOB_MEMORY_MB = 3072
+
+
+def get_available_cores() -> List[int]:
+    """
+    当前进程可以使用的CPU核心编号
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def get_available_memory_mb() -> Optional[float]:
+    """
+    系统可用内存(MB)，无法获取时返回None
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.ullAvailPhys / 1024 / 1024
+        except Exception:
+            pass
+    return None
+
+
+def get_process_rss_mb() -> Optional[float]:
+    """
+    当前进程的常驻内存(MB)，无法获取时返回None
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class ResourceGovernor:
+    """
+    任务资源调度器，运行在API进程中(不加载torch)：
+    1. 每个任务分配线程预算与一组独占的CPU核心(亲和性)，由worker进程在处理任务前应用
+    2. 空闲核心不足或可用内存不足时任务继续排队，避免多个任务抢占所有核心导致缓存抖动
+    3. 可用内存按系统可用内存减去已准入任务尚未占用的预估内存计算，防止同时准入过多任务
+    4. 记录每个任务的资源分配与worker上报的资源占用
+    """
+
+    def __init__(self, threads_per_job=0, num_workers=1, reserved_cores=0, memory_per_job_mb=None,
+                 min_free_memory_mb=1024):
+        self.cores = get_available_cores()
+        usable = max(len(self.cores) - max(int(reserved_cores), 0), 1)
+        # 未指定时按worker数量平分核心
+        if threads_per_job <= 0:
+            threads_per_job = max(usable // max(int(num_workers), 1), 1)
+        self.threads_per_job = min(int(threads_per_job), usable)
+        # 保留的核心留给API进程与解码等
+        self.free_cores = self.cores[len(self.cores) - usable:]
+        self.memory_per_job_mb = memory_per_job_mb
+        self.min_free_memory_mb = min_free_memory_mb
+        # {task_id: {'cores', 'threads', 'memory_mb', 'admitted_at', 'usage'}}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def estimate_memory_mb(self, task: Dict[str, Any]):
+        if self.memory_per_job_mb:
+            return self.memory_per_job_mb
+        return JOB_MEMORY_MB.get(task.get('algorithm') or '', DEFAULT_JOB_MEMORY_MB)
+
+    def get_free_memory_mb(self):
+        """
+        可用内存减去已准入任务还未占用的预估内存，无法获取系统内存时返回None
+        """
+        available = get_available_memory_mb()
+        if available is None:
+            return None
+        pending = 0
+        for job in self.jobs.values():
+            rss = (job['usage'] or {}).get('rss_mb') or 0
+            pending += max(job['memory_mb'] - rss, 0)
+        return available - pending
+
+    def try_acquire(self, task_id, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        为任务分配资源，资源不足时返回None，任务应继续排队
+        """
+        with self.lock:
+            if len(self.free_cores) < self.threads_per_job:
+                return None
+            memory_mb = self.estimate_memory_mb(task)
+            free_memory = self.get_free_memory_mb()
+            if free_memory is not None and free_memory - memory_mb < self.min_free_memory_mb:
+                # 没有正在运行的任务时仍然准入，避免任务一直无法执行
+                if self.jobs:
+                    return None
+                print(f'[ResourceGovernor] low memory ({free_memory:.0f}MB free), admitting {task_id} anyway')
+            cores = self.free_cores[:self.threads_per_job]
+            self.free_cores = self.free_cores[self.threads_per_job:]
+            self.jobs[task_id] = {'cores': cores, 'threads': len(cores), 'memory_mb': memory_mb,
+                                  'admitted_at': time.time(), 'usage': None}
+            return {'cores': cores, 'threads': len(cores), 'memory_mb': memory_mb}
+
+    def release(self, task_id):
+        with self.lock:
+            job = self.jobs.pop(task_id, None)
+            if job is not None:
+                self.free_cores = sorted(self.free_cores + job['cores'])
+
+    def update_usage(self, task_id, usage: Dict[str, Any]):
+        with self.lock:
+            job = self.jobs.get(task_id)
+            if job is not None:
+                job['usage'] = usage
+
+    def get_job(self, task_id) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(task_id)
+            return None if job is None else {key: value for key, value in job.items() if key != 'admitted_at'}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'total_cores': len(self.cores),
+                'free_cores': len(self.free_cores),
+                'threads_per_job': self.threads_per_job,
+                'running_jobs': len(self.jobs),
+                'free_memory_mb': self.get_free_memory_mb(),
+            }
+
+
+def apply_resource_budget(budget: Optional[Dict[str, Any]]):
+    """
+    在worker进程中应用任务的资源预算：CPU亲和性、torch/OpenCV线程数与onnxruntime会话线程数
+    """
+    if not budget:
+        return
+    threads = budget['threads']
+    if budget.get('cores') and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, budget['cores'])
+        except OSError as e:
+            print(f'[ResourceGovernor] failed to set cpu affinity: {e}')
+    import cv2
+    import torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    # 以不同方式导入的config模块都需要更新，已创建的onnxruntime会话在下次推理时按新的线程数重建
+    for name in ('config', 'backend.config'):
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, 'ONNX_INTRA_OP_THREADS'):
+            module.ONNX_INTRA_OP_THREADS = threads
+
+
+class ResourceUsageMonitor:
+    """
+    统计worker进程处理一个任务期间的资源占用
+    """
+
+    def __init__(self, budget: Optional[Dict[str, Any]] = None):
+        self.budget = budget or {}
+        self.start_wall = time.time()
+        self.start_cpu = time.process_time()
+        self.peak_rss_mb = 0
+        self.cuda = False
+        try:
+            import torch
+            self.cuda = torch.cuda.is_available()
+            if self.cuda:
+                torch.cuda.reset_peak_memory_stats()
+        except Exception:
+            pass
+
+    def sample(self) -> Dict[str, Any]:
+        wall = max(time.time() - self.start_wall, 1e-6)
+        cpu_seconds = time.process_time() - self.start_cpu
+        rss_mb = get_process_rss_mb()
+        if rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+        usage = {
+            'wall_seconds': round(wall, 1),
+            'cpu_seconds': round(cpu_seconds, 1),
+            # 平均占用的核心数，不应明显超过分配的线程数
+            'cpu_cores_used': round(cpu_seconds / wall, 2),
+            'rss_mb': None if rss_mb is None else round(rss_mb),
+            'peak_rss_mb': round(self.peak_rss_mb),
+            'threads': self.budget.get('threads'),
+        }
+        if self.cuda:
+            import torch
+            usage['gpu_peak_memory_mb'] = round(torch.cuda.max_memory_allocated() / 1024 / 1024)
+        return usage
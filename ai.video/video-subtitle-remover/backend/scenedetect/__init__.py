@@ -109,6 +109,7 @@ def scene_detect(
     start_time: Optional[Union[str, float, int]] = None,
     end_time: Optional[Union[str, float, int]] = None,
     start_in_scene: bool = False,
+    workers: int = 0,
 ) -> List[Tuple[FrameTimecode, FrameTimecode]]:
     """Perform scene detection on a given video `path` using the specified `detector`.
 
@@ -117,7 +118,9 @@ def scene_detect(
         detector: A `SceneDetector` instance (see :mod:`scenedetect.detectors` for a full list
             of detectors).
         stats_file_path: Path to save per-frame metrics to for statistical analysis or to
-            determine a better threshold value.
+            determine a better threshold value. If the path ends with `.npz` the metrics are
+            saved in binary form instead of CSV, and if that file already exists, detection is
+            re-run from the stored metrics without decoding the video.
         show_progress: Show a progress bar with estimated time remaining. Default is False.
         start_time: Starting point in video, in the form of a timecode ``HH:MM:SS[.nnn]`` (`str`),
             number of seconds ``123.45`` (`float`), or number of frames ``200`` (`int`).
@@ -128,6 +131,8 @@ def scene_detect(
             will contain a single scene spanning the entire video (instead of no scenes).
             When detecting fades with `ThresholdDetector`, the beginning portion of the video
             will always be included until the first fade-out event is detected.
+        workers: Number of threads preparing frames for the detector in parallel with decoding
+            (see :attr:`SceneManager.workers`). Default is 0 (prepare frames inline).
 
     Returns:
         List of scenes (pairs of :class:`FrameTimecode` objects).
@@ -148,11 +153,18 @@ def scene_detect(
     # need to save frame metrics to disk.
     scene_manager = SceneManager(StatsManager() if stats_file_path else None)
     scene_manager.add_detector(detector)
+    scene_manager.workers = workers
+    use_npz = stats_file_path is not None and str(stats_file_path).lower().endswith('.npz')
+    if use_npz and scene_manager.stats_manager.load_from_npz(stats_file_path) is not None:
+        scene_manager.detect_scenes_from_stats(video=video, end_time=end_time)
+        return scene_manager.get_scene_list(start_in_scene=start_in_scene)
     scene_manager.detect_scenes(
         video=video,
         show_progress=show_progress,
         end_time=end_time,
     )
-    if not scene_manager.stats_manager is None:
+    if use_npz:
+        scene_manager.stats_manager.save_to_npz(stats_file_path)
+    elif not scene_manager.stats_manager is None:
         scene_manager.stats_manager.save_to_csv(csv_file=stats_file_path)
     return scene_manager.get_scene_list(start_in_scene=start_in_scene)
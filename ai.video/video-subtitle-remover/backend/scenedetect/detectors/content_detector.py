@@ -32,7 +32,8 @@ def _mean_pixel_distance(left: numpy.ndarray, right: numpy.ndarray) -> float:
     assert len(left.shape) == 2 and len(right.shape) == 2
     assert left.shape == right.shape
     num_pixels: float = float(left.shape[0] * left.shape[1])
-    return (numpy.sum(numpy.abs(left.astype(numpy.int32) - right.astype(numpy.int32))) / num_pixels)
+    # L1 norm over uint8 in a single pass, without widening both planes to int32.
+    return cv2.norm(left, right, cv2.NORM_L1) / num_pixels
 
 
 def _estimated_kernel_size(frame_width: int, frame_height: int) -> int:
@@ -90,15 +91,26 @@ class ContentDetector(SceneDetector):
     @dataclass
     class _FrameData:
         """Data calculated for a given frame."""
-        hue: numpy.ndarray
-        """Frame hue map [2D 8-bit]."""
-        sat: numpy.ndarray
-        """Frame saturation map [2D 8-bit]."""
-        lum: numpy.ndarray
-        """Frame luma/brightness map [2D 8-bit]."""
+        hsv: numpy.ndarray
+        """Frame hue, saturation and luma/brightness maps [3 channel 8-bit]."""
         edges: Optional[numpy.ndarray]
         """Frame edge map [2D 8-bit, edges are 255, non edges 0]. Affected by `kernel_size`."""
 
+        @property
+        def hue(self) -> numpy.ndarray:
+            """Frame hue map [2D 8-bit]."""
+            return self.hsv[:, :, 0]
+
+        @property
+        def sat(self) -> numpy.ndarray:
+            """Frame saturation map [2D 8-bit]."""
+            return self.hsv[:, :, 1]
+
+        @property
+        def lum(self) -> numpy.ndarray:
+            """Frame luma/brightness map [2D 8-bit]."""
+            return self.hsv[:, :, 2]
+
     def __init__(
         self,
         threshold: float = 27.0,
@@ -106,6 +118,7 @@ class ContentDetector(SceneDetector):
         weights: 'ContentDetector.Components' = DEFAULT_COMPONENT_WEIGHTS,
         luma_only: bool = False,
         kernel_size: Optional[int] = None,
+        proxy_width: Optional[int] = None,
     ):
         """
         Arguments:
@@ -119,6 +132,9 @@ class ContentDetector(SceneDetector):
                 Overrides `weights` if both are set.
             kernel_size: Size of kernel for expanding detected edges. Must be odd integer
                 greater than or equal to 3. If None, automatically set using video resolution.
+            proxy_width: If set, frames wider than this are downscaled (preserving aspect ratio)
+                before scoring. Scores are then computed on a low resolution luma and chroma
+                proxy, which is much cheaper and also less sensitive to noise.
         """
         super().__init__()
         self._threshold: float = threshold
@@ -135,6 +151,7 @@ class ContentDetector(SceneDetector):
                 raise ValueError('kernel_size must be odd integer >= 3')
             self._kernel = numpy.ones((kernel_size, kernel_size), numpy.uint8)
         self._frame_score: Optional[float] = None
+        self._proxy_width: Optional[int] = proxy_width
 
     def get_metrics(self):
         return ContentDetector.METRIC_KEYS
@@ -142,32 +159,50 @@ class ContentDetector(SceneDetector):
     def is_processing_required(self, frame_num):
         return True
 
-    def _calculate_frame_score(self, frame_num: int, frame_img: numpy.ndarray) -> float:
+    def _calculate_edges(self) -> bool:
+        # Performance: Only calculate edges if we have to.
+        return (self._weights.delta_edges > 0.0) or self.stats_manager is not None
+
+    def prepare_frame(self, frame_img: Optional[numpy.ndarray]) -> Optional['ContentDetector._FrameData']:
+        """Convert `frame_img` into the data used for scoring (HSV proxy and optional edge map).
+        Does not depend on the previous frame, so the SceneManager may run it in worker threads."""
+        if frame_img is None:
+            return None
+        if self._proxy_width is not None and frame_img.shape[1] > self._proxy_width:
+            proxy_height = max(1, round(frame_img.shape[0] * self._proxy_width / frame_img.shape[1]))
+            frame_img = cv2.resize(
+                frame_img, (self._proxy_width, proxy_height), interpolation=cv2.INTER_AREA)
+        # Convert image into HSV colorspace.
+        hsv = cv2.cvtColor(frame_img, cv2.COLOR_BGR2HSV)
+        edges = self._detect_edges(hsv[:, :, 2]) if self._calculate_edges() else None
+        return ContentDetector._FrameData(hsv, edges)
+
+    def _calculate_frame_score(self, frame_num: int, frame_img) -> float:
         """Calculate score representing relative amount of motion in `frame_img` compared to
-        the last time the function was called (returns 0.0 on the first call)."""
+        the last time the function was called (returns 0.0 on the first call).
+
+        `frame_img` may be a decoded frame or the result of :meth:`prepare_frame`."""
         # TODO: Add option to enable motion estimation before calculating score components.
         # TODO: Investigate methods of performing cheaper alternatives, e.g. shifting or resizing
         # the frame to simulate camera movement, using optical flow, etc...
-
-        # Convert image into HSV colorspace.
-        hue, sat, lum = cv2.split(cv2.cvtColor(frame_img, cv2.COLOR_BGR2HSV))
-
-        # Performance: Only calculate edges if we have to.
-        calculate_edges: bool = ((self._weights.delta_edges > 0.0)
-                                 or self.stats_manager is not None)
-        edges = self._detect_edges(lum) if calculate_edges else None
+        if isinstance(frame_img, ContentDetector._FrameData):
+            frame_data = frame_img
+        else:
+            frame_data = self.prepare_frame(frame_img)
 
         if self._last_frame is None:
             # Need another frame to compare with for score calculation.
-            self._last_frame = ContentDetector._FrameData(hue, sat, lum, edges)
+            self._last_frame = frame_data
             return 0.0
 
+        # Hue, saturation and luma deltas in a single fused pass over the 8-bit HSV image.
+        delta_hue, delta_sat, delta_lum, _ = cv2.mean(cv2.absdiff(frame_data.hsv, self._last_frame.hsv))
         score_components = ContentDetector.Components(
-            delta_hue=_mean_pixel_distance(hue, self._last_frame.hue),
-            delta_sat=_mean_pixel_distance(sat, self._last_frame.sat),
-            delta_lum=_mean_pixel_distance(lum, self._last_frame.lum),
-            delta_edges=(0.0 if edges is None else _mean_pixel_distance(
-                edges, self._last_frame.edges)),
+            delta_hue=delta_hue,
+            delta_sat=delta_sat,
+            delta_lum=delta_lum,
+            delta_edges=(0.0 if frame_data.edges is None or self._last_frame.edges is None else
+                         _mean_pixel_distance(frame_data.edges, self._last_frame.edges)),
         )
 
         frame_score: float = (
@@ -181,7 +216,7 @@ class ContentDetector(SceneDetector):
             self.stats_manager.set_metrics(frame_num, metrics)
 
         # Store all data required to calculate the next frame's score.
-        self._last_frame = ContentDetector._FrameData(hue, sat, lum, edges)
+        self._last_frame = frame_data
         return frame_score
 
     def process_frame(self, frame_num: int, frame_img: numpy.ndarray) -> List[int]:
@@ -191,8 +226,9 @@ class ContentDetector(SceneDetector):
         Arguments:
             frame_num: Frame number of frame that is being passed.
             frame_img: Decoded frame image (numpy.ndarray) to perform scene
-                detection on. Can be None *only* if the self.is_processing_required() method
-                (inhereted from the base SceneDetector class) returns True.
+                detection on, or the result of :meth:`prepare_frame` for it. Can be None *only*
+                if the self.is_processing_required() method (inhereted from the base
+                SceneDetector class) returns True.
 
         Returns:
             List of frames where scene cuts have been detected. There may be 0
@@ -220,6 +256,33 @@ class ContentDetector(SceneDetector):
 
         return []
 
+    def process_stats(self, start_frame: int, end_frame: int) -> Optional[List[int]]:
+        """Detect cuts from the score components stored in the `stats_manager` (e.g. loaded with
+        :meth:`StatsManager.load_from_npz`), so `threshold`, `weights` and `min_scene_len` can be
+        changed without decoding the video again. Frame scores are computed for all frames at once;
+        only the frames above the threshold are then checked against `min_scene_len` in order.
+
+        Returns:
+            List of frames where scene cuts have been detected, or None if no StatsManager is set.
+        """
+        if self.stats_manager is None:
+            return None
+        frame_score = numpy.zeros(max(end_frame - start_frame, 0))
+        for metric_key, weight in zip(ContentDetector.Components._fields, self._weights):
+            frame_score += self.stats_manager.get_metric_array(metric_key, start_frame,
+                                                               end_frame) * weight
+        frame_score /= sum(abs(weight) for weight in self._weights)
+        # Frames without metrics are NaN and never compare above the threshold.
+        with numpy.errstate(invalid='ignore'):
+            candidates = numpy.flatnonzero(frame_score >= self._threshold) + start_frame
+        cuts = []
+        last_scene_cut = start_frame
+        for frame_num in candidates.tolist():
+            if (frame_num - last_scene_cut) >= self._min_scene_len:
+                cuts.append(frame_num)
+                last_scene_cut = frame_num
+        return cuts
+
     # TODO(#250): Based on the parameters passed to the ContentDetector constructor,
     # ensure that the last scene meets the minimum length requirement, otherwise it
     # should be merged with the previous scene. This can be done by caching the cuts
@@ -240,7 +303,8 @@ class ContentDetector(SceneDetector):
             2D 8-bit image of the same size as the input, where pixels with values of 255
             represent edges, and all other pixels are 0.
         """
-        # Initialize kernel.
+        # Initialize kernel. May race when called from worker threads, but every thread computes
+        # the same kernel.
         if self._kernel is None:
             kernel_size = _estimated_kernel_size(lum.shape[1], lum.shape[0])
             self._kernel = numpy.ones((kernel_size, kernel_size), numpy.uint8)
@@ -86,6 +86,18 @@ class SceneDetector:
         """
         return []
 
+    def prepare_frame(self, frame_img: Optional[numpy.ndarray]):
+        """Prepare Frame: Stateless per-frame preprocessing (e.g. colour space conversion).
+
+        The :class:`SceneManager` may call this from worker threads, in parallel with decoding
+        and out of order, so implementations must not depend on or modify detector state. The
+        result is passed to :meth:`process_frame` in place of `frame_img`.
+
+        Returns:
+            `frame_img` unchanged by default.
+        """
+        return frame_img
+
     def process_frame(self, frame_num: int, frame_img: Optional[numpy.ndarray]) -> List[int]:
         """Process Frame: Computes/stores metrics and detects any scene changes.
 
@@ -96,6 +108,18 @@ class SceneDetector:
         """
         return []
 
+    def process_stats(self, start_frame: int, end_frame: int) -> Optional[List[int]]:
+        """Process Stats: Detects scene changes using only the metrics already stored in the
+        `stats_manager` for frames in [`start_frame`, `end_frame`), without decoding any frames.
+
+        Prototype method, detectors which support this override it.
+
+        Returns:
+            List of frame numbers of cuts, or None if the detector cannot work from stored
+            metrics alone.
+        """
+        return None
+
     def post_process(self, frame_num: int) -> List[int]:
         """Post Process: Performs any processing after the last frame has been read.
 
@@ -81,6 +81,8 @@ analysis of the video.
 """
 
 import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from typing import Iterable, List, Tuple, Optional, Dict, Callable, Union, TextIO
 import threading
@@ -587,6 +589,22 @@ class SceneManager:
 
         self._frame_buffer = []
         self._frame_buffer_size = 0
+        # Number of threads used to prepare frames (SceneDetector.prepare_frame) in parallel
+        # with decoding and detection. 0 prepares frames inline on the processing thread.
+        self._workers: int = 0
+
+    @property
+    def workers(self) -> int:
+        """Number of worker threads used to prepare frames for the detectors, e.g. colour space
+        conversion and edge detection. Detection itself always runs in frame order on the
+        calling thread. Set to 0 (the default) to prepare frames inline."""
+        return self._workers
+
+    @workers.setter
+    def workers(self, value: int):
+        if value < 0:
+            raise ValueError("Number of workers must be >= 0!")
+        self._workers = int(value)
 
     @property
     def interpolation(self) -> Interpolation:
@@ -733,12 +751,22 @@ class SceneManager:
         return [(self._base_timecode + start, self._base_timecode + end)
                 for start, end in self._event_list]
 
+    def _prepare_frame(self, frame_im: Optional[np.ndarray]) -> List:
+        """Run :meth:`SceneDetector.prepare_frame` of every detector on `frame_im`. Called from
+        worker threads, returns one entry per detector (dense detectors first)."""
+        return [
+            detector.prepare_frame(frame_im)
+            for detector in self._detector_list + self._sparse_detector_list
+        ]
+
     def _process_frame(self,
                        frame_num: int,
                        frame_im: np.ndarray,
-                       callback: Optional[Callable[[np.ndarray, int], None]] = None) -> bool:
+                       callback: Optional[Callable[[np.ndarray, int], None]] = None,
+                       prepared: Optional[List] = None) -> bool:
         """Add any cuts detected with the current frame to the cutting list. Returns True if any new
-        cuts were detected, False otherwise."""
+        cuts were detected, False otherwise. If set, `prepared` is the result of
+        :meth:`_prepare_frame` for `frame_im` and is passed to the detectors instead of it."""
         new_cuts = False
         # TODO(#283): This breaks with AdaptiveDetector as cuts differ from the frame number
         # being processed. Allow detectors to specify the max frame lookahead they require
@@ -747,16 +775,19 @@ class SceneManager:
         # frame_buffer[-1] is current frame, -2 is one behind, etc
         # so index based on cut frame should be [event_frame - (frame_num + 1)]
         self._frame_buffer = self._frame_buffer[-(self._frame_buffer_size + 1):]
-        for detector in self._detector_list:
-            cuts = detector.process_frame(frame_num, frame_im)
+        if prepared is None:
+            prepared = [frame_im] * (len(self._detector_list) + len(self._sparse_detector_list))
+        for detector, detector_im in zip(self._detector_list, prepared):
+            cuts = detector.process_frame(frame_num, detector_im)
             self._cutting_list += cuts
             new_cuts = True if cuts else False
             if callback:
                 for cut_frame_num in cuts:
                     buffer_index = cut_frame_num - (frame_num + 1)
                     callback(self._frame_buffer[buffer_index], cut_frame_num)
-        for detector in self._sparse_detector_list:
-            events = detector.process_frame(frame_num, frame_im)
+        for detector, detector_im in zip(self._sparse_detector_list,
+                                         prepared[len(self._detector_list):]):
+            events = detector.process_frame(frame_num, detector_im)
             self._event_list += events
             if callback:
                 for event_start, _ in events:
@@ -786,7 +817,9 @@ class SceneManager:
         :meth:`get_cut_list`.
 
         Video decoding is performed in a background thread to allow scene detection and frame
-        decoding to happen in parallel. Detection will continue until no more frames are left,
+        decoding to happen in parallel. If :attr:`workers` is set, frames are also prepared for
+        the detectors by a pool of worker threads, so only the (cheap) frame comparison remains
+        on the calling thread. Detection will continue until no more frames are left,
         the specified duration or end time has been reached, or :meth:`stop` was called.
 
         Arguments:
@@ -799,7 +832,7 @@ class SceneManager:
                 Number of frames to skip (i.e. process every 1 in N+1 frames,
                 where N is frame_skip, processing only 1/N+1 percent of the video,
                 speeding up the detection time at the expense of accuracy).
-                `frame_skip` **must** be 0 (the default) when using a StatsManager.
+                When using a StatsManager, skipped frames have no metrics stored.
             show_progress: If True, and the ``tqdm`` module is available, displays
                 a progress bar with the progress, framerate, and expected time to
                 complete processing the video frame source.
@@ -807,9 +840,6 @@ class SceneManager:
             frame_source: [DEPRECATED] DO NOT USE. For compatibility with previous version.
         Returns:
             int: Number of frames read and processed from the frame source.
-        Raises:
-            ValueError: `frame_skip` **must** be 0 (the default) if the SceneManager
-                was constructed with a StatsManager object.
         """
         # TODO(v0.7): Add DeprecationWarning that `frame_source` will be removed in v0.8.
         # TODO(v0.8): Remove default value for `video`` when removing `frame_source`.
@@ -818,8 +848,6 @@ class SceneManager:
         if video is None:
             raise TypeError("detect_scenes() missing 1 required positional argument: 'video'")
 
-        if frame_skip > 0 and self.stats_manager is not None:
-            raise ValueError('frame_skip must be 0 when using a StatsManager.')
         if duration is not None and end_time is not None:
             raise ValueError('duration and end_time cannot be set at the same time!')
         if duration is not None and duration < 0:
@@ -877,20 +905,45 @@ class SceneManager:
         decode_thread.start()
         frame_im = None
 
-        logger.info('Detecting scenes...')
-        while not self._stop.is_set():
-            next_frame, position = frame_queue.get()
-            if next_frame is None and position is None:
-                break
-            if not next_frame is None:
-                frame_im = next_frame
-            new_cuts = self._process_frame(position.frame_num, frame_im, callback)
+        def process_frame(frame_num, frame_im, prepared=None):
+            new_cuts = self._process_frame(frame_num, frame_im, callback, prepared)
             if progress_bar is not None:
                 if new_cuts:
                     progress_bar.set_description(
                         PROGRESS_BAR_DESCRIPTION % len(self._cutting_list), refresh=False)
                 progress_bar.update(1 + frame_skip)
 
+        # Frames being prepared by the worker threads, in decode order.
+        executor = ThreadPoolExecutor(self._workers) if self._workers > 0 else None
+        pending = deque()
+        prepared = None
+
+        logger.info('Detecting scenes...')
+        try:
+            while not self._stop.is_set():
+                next_frame, position = frame_queue.get()
+                if next_frame is None and position is None:
+                    break
+                if executor is None:
+                    if not next_frame is None:
+                        frame_im = next_frame
+                    process_frame(position.frame_num, frame_im)
+                    continue
+                if not next_frame is None or prepared is None:
+                    if not next_frame is None:
+                        frame_im = next_frame
+                    prepared = executor.submit(self._prepare_frame, frame_im)
+                pending.append((position.frame_num, frame_im, prepared))
+                while len(pending) > 2 * self._workers:
+                    frame_num, pending_im, future = pending.popleft()
+                    process_frame(frame_num, pending_im, future.result())
+            while pending and not self._stop.is_set():
+                frame_num, pending_im, future = pending.popleft()
+                process_frame(frame_num, pending_im, future.result())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
         if progress_bar is not None:
             progress_bar.close()
         # Unblock any puts in the decode thread before joining. This can happen if the main
@@ -906,6 +959,60 @@ class SceneManager:
         self._post_process(video.position.frame_num)
         return video.frame_number - start_frame_num
 
+    def detect_scenes_from_stats(self,
+                                 video: VideoStream,
+                                 duration: Optional[FrameTimecode] = None,
+                                 end_time: Optional[FrameTimecode] = None) -> int:
+        """Perform scene detection using only the frame metrics already stored in the StatsManager
+        (e.g. loaded with :meth:`StatsManager.load_from_npz` from a previous :meth:`detect_scenes`
+        run), without decoding `video`. Allows re-running detection with different detector
+        parameters (e.g. threshold) in a fraction of the time. Results can be obtained by calling
+        :meth:`get_scene_list`.
+
+        Arguments:
+            video: VideoStream the metrics were calculated from. Only used for its timebase and
+                current position, no frames are read.
+            duration: Amount of time to scene_detect from current video position. Cannot be
+                specified if `end_time` is set.
+            end_time: Time to stop processing at. Cannot be specified if `duration` is set.
+        Returns:
+            int: Number of frames processed.
+        Raises:
+            ValueError: No StatsManager is set, or a detector does not support detection from
+                stored metrics (see :meth:`SceneDetector.process_stats`).
+        """
+        if self._stats_manager is None:
+            raise ValueError('detect_scenes_from_stats() requires a StatsManager.')
+        if duration is not None and end_time is not None:
+            raise ValueError('duration and end_time cannot be set at the same time!')
+
+        self._base_timecode = video.base_timecode
+        self._stats_manager._base_timecode = self._base_timecode
+        start_frame_num: int = video.frame_number
+        frame_numbers = self._stats_manager.get_frame_numbers()
+        end_frame_num: int = int(frame_numbers[-1]) + 1 if len(frame_numbers) else start_frame_num
+        if video.duration is not None:
+            end_frame_num = min(end_frame_num, video.duration.get_frames())
+        if duration is not None:
+            end_time = duration + start_frame_num
+        if end_time is not None:
+            end_frame_num = min(end_frame_num, (self._base_timecode + end_time).get_frames())
+        end_frame_num = max(end_frame_num, start_frame_num + 1)
+
+        if self._sparse_detector_list:
+            raise ValueError('Sparse detectors do not support detection from stored metrics.')
+        cutting_list = []
+        for detector in self._detector_list:
+            cuts = detector.process_stats(start_frame_num, end_frame_num)
+            if cuts is None:
+                raise ValueError('%s does not support detection from stored metrics.' %
+                                 type(detector).__name__)
+            cutting_list += cuts
+        self._cutting_list += cutting_list
+        self._start_pos = self._base_timecode + start_frame_num
+        self._last_pos = self._base_timecode + (end_frame_num - 1)
+        return end_frame_num - start_frame_num
+
     def _decode_thread(
         self,
         video: VideoStream,
@@ -19,7 +19,9 @@ for each frame. The :class:`StatsManager` must be registered to a
 
 The entire :class:`StatsManager` can be :meth:`saved to <StatsManager.save_to_csv>` a
 human-readable CSV file, allowing for precise determination of the ideal threshold (or other
-detection parameters) for the given input.
+detection parameters) for the given input. Metrics are stored as one numpy array per metric
+indexed by frame number, and can also be :meth:`saved to <StatsManager.save_to_npz>` a binary
+`.npz` file which is much faster to reload for long videos.
 """
 
 import csv
@@ -27,6 +29,8 @@ from logging import getLogger
 from typing import Any, Dict, Iterable, List, Optional, Set, TextIO, Union
 import os.path
 
+import numpy as np
+
 from backend.scenedetect.frame_timecode import FrameTimecode
 
 logger = getLogger('pyscenedetect')
@@ -41,6 +45,25 @@ COLUMN_NAME_FRAME_NUMBER = "Frame Number"
 COLUMN_NAME_TIMECODE = "Timecode"
 """Name of column containing timecodes in the statsfile CSV."""
 
+##
+## StatsManager NPZ File Array Names
+##
+
+NPZ_METRIC_KEYS = "metric_keys"
+"""Name of the array containing the metric keys in the statsfile NPZ, in column order."""
+
+NPZ_METRIC_COLUMN = "metric_%d"
+"""Name of the array containing the values of the i-th metric key in the statsfile NPZ."""
+
+NPZ_FRAMERATE = "framerate"
+"""Name of the array containing the framerate of the base timecode in the statsfile NPZ."""
+
+METRIC_DTYPE = np.float64
+"""Data type metrics are stored as. Missing metrics are stored as NaN."""
+
+MIN_CAPACITY: int = 1024
+"""Minimum number of frames allocated per metric column."""
+
 ##
 ## StatsManager Exceptions
 ##
@@ -91,10 +114,12 @@ class StatsManager:
     algorithm parameters for certain detection methods. Additionally, the data
     may be plotted by a graphing module (e.g. matplotlib) by obtaining the
     metric of interest for a series of frames by iteratively calling get_metrics(),
-    after having called the detect_scenes(...) method on the SceneManager object
-    which owns the given StatsManager instance.
+    or all at once with get_metric_array(), after having called the detect_scenes(...)
+    method on the SceneManager object which owns the given StatsManager instance.
 
-    Only metrics consisting of `float` or `int` should be used currently.
+    Each metric is stored as a preallocated numpy array (column) indexed by frame number,
+    where frames without a value (e.g. skipped frames) hold NaN. Only metrics consisting of
+    `float` or `int` can be stored, and they are always returned as `float`.
     """
 
     def __init__(self, base_timecode: FrameTimecode = None):
@@ -104,9 +129,11 @@ class StatsManager:
             base_timecode: Timecode associated with this object. Must not be None (default value
                 will be removed in a future release).
         """
-        # Frame metrics is a dict of frame (int): metric_dict (Dict[str, float])
-        # of each frame metric key and the value it represents (usually float).
-        self._frame_metrics: Dict[FrameTimecode, Dict[str, float]] = dict()
+        # Frame metrics is a dict of metric key (str): column of values for each frame
+        # (float64 array indexed by frame number, NaN where the metric was not set).
+        self._frame_metrics: Dict[str, np.ndarray] = dict()
+        self._num_frames: int = 0                                    # Highest frame number set + 1.
+        self._capacity: int = 0                                      # Allocated length of each column.
         self._registered_metrics: Set[str] = set()                   # Set of frame metric keys.
         self._loaded_metrics: Set[str] = set()                       # Metric keys loaded from stats file.
         self._metrics_updated: bool = False                          # Flag indicating if metrics require saving.
@@ -156,6 +183,41 @@ class StatsManager:
         for metric_key in metric_kv_dict:
             self._set_metric(frame_number, metric_key, metric_kv_dict[metric_key])
 
+    def get_metric_array(self,
+                         metric_key: str,
+                         start_frame: int = 0,
+                         end_frame: Optional[int] = None) -> np.ndarray:
+        """Get Metric Array: Return the values of a metric for a range of frames.
+
+        Arguments:
+            metric_key: Metric key to look up.
+            start_frame: First frame number of the range.
+            end_frame: Frame number after the last frame of the range. Defaults to the frame
+                after the last one with any metric set.
+
+        Returns:
+            A float64 array of length `end_frame - start_frame`, with NaN for each frame the
+            metric was not set for. The array is a copy and can be modified freely.
+        """
+        if end_frame is None:
+            end_frame = self._num_frames
+        values = np.full(max(end_frame - start_frame, 0), np.nan, dtype=METRIC_DTYPE)
+        column = self._frame_metrics.get(metric_key)
+        if column is not None:
+            stop = min(end_frame, self._num_frames)
+            if stop > start_frame:
+                values[:stop - start_frame] = column[start_frame:stop]
+        return values
+
+    def get_frame_numbers(self) -> np.ndarray:
+        """Get Frame Numbers: Return a sorted array of frame numbers with any metric set."""
+        if not self._frame_metrics:
+            return np.zeros(0, dtype=np.int64)
+        has_metric = np.zeros(self._num_frames, dtype=bool)
+        for column in self._frame_metrics.values():
+            has_metric |= ~np.isnan(column[:self._num_frames])
+        return np.flatnonzero(has_metric)
+
     def metrics_exist(self, frame_number: int, metric_keys: Iterable[str]) -> bool:
         """ Metrics Exist: Checks if the given metrics/stats exist for the given frame.
 
@@ -193,7 +255,7 @@ class StatsManager:
 
         # Ensure we need to write to the file, and that we have data to do so with.
         if not ((self.is_save_required() or force_save) and self._registered_metrics
-                and self._frame_metrics):
+                and self._num_frames):
             logger.info("No metrics to save.")
             return
 
@@ -209,14 +271,74 @@ class StatsManager:
         csv_writer = csv.writer(csv_file, lineterminator='\n')
         metric_keys = sorted(list(self._registered_metrics.union(self._loaded_metrics)))
         csv_writer.writerow([COLUMN_NAME_FRAME_NUMBER, COLUMN_NAME_TIMECODE] + metric_keys)
-        frame_keys = sorted(self._frame_metrics.keys())
+        frame_keys = self.get_frame_numbers()
         logger.info("Writing %d frames to CSV...", len(frame_keys))
         for frame_key in frame_keys:
-            frame_timecode = self._base_timecode + frame_key
+            frame_timecode = self._base_timecode + int(frame_key)
             csv_writer.writerow(
                 [frame_timecode.get_frames() +
                  1, frame_timecode.get_timecode()] +
-                [str(metric) for metric in self.get_metrics(frame_key, metric_keys)])
+                [str(metric) for metric in self.get_metrics(int(frame_key), metric_keys)])
+
+    def save_to_npz(self, npz_file: Union[str, bytes, os.PathLike], force_save=True) -> None:
+        """ Save To NPZ: Saves all frame metrics stored in the StatsManager to a binary `.npz` file,
+        one array per metric indexed by frame number.
+
+        Arguments:
+            npz_file: Path to the file to write. numpy appends `.npz` if it is missing.
+            force_save: If True, writes metrics out even if an update is not required.
+
+        Raises:
+            OSError: If `path` cannot be opened or a write failure occurs.
+        """
+        if not ((self.is_save_required() or force_save) and self._frame_metrics):
+            logger.info("No metrics to save.")
+            return
+        metric_keys = sorted(self._frame_metrics.keys())
+        arrays = {
+            NPZ_METRIC_COLUMN % i: self._frame_metrics[metric_key][:self._num_frames]
+            for i, metric_key in enumerate(metric_keys)
+        }
+        arrays[NPZ_METRIC_KEYS] = np.array(metric_keys, dtype=str)
+        if self._base_timecode is not None:
+            arrays[NPZ_FRAMERATE] = np.array(self._base_timecode.get_framerate())
+        logger.info("Writing %d metrics for %d frames to NPZ...", len(metric_keys), self._num_frames)
+        np.savez(npz_file, **arrays)
+        self._metrics_updated = False
+
+    def load_from_npz(self, npz_file: Union[str, bytes, os.PathLike]) -> Optional[int]:
+        """ Load From NPZ: Loads all metrics stored in a file written by :meth:`save_to_npz`,
+        replacing any values already stored for the same frames and metric keys.
+
+        Arguments:
+            npz_file: Path to the file to read.
+
+        Returns:
+            int or None: Number of frames (highest frame number + 1) in the file, or None if the
+            file could not be found.
+
+        Raises:
+            StatsFileCorrupt: Stats file is corrupt and can't be loaded, or wrong file
+                was specified.
+        """
+        if not os.path.exists(npz_file):
+            return None
+        try:
+            with np.load(npz_file, allow_pickle=False) as data:
+                metric_keys = [str(metric_key) for metric_key in data[NPZ_METRIC_KEYS]]
+                columns = [data[NPZ_METRIC_COLUMN % i] for i in range(len(metric_keys))]
+        except (KeyError, ValueError, OSError) as ex:
+            raise StatsFileCorrupt('Could not load stats file: %s' % str(ex)) from ex
+        num_frames = max((len(column) for column in columns), default=0)
+        self._ensure_capacity(num_frames)
+        for metric_key, column in zip(metric_keys, columns):
+            if column.ndim != 1:
+                raise StatsFileCorrupt('Wrong shape for metric %s in stats file.' % metric_key)
+            self._get_column(metric_key)[:len(column)] = column
+        self._loaded_metrics = set(self._loaded_metrics).union(metric_keys)
+        logger.info('Loaded %d metrics for %d frames.', len(metric_keys), num_frames)
+        self._metrics_updated = False
+        return num_frames
 
     @staticmethod
     def valid_header(row: List[str]) -> bool:
@@ -308,17 +430,38 @@ class StatsManager:
         self._metrics_updated = False
         return num_frames
 
+    def _ensure_capacity(self, num_frames: int) -> None:
+        """Make sure frame numbers below `num_frames` can be stored. All columns share the same
+        capacity, which grows geometrically."""
+        if num_frames > self._capacity:
+            self._capacity = max(num_frames, 2 * self._capacity, MIN_CAPACITY)
+            for metric_key, column in self._frame_metrics.items():
+                new_column = np.full(self._capacity, np.nan, dtype=METRIC_DTYPE)
+                new_column[:len(column)] = column
+                self._frame_metrics[metric_key] = new_column
+        self._num_frames = max(self._num_frames, num_frames)
+
+    def _get_column(self, metric_key: str) -> np.ndarray:
+        column = self._frame_metrics.get(metric_key)
+        if column is None:
+            column = np.full(self._capacity, np.nan, dtype=METRIC_DTYPE)
+            self._frame_metrics[metric_key] = column
+        return column
+
     def _get_metric(self, frame_number: int, metric_key: str) -> Optional[Any]:
         if self._metric_exists(frame_number, metric_key):
-            return self._frame_metrics[frame_number][metric_key]
+            return float(self._frame_metrics[metric_key][frame_number])
         return None
 
     def _set_metric(self, frame_number: int, metric_key: str, metric_value: Any) -> None:
         self._metrics_updated = True
-        if not frame_number in self._frame_metrics:
-            self._frame_metrics[frame_number] = dict()
-        self._frame_metrics[frame_number][metric_key] = metric_value
+        if frame_number < 0:
+            raise ValueError('frame_number must be >= 0.')
+        self._ensure_capacity(frame_number + 1)
+        self._get_column(metric_key)[frame_number] = (
+            np.nan if metric_value is None else metric_value)
 
     def _metric_exists(self, frame_number: int, metric_key: str) -> bool:
-        return (frame_number in self._frame_metrics
-                and metric_key in self._frame_metrics[frame_number])
+        column = self._frame_metrics.get(metric_key)
+        return (column is not None and 0 <= frame_number < self._num_frames
+                and not np.isnan(column[frame_number]))
@@ -0,0 +1,388 @@
+"""
+字幕去除性能基准测试
+
+生成带有硬字幕的合成视频(同时保存无字幕的原始视频)，在CPU上分别使用STTN、LAMA、PROPAINTER算法处理，
+记录各阶段耗时(decode/detect/inpaint/encode/merge)、处理帧率、峰值内存以及输出视频相对原始视频的PSNR/SSIM，
+结果保存为JSON，便于不同版本之间对比
+
+用法：
+    python backend/tools/benchmark.py --resolutions 640x360,1280x720 --durations 4,12 --modes sttn,lama,propainter
+    python backend/tools/benchmark.py --output result.json --baseline last_result.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 合成视频中轮流出现的字幕
+SUBTITLE_TEXTS = [
+    'Subtitle removal benchmark 0123',
+    'The quick brown fox jumps over',
+    'Hello world, this is line three',
+    'Another line of burned-in text',
+]
+
+
+def parse_resolution(text):
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+def render_background(frame_no, width, height):
+    """
+    生成带有运动纹理的背景帧，保证重绘算法有可参考的时序与纹理信息
+    """
+    x = np.linspace(0, 4 * np.pi, width, dtype=np.float32)
+    y = np.linspace(0, 2 * np.pi, height, dtype=np.float32)
+    t = frame_no * 0.08
+    b = 127 + 100 * np.sin(x[None, :] + t) * np.cos(y[:, None] * 0.5)
+    g = 127 + 100 * np.sin(y[:, None] + t * 0.7)
+    r = 127 + 100 * np.cos(x[None, :] * 0.5 - y[:, None] + t * 1.3)
+    g = np.broadcast_to(g, (height, width))
+    frame = np.stack([b, g, r], axis=-1).clip(0, 255).astype(np.uint8)
+    # 运动的方块，模拟前景物体
+    size = max(height // 6, 8)
+    cx = int((frame_no * 4) % max(width - size, 1))
+    cv2.rectangle(frame, (cx, height // 4), (cx + size, height // 4 + size), (40, 200, 240), thickness=-1)
+    return frame
+
+
+def get_text_layout(width, height):
+    scale = height / 360 * 0.9
+    thickness = max(int(round(height / 360 * 2)), 1)
+    return scale, thickness
+
+
+def burn_subtitle(frame, text):
+    height, width = frame.shape[:2]
+    scale, thickness = get_text_layout(width, height)
+    (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    x = (width - text_w) // 2
+    y = height - int(height * 0.08)
+    # 描边 + 白字，接近真实字幕样式
+    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness * 3, cv2.LINE_AA)
+    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), thickness, cv2.LINE_AA)
+    return x, x + text_w, y - text_h - baseline, y + baseline
+
+
+def generate_video(work_dir, width, height, duration, fps=25):
+    """
+    生成一对合成视频：无字幕的原始视频与带硬字幕的视频
+    :return dict 视频信息，包含字幕区域的并集(xmin, xmax, ymin, ymax)
+    """
+    name = f'synthetic_{width}x{height}_{duration:g}s'
+    clean_path = os.path.join(work_dir, f'{name}_clean.avi')
+    subtitled_path = os.path.join(work_dir, f'{name}.mp4')
+    frame_count = int(duration * fps)
+    # 原始视频使用无损编码保存，作为质量评估的参考
+    clean_writer = cv2.VideoWriter(clean_path, cv2.VideoWriter_fourcc(*'FFV1'), fps, (width, height))
+    if not clean_writer.isOpened():
+        clean_writer = cv2.VideoWriter(clean_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    subtitled_writer = cv2.VideoWriter(subtitled_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    text_region = None
+    # 每段字幕持续2秒，中间留0.5秒无字幕的间隔
+    cycle = int(2.5 * fps)
+    for frame_no in range(frame_count):
+        frame = render_background(frame_no, width, height)
+        clean_writer.write(frame)
+        if frame_no % cycle < 2 * fps:
+            box = burn_subtitle(frame, SUBTITLE_TEXTS[(frame_no // cycle) % len(SUBTITLE_TEXTS)])
+            if text_region is None:
+                text_region = box
+            else:
+                text_region = (min(text_region[0], box[0]), max(text_region[1], box[1]),
+                               min(text_region[2], box[2]), max(text_region[3], box[3]))
+        subtitled_writer.write(frame)
+    clean_writer.release()
+    subtitled_writer.release()
+    return {'name': name, 'width': width, 'height': height, 'duration': duration, 'fps': fps,
+            'frame_count': frame_count, 'path': subtitled_path, 'clean_path': clean_path,
+            'text_region': text_region}
+
+
+def compute_ssim(img1, img2):
+    """
+    计算灰度图的SSIM(高斯窗口，与skimage默认参数一致)
+    """
+    img1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    img2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    mu1 = cv2.GaussianBlur(img1, (11, 11), 1.5)
+    mu2 = cv2.GaussianBlur(img2, (11, 11), 1.5)
+    sigma1 = cv2.GaussianBlur(img1 * img1, (11, 11), 1.5) - mu1 * mu1
+    sigma2 = cv2.GaussianBlur(img2 * img2, (11, 11), 1.5) - mu2 * mu2
+    sigma12 = cv2.GaussianBlur(img1 * img2, (11, 11), 1.5) - mu1 * mu2
+    ssim_map = ((2 * mu1 * mu2 + c1) * (2 * sigma12 + c2)) / ((mu1 * mu1 + mu2 * mu2 + c1) * (sigma1 + sigma2 + c2))
+    return float(ssim_map.mean())
+
+
+def evaluate_quality(output_path, clean_path, text_region, sample_step=5):
+    """
+    每隔sample_step帧比较输出视频与原始视频，返回全帧以及字幕区域的PSNR、SSIM平均值
+    """
+    output_cap = cv2.VideoCapture(output_path)
+    clean_cap = cv2.VideoCapture(clean_path)
+    psnr_list, ssim_list, region_psnr_list, region_ssim_list = [], [], [], []
+    xmin, xmax, ymin, ymax = text_region
+    frame_no = 0
+    while True:
+        ret0, output_frame = output_cap.read()
+        ret1, clean_frame = clean_cap.read()
+        if not ret0 or not ret1:
+            break
+        if frame_no % sample_step == 0 and output_frame.shape == clean_frame.shape:
+            psnr_list.append(cv2.PSNR(output_frame, clean_frame))
+            ssim_list.append(compute_ssim(output_frame, clean_frame))
+            output_region = output_frame[ymin:ymax, xmin:xmax]
+            clean_region = clean_frame[ymin:ymax, xmin:xmax]
+            region_psnr_list.append(cv2.PSNR(output_region, clean_region))
+            region_ssim_list.append(compute_ssim(output_region, clean_region))
+        frame_no += 1
+    output_cap.release()
+    clean_cap.release()
+
+    def mean(values):
+        return round(float(np.mean(values)), 4) if values else None
+
+    return {'psnr': mean(psnr_list), 'ssim': mean(ssim_list),
+            'text_region_psnr': mean(region_psnr_list), 'text_region_ssim': mean(region_ssim_list),
+            'output_frames': frame_no}
+
+
+class StageTimer:
+    """
+    按阶段累计耗时
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def add(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def wrap(self, stage, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+
+class TimedVideoCapture:
+    """
+    统计解码耗时的cv2.VideoCapture代理
+    """
+
+    def __init__(self, timer, *args, **kwargs):
+        self._cap = _VideoCapture(*args, **kwargs)
+        self.read = timer.wrap('decode', self._cap.read)
+        self.grab = timer.wrap('decode', self._cap.grab)
+
+    def __getattr__(self, item):
+        return getattr(self._cap, item)
+
+
+class TimedVideoWriter:
+    """
+    统计编码耗时的cv2.VideoWriter代理
+    """
+
+    def __init__(self, timer, *args, **kwargs):
+        self._writer = _VideoWriter(*args, **kwargs)
+        self.write = timer.wrap('encode', self._writer.write)
+
+    def __getattr__(self, item):
+        return getattr(self._writer, item)
+
+
+_VideoCapture = cv2.VideoCapture
+_VideoWriter = cv2.VideoWriter
+
+
+def get_peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS返回字节，Linux返回KB
+    if platform.system() == 'Darwin':
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+def run_case(video, mode, options, result_queue):
+    """
+    在独立的子进程中运行一次字幕去除，保证峰值内存互不影响
+    """
+    # 只使用CPU
+    os.environ['CUDA_VISIBLE_DEVICES'] = ''
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+    try:
+        import torch
+        if options['threads']:
+            torch.set_num_threads(options['threads'])
+            cv2.setNumThreads(options['threads'])
+        import config
+        from backend import config as backend_config
+        import main
+        for cfg in (config, backend_config):
+            cfg.MODE = cfg.InpaintMode(mode)
+            cfg.STTN_SKIP_DETECTION = options['sttn_skip_detection']
+            # 每次都完整运行，不使用缓存与分段续处理
+            cfg.DETECTION_CACHE = False
+            cfg.RESUMABLE = False
+            cfg.SEGMENT_PARALLEL_NUM = options['parallel']
+            cfg.SEGMENT_THREAD_NUM = options['threads'] or cfg.SEGMENT_THREAD_NUM
+
+        timer = StageTimer()
+        # 预先加载模型，模型加载时间单独统计
+        start = time.perf_counter()
+        main.warm_up_models()
+        timer.add('load_models', time.perf_counter() - start)
+
+        cv2.VideoCapture = lambda *args, **kwargs: TimedVideoCapture(timer, *args, **kwargs)
+        cv2.VideoWriter = lambda *args, **kwargs: TimedVideoWriter(timer, *args, **kwargs)
+        main.SubtitleDetect.detect_subtitle = timer.wrap('detect', main.SubtitleDetect.detect_subtitle)
+        main.SubtitleRemover.merge_audio_to_video = timer.wrap('merge', main.SubtitleRemover.merge_audio_to_video)
+        main.concat_videos = timer.wrap('merge', main.concat_videos)
+
+        start = time.perf_counter()
+        remover = main.SubtitleRemover(video['path'], gui_mode=False, reload_config=False)
+        remover.video_out_name = os.path.join(options['work_dir'], f"{video['name']}_{mode}_no_sub.mp4")
+        remover.run()
+        total = time.perf_counter() - start
+        cv2.VideoCapture = _VideoCapture
+        cv2.VideoWriter = _VideoWriter
+
+        timings = {stage: round(seconds, 4) for stage, seconds in timer.timings.items()}
+        # 除去解码、检测、编码、合并之外的时间记为重绘耗时
+        timings['inpaint'] = round(total - sum(timer.timings.get(stage, 0.0)
+                                               for stage in ('decode', 'detect', 'encode', 'merge')), 4)
+        timings['total'] = round(total, 4)
+        result = {
+            'video': {k: video[k] for k in ('name', 'width', 'height', 'duration', 'fps', 'frame_count')},
+            'mode': mode,
+            'timings': timings,
+            'fps': round(video['frame_count'] / total, 3),
+            'peak_rss_mb': get_peak_rss_mb(),
+        }
+        if remover.inpaint_stats:
+            result['inpaint_stats'] = dict(remover.inpaint_stats)
+        result.update(evaluate_quality(remover.video_out_name, video['clean_path'], video['text_region']))
+        result_queue.put(result)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        result_queue.put({'video': {'name': video['name']}, 'mode': mode, 'error': str(e)})
+
+
+def get_environment():
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    try:
+        import torch
+        env['torch'] = torch.__version__
+        env['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return env
+
+
+def print_summary(results, baseline=None):
+    baseline_map = {}
+    if baseline:
+        for item in baseline.get('runs', []):
+            baseline_map[(item['video']['name'], item['mode'])] = item
+    print(f"{'video':<28}{'mode':<12}{'fps':>9}{'total(s)':>10}{'rss(MB)':>10}{'psnr':>8}{'ssim':>8}  vs baseline")
+    for item in results:
+        if 'error' in item:
+            print(f"{item['video']['name']:<28}{item['mode']:<12} error: {item['error']}")
+            continue
+        diff = ''
+        base = baseline_map.get((item['video']['name'], item['mode']))
+        if base and 'fps' in base:
+            diff = f"fps {100 * (item['fps'] / base['fps'] - 1):+.1f}%"
+        print(f"{item['video']['name']:<28}{item['mode']:<12}{item['fps']:>9.2f}{item['timings']['total']:>10.2f}"
+              f"{item['peak_rss_mb']:>10.1f}{item['psnr'] or 0:>8.2f}{item['ssim'] or 0:>8.4f}  {diff}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Video subtitle remover benchmark')
+    parser.add_argument('--resolutions', default='640x360,1280x720', help='逗号分隔的分辨率列表，如640x360,1280x720')
+    parser.add_argument('--durations', default='4,12', help='逗号分隔的视频时长(秒)')
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--modes', default='sttn,lama,propainter', help='逗号分隔的算法列表')
+    parser.add_argument('--threads', type=int, default=0, help='torch/OpenCV线程数，0表示使用默认值')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='分段并行的进程数(SEGMENT_PARALLEL_NUM)，大于1时各阶段耗时只统计主进程')
+    parser.add_argument('--sttn-skip-detection', action='store_true', help='STTN跳过字幕检测')
+    parser.add_argument('--work-dir', default=None, help='合成视频与输出视频的存放目录，默认使用临时目录')
+    parser.add_argument('--keep', action='store_true', help='保留合成视频与输出视频')
+    parser.add_argument('--output', default='benchmark_result.json', help='结果JSON文件路径')
+    parser.add_argument('--baseline', default=None, help='用于对比的历史结果JSON文件路径')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='vsr_benchmark_')
+    os.makedirs(work_dir, exist_ok=True)
+    options = {'threads': args.threads, 'parallel': args.parallel, 'sttn_skip_detection': args.sttn_skip_detection,
+               'work_dir': work_dir}
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for resolution in args.resolutions.split(','):
+            width, height = parse_resolution(resolution)
+            for duration in args.durations.split(','):
+                print(f'[Benchmark] generating {width}x{height} {duration}s video...')
+                video = generate_video(work_dir, width, height, float(duration), args.fps)
+                for mode in modes:
+                    print(f"[Benchmark] running {mode} on {video['name']}...")
+                    result_queue = ctx.Queue()
+                    process = ctx.Process(target=run_case, args=(video, mode, options, result_queue))
+                    process.start()
+                    result = None
+                    # 子进程异常退出时不会返回结果
+                    while result is None:
+                        try:
+                            result = result_queue.get(timeout=1)
+                        except queue.Empty:
+                            if not process.is_alive():
+                                result = {'video': {'name': video['name']}, 'mode': mode,
+                                          'error': f'process exited with code {process.exitcode}'}
+                    process.join()
+                    results.append(result)
+    finally:
+        if not args.keep and args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report = {'environment': get_environment(), 'options': {k: v for k, v in vars(args).items()}, 'runs': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+    print(f'[Finished] benchmark result saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
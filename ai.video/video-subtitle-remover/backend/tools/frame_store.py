@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+import numpy as np
+
+
+class FrameStore:
+    """
+    预分配的uint8帧缓冲区，用于分批读取重绘区间的帧，批次以缓冲区视图的形式交给模型
+    1. 缓冲区只保存一个批次，内存占用与字幕区间长度无关
+    2. 一个批次超过内存上限max_mb时，缓冲区使用临时文件内存映射(memmap)，由操作系统按需换出
+    注意：读取下一批时会覆盖上一批的视图，调用方需要在此之前写出结果
+    """
+
+    def __init__(self, frame_shape, capacity, max_mb=1024, scratch_dir=None):
+        self.frame_shape = tuple(frame_shape)
+        self.capacity = max(int(capacity), 1)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.scratch_dir = scratch_dir
+        self.scratch_path = None
+        shape = (self.capacity,) + self.frame_shape
+        if int(np.prod(shape)) <= self.max_bytes:
+            self.buffer = np.empty(shape, dtype=np.uint8)
+        else:
+            fd, self.scratch_path = tempfile.mkstemp(prefix='vsr_frames_', suffix='.raw', dir=scratch_dir)
+            os.close(fd)
+            self.buffer = np.memmap(self.scratch_path, dtype=np.uint8, mode='w+', shape=shape)
+
+    @property
+    def is_memmap(self):
+        return self.scratch_path is not None
+
+    def fits(self, frame_shape, capacity):
+        return self.frame_shape == tuple(frame_shape) and capacity <= self.capacity
+
+    def read(self, video_cap, count, first_frame=None):
+        """
+        读取count帧到缓冲区，first_frame为已读取的第一帧，返回帧视图列表，视频结束时返回的帧数可能少于count
+        """
+        count = min(count, self.capacity)
+        n = 0
+        if first_frame is not None:
+            self.buffer[0] = first_frame
+            n = 1
+        while n < count:
+            ret, frame = video_cap.read()
+            if not ret:
+                break
+            self.buffer[n] = frame
+            n += 1
+        return [self.buffer[i] for i in range(n)]
+
+    def release(self):
+        if self.scratch_path is not None:
+            del self.buffer
+            try:
+                os.remove(self.scratch_path)
+            except OSError:
+                pass
+            self.scratch_path = None
+        self.buffer = None
@@ -6,11 +6,12 @@ from backend import config
 from backend.inpaint.lama_inpaint import LamaInpaint
 
 
-def batch_generator(data, max_batch_size):
+def get_batch_sizes(n_samples, max_batch_size):
     """
-    根据data大小，生成最大长度不超过max_batch_size的均匀批次数据
+    根据样本数量，计算最大长度不超过max_batch_size的均匀批次大小列表
     """
-    n_samples = len(data)
+    if n_samples <= 0:
+        return []
     # 尝试找到一个比MAX_BATCH_SIZE小的batch_size，以使得所有的批次数量尽量接近
     batch_size = max_batch_size
     num_batches = n_samples // batch_size
@@ -21,14 +22,21 @@ def batch_generator(data, max_batch_size):
         batch_size -= 1  # 减小批次大小
         num_batches = n_samples // batch_size
 
-    # 生成前num_batches个批次
-    for i in range(num_batches):
-        yield data[i * batch_size:(i + 1) * batch_size]
-
+    batch_sizes = [batch_size] * num_batches
     # 将剩余的数据作为最后一个批次
-    last_batch_start = num_batches * batch_size
-    if last_batch_start < n_samples:
-        yield data[last_batch_start:]
+    if num_batches * batch_size < n_samples:
+        batch_sizes.append(n_samples - num_batches * batch_size)
+    return batch_sizes
+
+
+def batch_generator(data, max_batch_size):
+    """
+    根据data大小，生成最大长度不超过max_batch_size的均匀批次数据
+    """
+    start = 0
+    for batch_size in get_batch_sizes(len(data), max_batch_size):
+        yield data[start:start + batch_size]
+        start += batch_size
 
 
 def inference_task(batch_data):
@@ -58,9 +66,15 @@ def parallel_inference(inputs, batch_size=None, pool_size=None):
     return index_inpainted_frames
 
 
+# 每个进程只加载一次LAMA模型
+_lama_inpaint_instance = None
+
+
 def inpaint(img, mask):
-    lama_inpaint_instance = LamaInpaint()
-    img_inpainted = lama_inpaint_instance(img, mask)
+    global _lama_inpaint_instance
+    if _lama_inpaint_instance is None:
+        _lama_inpaint_instance = LamaInpaint()
+    img_inpainted = _lama_inpaint_instance(img, mask)
     return img_inpainted
 
 
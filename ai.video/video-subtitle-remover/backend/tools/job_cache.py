@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from functools import cached_property
+
+import cv2
+import numpy as np
+
+
+def get_file_hash(file_path, chunk_size=8 * 1024 * 1024):
+    """
+    计算文件内容的hash，用于判断视频是否发生变化
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_config_hash(*items):
+    """
+    计算配置项的hash，items需要能被json序列化
+    """
+    return hashlib.blake2b(json.dumps(items, sort_keys=True, default=str).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def concat_videos(file_list, output_path, ffmpeg_path):
+    """
+    使用ffmpeg concat将编码参数相同的多个视频文件无损拼接
+    """
+    if len(file_list) == 0:
+        return False
+    if len(file_list) == 1:
+        shutil.copy2(file_list[0], output_path)
+        return True
+    list_path = f'{output_path}.concat.txt'
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for file_path in file_list:
+            file_path = os.path.abspath(file_path).replace("'", "'\\''")
+            f.write(f"file '{file_path}'\n")
+    concat_command = [ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+                      "-c", "copy", "-loglevel", "error", output_path]
+    use_shell = True if os.name == "nt" else False
+    try:
+        subprocess.check_output(concat_command, stdin=open(os.devnull), shell=use_shell)
+    finally:
+        os.remove(list_path)
+    return True
+
+
+def encode_box_dict(subtitle_frame_no_box_dict):
+    """
+    将 {帧号: [(xmin, xmax, ymin, ymax), ...]} 编码为两个紧凑的int32数组
+    """
+    frame_no_list = []
+    box_list = []
+    for frame_no in sorted(subtitle_frame_no_box_dict.keys()):
+        for box in subtitle_frame_no_box_dict[frame_no]:
+            frame_no_list.append(frame_no)
+            box_list.append(box)
+    frame_no_array = np.asarray(frame_no_list, dtype=np.int32)
+    box_array = np.asarray(box_list, dtype=np.int32).reshape(-1, 4)
+    return frame_no_array, box_array
+
+
+def decode_box_dict(frame_no_array, box_array):
+    """
+    encode_box_dict的逆过程
+    """
+    subtitle_frame_no_box_dict = {}
+    for frame_no, box in zip(frame_no_array.tolist(), box_array.tolist()):
+        subtitle_frame_no_box_dict.setdefault(frame_no, []).append(tuple(box))
+    return subtitle_frame_no_box_dict
+
+
+class JobCache:
+    """
+    字幕去除任务的sidecar缓存目录，位于视频文件旁：
+    1. 字幕检测结果(字幕帧号与坐标、连续区间、场景切换帧号)，按视频文件hash与检测配置区分
+    2. 已完成重绘的视频分段，用于任务中断后断点续处理
+    """
+
+    def __init__(self, video_path, video_hash=None):
+        self.video_path = video_path
+        self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(video_path)),
+                                      f'.{os.path.basename(video_path)}.vsr')
+        # 已知视频hash时(如分段并行的子进程)无需重复计算
+        if video_hash is not None:
+            self.video_hash = video_hash
+
+    @cached_property
+    def video_hash(self):
+        return get_file_hash(self.video_path)
+
+    def get_detection_path(self, detection_key):
+        return os.path.join(self.cache_dir, f'detection_{detection_key}.npz')
+
+    def load_detection(self, detection_key):
+        """
+        读取检测结果缓存，返回dict，包含subtitle_frame_no_box_dict以及已缓存的continuous_ranges、scene_cuts、scene_cuts_key
+        """
+        path = self.get_detection_path(detection_key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                result = {'subtitle_frame_no_box_dict': decode_box_dict(data['frame_no'], data['boxes'])}
+                if 'continuous_ranges' in data:
+                    result['continuous_ranges'] = [tuple(r) for r in data['continuous_ranges'].tolist()]
+                if 'scene_cuts' in data:
+                    result['scene_cuts'] = data['scene_cuts'].tolist()
+                if 'scene_cuts_key' in data:
+                    result['scene_cuts_key'] = str(data['scene_cuts_key'])
+            return result
+        except Exception as e:
+            print(f'failed to load detection cache {path}: {e}')
+            return None
+
+    def get_scene_stats_path(self, stats_key):
+        """
+        场景检测每帧指标的保存路径，修改场景切换阈值时从该文件重新计算，不需要重新解码视频
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f'scene_stats_{stats_key}.npz')
+
+    def save_detection(self, detection_key, subtitle_frame_no_box_dict, continuous_ranges=None, scene_cuts=None,
+                       scene_cuts_key=None):
+        frame_no_array, box_array = encode_box_dict(subtitle_frame_no_box_dict)
+        arrays = {'frame_no': frame_no_array, 'boxes': box_array}
+        if continuous_ranges is not None:
+            arrays['continuous_ranges'] = np.asarray(continuous_ranges, dtype=np.int32).reshape(-1, 2)
+        if scene_cuts is not None:
+            arrays['scene_cuts'] = np.asarray(scene_cuts, dtype=np.int32)
+        if scene_cuts_key is not None:
+            # 场景切换结果对应的场景检测配置
+            arrays['scene_cuts_key'] = np.asarray(scene_cuts_key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.get_detection_path(detection_key)
+        # 先写临时文件再替换，防止中断时留下损坏的缓存
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @property
+    def segment_dir(self):
+        return os.path.join(self.cache_dir, 'segments')
+
+    def clear_segments(self):
+        shutil.rmtree(self.segment_dir, ignore_errors=True)
+
+
+class SegmentWriter:
+    """
+    分段写入重绘后的视频帧，接口与cv2.VideoWriter保持一致(write/release)
+    调用方在安全点(之前的帧均已写完，且下一帧不在某个重绘区间中间)调用checkpoint()，
+    当前分段达到commit_frames帧后结束该分段并记录到manifest中，任务中断后可从已提交的帧之后继续处理
+    """
+
+    def __init__(self, segment_dir, fps, size, inpaint_key, commit_frames=500):
+        self.segment_dir = segment_dir
+        self.fps = fps
+        self.size = size
+        self.inpaint_key = inpaint_key
+        self.commit_frames = commit_frames
+        self.manifest_path = os.path.join(segment_dir, 'manifest.json')
+        self.segments = self.load_manifest()
+        # 已提交的帧数，即断点续处理的起始位置
+        self.committed_frames = sum(segment['frames'] for segment in self.segments)
+        self.writer = None
+        self.current_file = None
+        self.current_frames = 0
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                segments = manifest.get('segments', [])
+                if manifest.get('inpaint_key') == self.inpaint_key and \
+                        all(os.path.exists(os.path.join(self.segment_dir, s['file'])) for s in segments):
+                    return segments
+            except Exception as e:
+                print(f'failed to load segment manifest {self.manifest_path}: {e}')
+            # 配置发生变化或记录损坏，则丢弃之前的分段
+            shutil.rmtree(self.segment_dir, ignore_errors=True)
+        os.makedirs(self.segment_dir, exist_ok=True)
+        # 保存manifest，之后配置变化时可以识别并清理该目录
+        self.segments = []
+        self.save_manifest()
+        return []
+
+    def save_manifest(self):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'inpaint_key': self.inpaint_key, 'segments': self.segments}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def write(self, frame):
+        if self.writer is None:
+            self.current_file = f'{len(self.segments):05d}.mp4'
+            self.writer = cv2.VideoWriter(os.path.join(self.segment_dir, self.current_file),
+                                          cv2.VideoWriter_fourcc(*'mp4v'), self.fps, self.size)
+            self.current_frames = 0
+        self.writer.write(frame)
+        self.current_frames += 1
+
+    def checkpoint(self, force=False):
+        """
+        在安全点调用，当前分段帧数足够时提交该分段
+        """
+        if self.writer is None:
+            return
+        if not force and self.current_frames < self.commit_frames:
+            return
+        self.writer.release()
+        self.writer = None
+        self.segments.append({'file': self.current_file, 'start': self.committed_frames,
+                              'frames': self.current_frames})
+        self.committed_frames += self.current_frames
+        self.save_manifest()
+
+    def reset(self):
+        """
+        丢弃所有已提交的分段，供不支持断点续处理、需要从头写入的流程使用
+        """
+        self.release()
+        shutil.rmtree(self.segment_dir, ignore_errors=True)
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.segments = []
+        self.committed_frames = 0
+        self.save_manifest()
+
+    def release(self):
+        """
+        关闭未提交的分段并丢弃，未经checkpoint的帧在续处理时会重新生成
+        """
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            try:
+                os.remove(os.path.join(self.segment_dir, self.current_file))
+            except OSError:
+                pass
+
+    @property
+    def segment_files(self):
+        return [os.path.join(self.segment_dir, segment['file']) for segment in self.segments]
+
+    def concat(self, output_path, ffmpeg_path):
+        """
+        将所有已提交的分段无损拼接为一个视频文件
+        """
+        return concat_videos(self.segment_files, output_path, ffmpeg_path)
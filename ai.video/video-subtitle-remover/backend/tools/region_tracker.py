@@ -0,0 +1,258 @@
+from itertools import chain
+
+import numpy as np
+
+# 文本框的列式存储格式，slot为文本框在当前帧文本框列表中的下标
+BOX_DTYPE = np.dtype([('frame', np.int64), ('slot', np.int64),
+                      ('xmin', np.int64), ('xmax', np.int64), ('ymin', np.int64), ('ymax', np.int64)])
+COORDINATE_NAMES = ('xmin', 'xmax', 'ymin', 'ymax')
+
+
+def box_iou(boxes1, boxes2):
+    """
+    计算两组文本框(xmin, xmax, ymin, ymax)两两之间的IoU，返回形状为[N, M]的矩阵
+    与shapely多边形的计算结果一致：不相交时为-1，仅边或点接触时为0
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    x1_lo, x1_hi = np.minimum(boxes1[:, 0], boxes1[:, 1])[:, None], np.maximum(boxes1[:, 0], boxes1[:, 1])[:, None]
+    y1_lo, y1_hi = np.minimum(boxes1[:, 2], boxes1[:, 3])[:, None], np.maximum(boxes1[:, 2], boxes1[:, 3])[:, None]
+    x2_lo, x2_hi = np.minimum(boxes2[:, 0], boxes2[:, 1])[None], np.maximum(boxes2[:, 0], boxes2[:, 1])[None]
+    y2_lo, y2_hi = np.minimum(boxes2[:, 2], boxes2[:, 3])[None], np.maximum(boxes2[:, 2], boxes2[:, 3])[None]
+    inter_w = np.minimum(x1_hi, x2_hi) - np.maximum(x1_lo, x2_lo)
+    inter_h = np.minimum(y1_hi, y2_hi) - np.maximum(y1_lo, y2_lo)
+    intersects = (inter_w >= 0) & (inter_h >= 0)
+    inter_area = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+    union_area = (x1_hi - x1_lo) * (y1_hi - y1_lo) + (x2_hi - x2_lo) * (y2_hi - y2_lo) - inter_area
+    with np.errstate(invalid='ignore', divide='ignore'):
+        iou = np.where(union_area > 0, inter_area / union_area, 0.0)
+    return np.where(intersects, iou, -1.0)
+
+
+class SubtitleRegionTracker:
+    """
+    字幕文本框的后处理引擎，替代基于{帧号: [文本框, ...]}字典的逐帧比较
+    1. 所有文本框保存在一个按(帧号, 下标)排序的结构化数组中，帧号单独保存(包括没有文本框的帧)
+    2. 相似判断(PIXEL_TOLERANCE_X/Y)、相交判断与帧间比较均为向量化计算
+    3. 各方法的输出与SubtitleDetect中对应的字典实现完全一致
+    """
+
+    def __init__(self, boxes, frames, tolerance_x=20, tolerance_y=20, height_difference=20):
+        # 按(frame, slot)排序的文本框
+        self.boxes = boxes
+        # 所有帧号，升序
+        self.frames = frames
+        self.tolerance_x = tolerance_x
+        self.tolerance_y = tolerance_y
+        self.height_difference = height_difference
+        # 每一帧的第一个文本框在boxes中的下标，长度为帧数 + 1
+        self.offsets = np.append(np.searchsorted(boxes['frame'], frames), len(boxes))
+
+    @classmethod
+    def from_dict(cls, subtitle_frame_no_box_dict, **kwargs):
+        frames = np.array(sorted(subtitle_frame_no_box_dict.keys()), dtype=np.int64)
+        box_lists = [subtitle_frame_no_box_dict[frame_no] for frame_no in frames.tolist()]
+        counts = np.array([len(box_list) for box_list in box_lists], dtype=np.int64)
+        boxes = np.empty(int(counts.sum()), dtype=BOX_DTYPE)
+        boxes['frame'] = np.repeat(frames, counts)
+        boxes['slot'] = np.arange(len(boxes)) - np.repeat(np.cumsum(counts) - counts, counts)
+        coordinates = np.fromiter(chain.from_iterable(chain.from_iterable(box_lists)), dtype=np.int64,
+                                  count=4 * len(boxes)).reshape(-1, 4)
+        for i, name in enumerate(COORDINATE_NAMES):
+            boxes[name] = coordinates[:, i]
+        return cls(boxes, frames, **kwargs)
+
+    def to_dict(self):
+        coordinates = list(zip(*(self.boxes[name].tolist() for name in COORDINATE_NAMES)))
+        offsets = self.offsets.tolist()
+        return {frame_no: coordinates[offsets[k]:offsets[k + 1]] for k, frame_no in enumerate(self.frames.tolist())}
+
+    @property
+    def coordinates(self):
+        """
+        文本框坐标，形状为[N, 4]
+        """
+        return np.stack([self.boxes[name] for name in COORDINATE_NAMES], axis=1)
+
+    def with_coordinates(self, coordinates, keep=None):
+        """
+        使用新的坐标(可选只保留keep为True的文本框)创建新的tracker，帧号不变
+        """
+        boxes = self.boxes.copy()
+        for i, name in enumerate(COORDINATE_NAMES):
+            boxes[name] = coordinates[:, i]
+        if keep is not None:
+            boxes = boxes[keep]
+            starts = np.searchsorted(boxes['frame'], boxes['frame'])
+            boxes['slot'] = np.arange(len(boxes)) - starts
+        return SubtitleRegionTracker(boxes, self.frames, self.tolerance_x, self.tolerance_y, self.height_difference)
+
+    def is_similar(self, coordinates, region):
+        tolerance = np.array([self.tolerance_x, self.tolerance_x, self.tolerance_y, self.tolerance_y])
+        return np.all(np.abs(coordinates - region) <= tolerance, axis=-1)
+
+    def unify_regions(self):
+        """
+        将连续相似的区域统一：每个下标的文本框与前一帧同一下标统一后的文本框相似时，沿用统一后的文本框
+        同一下标在相邻帧中连续出现的文本框组成一条轨迹，轨迹内以锚点文本框为基准向后查找第一个不相似的文本框
+        """
+        if len(self.boxes) == 0:
+            return self
+        rank = np.searchsorted(self.frames, self.boxes['frame'])
+        slot = self.boxes['slot']
+        order = np.lexsort((rank, slot))
+        rank, slot, coordinates = rank[order], slot[order], self.coordinates[order]
+        track_start = np.ones(len(order), dtype=bool)
+        track_start[1:] = (slot[1:] != slot[:-1]) | (rank[1:] != rank[:-1] + 1)
+        track_id = np.cumsum(track_start)
+        unified = coordinates.copy()
+        n = len(order)
+        anchor = 0
+        while anchor < n:
+            # 以倍增的窗口查找下一个锚点，总计算量与文本框数量成正比
+            next_anchor = n
+            start, window = anchor + 1, 16
+            while start < n:
+                end = min(start + window, n)
+                mismatch = (track_id[start:end] != track_id[anchor]) | \
+                    ~self.is_similar(coordinates[start:end], coordinates[anchor])
+                if mismatch.any():
+                    next_anchor = start + int(np.argmax(mismatch))
+                    break
+                start, window = end, window * 2
+            unified[anchor:next_anchor] = coordinates[anchor]
+            anchor = next_anchor
+        result = np.empty_like(unified)
+        result[order] = unified
+        return self.with_coordinates(result)
+
+    def get_same_as_previous(self):
+        """
+        每一帧是否与前一帧帧号连续且文本框列表完全相同
+        """
+        counts = np.diff(self.offsets)
+        same = np.zeros(len(self.frames), dtype=bool)
+        if len(self.frames) < 2:
+            return same
+        same[1:] = (np.diff(self.frames) == 1) & (counts[1:] == counts[:-1])
+        rank = np.searchsorted(self.frames, self.boxes['frame'])
+        previous = self.offsets[np.maximum(rank - 1, 0)] + self.boxes['slot']
+        candidates = same[rank]
+        coordinates = self.coordinates
+        row_differs = candidates & np.any(coordinates != coordinates[np.where(candidates, previous, 0)], axis=1)
+        same &= np.bincount(rank[row_differs], minlength=len(self.frames)) == 0
+        return same
+
+    def find_continuous_ranges_with_same_mask(self):
+        """
+        获取帧号连续且文本框列表相同的区间[(起始帧号, 结束帧号), ...]
+        """
+        if len(self.frames) == 0:
+            return []
+        starts = np.flatnonzero(~self.get_same_as_previous())
+        ends = np.append(starts[1:] - 1, len(self.frames) - 1)
+        return list(zip(self.frames[starts].tolist(), self.frames[ends].tolist()))
+
+    def get_area_max_box_dict(self, sub_frame_no_list_continuous):
+        """
+        获取每个区间内每一行面积最大的文本框，{'起始帧号->结束帧号': [{'area', 'xmin', 'xmax', 'ymin', 'ymax'}, ...]}
+        区间内的文本框逐帧更新状态，状态不再变化且后续帧的文本框列表相同时直接跳过这些帧
+        """
+        coordinates = self.coordinates
+        same = self.get_same_as_previous()
+        differs = np.flatnonzero(~same)
+        area_max_box_dict = dict()
+        for start_no, end_no in sub_frame_no_list_continuous:
+            k, k_end = np.searchsorted(self.frames, [start_no, end_no]).tolist()
+            # 每行为[area, xmin, xmax, ymin, ymax]
+            area_max_boxes = np.zeros((0, 5), dtype=np.int64)
+            while k <= k_end:
+                area_max_boxes, changed = self.update_area_max_boxes(
+                    area_max_boxes, coordinates[self.offsets[k]:self.offsets[k + 1]])
+                k += 1
+                if not changed and k <= k_end and same[k]:
+                    # 后续相同的帧不会再改变状态，跳到下一个文本框不同的帧
+                    next_index = np.searchsorted(differs, k)
+                    k = int(differs[next_index]) if next_index < len(differs) else k_end + 1
+            unique_boxes = []
+            for area_max_box in area_max_boxes.tolist():
+                if area_max_box not in unique_boxes:
+                    unique_boxes.append(area_max_box)
+            area_max_box_dict[f'{start_no}->{end_no}'] = [dict(zip(('area',) + COORDINATE_NAMES, box))
+                                                         for box in unique_boxes]
+        return area_max_box_dict
+
+    def update_area_max_boxes(self, area_max_boxes, coordinates):
+        """
+        用一帧的文本框更新区间最大文本框，返回(新的区间最大文本框, 是否发生变化)
+        """
+        changed = False
+        hd = self.height_difference
+        for xmin, xmax, ymin, ymax in coordinates.tolist():
+            current_area = abs(xmax - xmin) * abs(ymax - ymin)
+            current = np.array([[current_area, xmin, xmax, ymin, ymax]], dtype=np.int64)
+            if len(area_max_boxes) < 1:
+                area_max_boxes = current
+                changed = True
+                continue
+            # 与区间最大文本框位于同一行且相交
+            overlapped = (area_max_boxes[:, 3] - hd <= ymin) & (ymax <= area_max_boxes[:, 4] + hd)
+            overlapped &= box_iou(current[:, 1:], area_max_boxes[:, 1:])[0] != -1
+            same_height = overlapped & (
+                np.abs(np.abs(area_max_boxes[:, 4] - area_max_boxes[:, 3]) - abs(ymax - ymin)) < hd)
+            # 找到第一个高度相近的文本框后，之后同一行的文本框面积更小时也会被更新
+            update = overlapped & np.logical_or.accumulate(same_height) & (current_area > area_max_boxes[:, 0])
+            if update.any():
+                area_max_boxes = area_max_boxes.copy()
+                area_max_boxes[update] = current[0]
+                changed = True
+            if not same_height.any():
+                if not np.any(np.all(area_max_boxes == current, axis=1)):
+                    area_max_boxes = np.concatenate([area_max_boxes, current])
+                    changed = True
+                    break
+        return area_max_boxes, changed
+
+    def unite_coordinates(self):
+        """
+        将区间内每个文本框替换为与之相交的区间最大文本框
+        """
+        frame_no_list = self.find_continuous_ranges_with_same_mask()
+        area_max_box_dict = self.get_area_max_box_dict(frame_no_list)
+        all_coordinates = self.coordinates
+        result = dict()
+        for start_no, end_no in frame_no_list:
+            max_boxes = [tuple(box[name] for name in COORDINATE_NAMES)
+                         for box in area_max_box_dict[f'{start_no}->{end_no}']]
+            k, k_end = np.searchsorted(self.frames, [start_no, end_no]).tolist()
+            # 区间内的帧文本框列表相同，结果只需计算一次
+            coordinates = all_coordinates[self.offsets[k]:self.offsets[k + 1]]
+            intersects = box_iou(coordinates, max_boxes) != -1
+            new_box_list = []
+            for j in np.nonzero(intersects)[1].tolist():
+                if max_boxes[j] not in new_box_list:
+                    new_box_list.append(max_boxes[j])
+            for frame_no in self.frames[k:k_end + 1].tolist():
+                result[frame_no] = list(new_box_list)
+        return result
+
+    def filter_mistake_sub_area(self, fps):
+        """
+        过滤出现次数少于半秒帧数的文本框，同一帧中重复的文本框只保留第一个
+        """
+        coordinates = self.coordinates
+        if len(coordinates) == 0:
+            return self
+        unique_boxes, first_index, inverse, counts = np.unique(coordinates, axis=0, return_index=True,
+                                                               return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        for i in np.argsort(first_index, kind='stable').tolist():
+            if counts[i] < (fps // 2):
+                print(f'drop {tuple(unique_boxes[i].tolist())}')
+        keep = counts[inverse] >= (fps // 2)
+        # 同一帧中重复的文本框
+        _, first_in_frame = np.unique(np.column_stack([self.boxes['frame'], inverse]), axis=0, return_index=True)
+        is_first = np.zeros(len(coordinates), dtype=bool)
+        is_first[first_in_frame] = True
+        keep &= is_first
+        return self.with_coordinates(coordinates, keep=keep)
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+
+class FrameRangeCapture:
+    """
+    包装cv2.VideoCapture，只读取到end_frame_no(包含)为止，用于分段处理
+    end_frame_no为None时一直读取到视频结尾
+    """
+
+    def __init__(self, video_cap, end_frame_no=None, on_read=None):
+        self.video_cap = video_cap
+        self.end_frame_no = end_frame_no
+        # 读取帧后的回调，参数为当前帧号
+        self.on_read = on_read
+        # 最后读取的帧号(从1开始)
+        self.frame_no = 0
+
+    def seek(self, frame_no):
+        """
+        跳转到指定帧号之后，下一次read返回第frame_no + 1帧
+        """
+        if frame_no > 0:
+            self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+        self.frame_no = frame_no
+
+    def is_end(self):
+        return self.end_frame_no is not None and self.frame_no >= self.end_frame_no
+
+    def read(self):
+        if self.is_end():
+            return False, None
+        ret, frame = self.video_cap.read()
+        if ret:
+            self.frame_no += 1
+            if self.on_read is not None:
+                self.on_read(self.frame_no)
+        return ret, frame
+
+    def grab(self):
+        if self.is_end():
+            return False
+        ret = self.video_cap.grab()
+        if ret:
+            self.frame_no += 1
+        return ret
+
+    def isOpened(self):
+        return self.video_cap.isOpened() and not self.is_end()
+
+    def get(self, prop_id):
+        return self.video_cap.get(prop_id)
+
+    def release(self):
+        self.video_cap.release()
+
+
+def split_segments(frame_count, intervals, subtitle_frame_no_list, scene_cuts, num_segments, min_frames):
+    """
+    将视频切分为若干个可以独立处理的分段
+    分段起点不能落在重绘区间内部，优先选择场景切换帧或无字幕的帧
+    :param frame_count: 视频总帧数
+    :param intervals: 重绘区间列表 [(start, end), ...]，帧号从1开始，包含end
+    :param subtitle_frame_no_list: 有字幕的帧号
+    :param scene_cuts: 场景切换的帧号
+    :param num_segments: 期望的分段数量
+    :param min_frames: 每个分段最少的帧数
+    :return [(start, end), ...]
+    """
+    num_segments = min(num_segments, frame_count // max(min_frames, 1))
+    if num_segments <= 1:
+        return [(1, frame_count)]
+    # 帧号在重绘区间内部(非区间起点)则不能作为分段起点
+    inside = np.zeros(frame_count + 2, dtype=bool)
+    for start, end in intervals:
+        inside[max(start + 1, 0):min(end + 1, frame_count + 2)] = True
+    safe = ~inside
+    safe[:2] = False
+    safe[frame_count + 1:] = False
+    # 无字幕的帧与场景切换帧
+    preferred = np.ones_like(safe)
+    subtitle_frame_no_array = np.asarray([n for n in subtitle_frame_no_list if 0 <= n <= frame_count + 1], dtype=np.int64)
+    preferred[subtitle_frame_no_array] = False
+    scene_cut_array = np.asarray([n for n in scene_cuts if 0 <= n <= frame_count + 1], dtype=np.int64)
+    preferred[scene_cut_array] = True
+    safe_points = np.flatnonzero(safe)
+    preferred_points = np.flatnonzero(safe & preferred)
+    if len(safe_points) == 0:
+        return [(1, frame_count)]
+
+    def nearest(points, target):
+        if len(points) == 0:
+            return None
+        i = np.searchsorted(points, target)
+        candidates = [points[j] for j in (i - 1, i) if 0 <= j < len(points)]
+        return int(min(candidates, key=lambda p: abs(p - target)))
+
+    segment_length = frame_count / num_segments
+    starts = [1]
+    for k in range(1, num_segments):
+        target = 1 + int(round(k * segment_length))
+        point = nearest(preferred_points, target)
+        # 优先点离目标位置太远时，使用最近的安全点
+        if point is None or abs(point - target) > segment_length / 2:
+            point = nearest(safe_points, target)
+        if point - starts[-1] >= min_frames and frame_count - point + 1 >= min_frames:
+            starts.append(point)
+    ends = [s - 1 for s in starts[1:]] + [frame_count]
+    return list(zip(starts, ends))
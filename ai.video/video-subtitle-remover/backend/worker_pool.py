@@ -0,0 +1,256 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resource_governor import ResourceGovernor, ResourceUsageMonitor, apply_resource_budget
+
+# 进度上报间隔(秒)
+PROGRESS_INTERVAL = 0.5
+
+
+def worker_main(worker_id, task_queue, event_queue, cancel_event, warm_up_mode):
+    """
+    worker进程入口：加载一次模型后常驻，循环处理任务队列中的任务
+    """
+    # 延迟导入main模块，只在worker进程中加载torch与模型
+    import main as subtitle_remover
+    import config
+    try:
+        subtitle_remover.warm_up_models(config.InpaintMode(warm_up_mode) if warm_up_mode else None)
+    except Exception as e:
+        print(f'[Worker {worker_id}] failed to warm up models: {e}')
+    event_queue.put({'type': 'ready', 'worker_id': worker_id})
+    while True:
+        task = task_queue.get()
+        # None 表示退出
+        if task is None:
+            break
+        task_id = task['task_id']
+        budget = task.get('resources')
+        apply_resource_budget(budget)
+        monitor = ResourceUsageMonitor(budget)
+        event_queue.put({'type': 'started', 'worker_id': worker_id, 'task_id': task_id, 'resources': budget})
+        remover = None
+        stop_reporting = threading.Event()
+        try:
+            if task.get('algorithm'):
+                config.MODE = config.InpaintMode(task['algorithm'])
+            remover = subtitle_remover.SubtitleRemover(task['file_path'], sub_areas=task.get('sub_areas'),
+                                                       gui_mode=False, reload_config=False)
+            remover.cancel_event = cancel_event
+
+            def report_progress():
+                last_progress = -1
+                while not stop_reporting.wait(PROGRESS_INTERVAL):
+                    progress = int(remover.progress_total)
+                    usage = monitor.sample()
+                    if progress != last_progress:
+                        last_progress = progress
+                        event_queue.put({'type': 'progress', 'worker_id': worker_id, 'task_id': task_id,
+                                         'progress': progress, 'usage': usage})
+
+            threading.Thread(target=report_progress, daemon=True).start()
+            remover.run()
+            event_queue.put({'type': 'completed', 'worker_id': worker_id, 'task_id': task_id,
+                             'output_path': remover.video_out_name, 'usage': monitor.sample()})
+        except subtitle_remover.TaskCancelledError:
+            event_queue.put({'type': 'cancelled', 'worker_id': worker_id, 'task_id': task_id,
+                             'usage': monitor.sample()})
+        except Exception as e:
+            traceback.print_exc()
+            event_queue.put({'type': 'failed', 'worker_id': worker_id, 'task_id': task_id, 'error': str(e),
+                             'usage': monitor.sample()})
+        finally:
+            stop_reporting.set()
+            if remover is not None and not remover.isFinished:
+                remover.release()
+                if os.path.exists(remover.video_temp_file.name):
+                    try:
+                        os.remove(remover.video_temp_file.name)
+                    except Exception:
+                        pass
+
+
+class SubtitleRemoverWorkerPool:
+    """
+    字幕去除worker进程池：
+    1. 启动num_workers个常驻进程，每个进程只加载一次模型
+    2. 任务进入有界优先级队列，队列已满时submit抛出queue.Full
+    3. 支持取消排队中或正在处理的任务
+    4. worker进程通过事件队列上报任务状态与进度，由on_event回调处理
+    5. 设置governor时，任务在分配到CPU核心与内存后才会交给worker，worker按分配的线程预算处理任务
+    """
+
+    def __init__(self, num_workers=1, max_queue_size=16, on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 warm_up_mode=None, governor: Optional[ResourceGovernor] = None):
+        self.num_workers = max(int(num_workers), 1)
+        self.governor = governor
+        self.max_queue_size = max_queue_size
+        self.on_event = on_event
+        self.warm_up_mode = warm_up_mode
+        self.ctx = multiprocessing.get_context('spawn')
+        self.event_queue = self.ctx.Queue()
+        self.workers = []
+        # 排队中的任务，元素为(-priority, seq, task)
+        self.pending = []
+        self.pending_ids = set()
+        self.seq = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+        self.threads = []
+
+    def _spawn_worker(self, worker_id):
+        task_queue = self.ctx.Queue()
+        cancel_event = self.ctx.Event()
+        process = self.ctx.Process(target=worker_main,
+                                   args=(worker_id, task_queue, self.event_queue, cancel_event, self.warm_up_mode))
+        process.start()
+        return {'id': worker_id, 'process': process, 'task_queue': task_queue, 'cancel_event': cancel_event,
+                'ready': False, 'task_id': None}
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.workers = [self._spawn_worker(i) for i in range(self.num_workers)]
+        for target in (self._dispatch_loop, self._event_loop, self._monitor_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def shutdown(self, timeout=5):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+            for worker in self.workers:
+                worker['cancel_event'].set()
+                worker['task_queue'].put(None)
+        for worker in self.workers:
+            worker['process'].join(timeout)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        self.event_queue.put(None)
+
+    def submit(self, task_id, task: Dict[str, Any], priority=0):
+        """
+        提交任务，priority越大越先处理，相同优先级按提交顺序处理
+        """
+        with self.condition:
+            if len(self.pending) >= self.max_queue_size:
+                raise queue.Full(f'task queue is full ({self.max_queue_size})')
+            task = dict(task, task_id=task_id)
+            heapq.heappush(self.pending, (-priority, next(self.seq), task))
+            self.pending_ids.add(task_id)
+            self.condition.notify_all()
+
+    def cancel(self, task_id):
+        """
+        取消任务，返回 'pending'(从队列中移除)、'running'(已通知worker中断) 或 None(任务不在池中)
+        """
+        with self.condition:
+            if task_id in self.pending_ids:
+                self.pending = [item for item in self.pending if item[2]['task_id'] != task_id]
+                heapq.heapify(self.pending)
+                self.pending_ids.discard(task_id)
+                return 'pending'
+            for worker in self.workers:
+                if worker['task_id'] == task_id:
+                    worker['cancel_event'].set()
+                    return 'running'
+        return None
+
+    def queue_position(self, task_id):
+        with self.condition:
+            order = sorted(self.pending)
+            for position, item in enumerate(order):
+                if item[2]['task_id'] == task_id:
+                    return position
+        return None
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception:
+                traceback.print_exc()
+
+    def _dispatch_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not (self.pending and self._idle_worker() is not None):
+                    self.condition.wait()
+                if not self.running:
+                    return
+                worker = self._idle_worker()
+                task = self.pending[0][2]
+                if self.governor is not None:
+                    budget = self.governor.try_acquire(task['task_id'], task)
+                    if budget is None:
+                        # 资源不足，等待任务结束或可用内存变化后重试
+                        self.condition.wait(1)
+                        continue
+                    task['resources'] = budget
+                heapq.heappop(self.pending)
+                self.pending_ids.discard(task['task_id'])
+                worker['task_id'] = task['task_id']
+                # 在派发前清除取消标记：派发后到worker取出任务之间到达的取消请求不会被覆盖
+                worker['cancel_event'].clear()
+                worker['task_queue'].put(task)
+
+    def _idle_worker(self):
+        for worker in self.workers:
+            if worker['ready'] and worker['task_id'] is None and worker['process'].is_alive():
+                return worker
+        return None
+
+    def _event_loop(self):
+        while True:
+            event = self.event_queue.get()
+            if event is None:
+                return
+            with self.condition:
+                worker = self.workers[event['worker_id']]
+                if event['type'] == 'ready':
+                    worker['ready'] = True
+                elif event['type'] in ('completed', 'failed', 'cancelled'):
+                    worker['task_id'] = None
+                    if self.governor is not None:
+                        self.governor.release(event['task_id'])
+                elif event.get('usage') and self.governor is not None:
+                    self.governor.update_usage(event['task_id'], event['usage'])
+                self.condition.notify_all()
+            if event['type'] != 'ready':
+                self._emit(event)
+
+    def _monitor_loop(self):
+        """
+        检查worker进程是否异常退出，重启进程并将其正在处理的任务标记为失败
+        """
+        while True:
+            time.sleep(1)
+            crashed = []
+            with self.condition:
+                if not self.running:
+                    return
+                for index, worker in enumerate(self.workers):
+                    if worker['process'].is_alive():
+                        continue
+                    if worker['task_id'] is not None:
+                        crashed.append(worker['task_id'])
+                        if self.governor is not None:
+                            self.governor.release(worker['task_id'])
+                    print(f'[WorkerPool] worker {worker["id"]} exited with code {worker["process"].exitcode}, restarting')
+                    self.workers[index] = self._spawn_worker(worker['id'])
+                self.condition.notify_all()
+            for task_id in crashed:
+                self._emit({'type': 'failed', 'task_id': task_id, 'error': 'worker process exited unexpectedly'})